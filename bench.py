@@ -0,0 +1,654 @@
+import hashlib
+import logging
+import os
+import queue
+import random
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+from ctypes import sizeof
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+
+from robot import (RPC, AsyncLogHandler, RobotError, RobotStatePkg, RobotStateParser, ServoStreamer,
+                   StateRecvBuffer, calculate_file_md5)
+
+FRAME_RATES = [1000, 500, 125]
+
+
+def make_frame(frame_cnt, data_len=sizeof(RobotStatePkg) - 5):
+    pkg = RobotStatePkg()
+    pkg.frame_head = 0x5A5A
+    pkg.frame_cnt = frame_cnt % 128
+    pkg.data_len = data_len
+    for i in range(6):
+        pkg.jt_cur_pos[i] = frame_cnt * 0.001 + i
+    body = bytes(pkg)[:data_len + 5].ljust(data_len + 5, b"\0")
+    return body + (sum(body) & 0xFFFF).to_bytes(2, "little")
+
+
+def make_stream(frame_count):
+    return b"".join(make_frame(i) for i in range(frame_count))
+
+
+def split_stream(stream, frame_len, rng):
+    """Cut the stream into recv-sized chunks that straddle frame boundaries."""
+    chunks = []
+    pos = 0
+    while pos < len(stream):
+        size = rng.randint(frame_len // 2, frame_len * 2)
+        chunks.append(stream[pos:pos + size])
+        pos += size
+    return chunks
+
+
+class ReplaySocket:
+    def __init__(self, rpc, chunks):
+        self.rpc = rpc
+        self.chunks = iter(chunks)
+
+    def recv_into(self, view):
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.rpc.closeRPC_state = True
+            self.rpc.stop_event.set()
+            raise ConnectionError("replay finished")
+        view[:len(chunk)] = chunk
+        return len(chunk)
+
+    def close(self):
+        pass
+
+
+def legacy_state_loop(self):
+    """The byte-at-a-time receive loop RPC.robot_state_routine_thread used to run."""
+    while not self.closeRPC_state:
+        recvbuf = bytearray(self.BUFFER_SIZE)
+        tmp_recvbuf = bytearray(self.BUFFER_SIZE)
+        state_pkg = bytearray(self.BUFFER_SIZE)
+        find_head_flag = False
+        index = 0
+        length = 0
+        tmp_len = 0
+        expected_length = self.BUFFER_SIZE
+
+        try:
+            while not self.robot_realstate_exit and not self.stop_event.is_set():
+                recvbyte = self.sock_cli_state.recv_into(recvbuf)
+                if tmp_len > 0:
+                    if tmp_len + recvbyte <= self.BUFFER_SIZE:
+                        recvbuf[:tmp_len + recvbyte] = tmp_recvbuf[:tmp_len] + recvbuf[:recvbyte]
+                        recvbyte += tmp_len
+                        tmp_len = 0
+                    else:
+                        tmp_len = 0
+
+                i = 0
+                while i < recvbyte:
+                    if format(recvbuf[i], '02X') == "5A" and not find_head_flag:
+                        if i + 4 < recvbyte and format(recvbuf[i + 1], '02X') == "5A":
+                            find_head_flag = True
+                            state_pkg[0] = recvbuf[i]
+                            index = 1
+                            length = (recvbuf[i + 4] << 8) | recvbuf[i + 3]
+                            if length + 7 > expected_length:
+                                expected_length = length + 7
+                                tmp_recvbuf[:recvbyte - i] = recvbuf[i:recvbyte]
+                                tmp_len = recvbyte - i
+                                find_head_flag = False
+                                break
+                            i += 1
+                        else:
+                            i += 1
+                            continue
+                    elif find_head_flag and index < length + 5:
+                        if i >= recvbyte:
+                            break
+                        state_pkg[index] = recvbuf[i]
+                        index += 1
+                        i += 1
+                    elif find_head_flag and index >= length + 5:
+                        if i + 1 < recvbyte:
+                            checksum = sum(state_pkg[:index])
+                            checkdata = (recvbuf[i + 1] << 8) | recvbuf[i]
+                            if checksum == checkdata:
+                                self.legacy_state_pkg = RobotStatePkg.from_buffer_copy(state_pkg[:index])
+                            find_head_flag = False
+                            index = 0
+                            length = 0
+                            expected_length = self.BUFFER_SIZE
+                            i += 2
+                        else:
+                            tmp_recvbuf[:recvbyte - i] = recvbuf[i:recvbyte]
+                            tmp_len = recvbyte - i
+                            break
+                    else:
+                        i += 1
+        except ConnectionError:
+            pass
+
+
+def make_replay_rpc(chunks):
+    rpc = RPC.__new__(RPC)
+    rpc._init_state("127.0.0.1")
+    rpc.sock_cli_state = ReplaySocket(rpc, chunks)
+    rpc.reconnect = lambda: False
+    return rpc
+
+
+def run_state_loop(loop, chunks):
+    rpc = make_replay_rpc(chunks)
+    start = time.process_time()
+    loop(rpc)
+    return time.process_time() - start, rpc
+
+
+def bench_state_parser(seconds=2):
+    """CPU share of one core spent decoding the 20004 stream at each sample rate."""
+    print("20004 state parser: CPU per second of stream")
+    frame_len = len(make_frame(0))
+    for rate in FRAME_RATES:
+        stream = make_stream(rate * seconds)
+        chunks = split_stream(stream, frame_len, random.Random(rate))
+        legacy, _ = run_state_loop(legacy_state_loop, chunks)
+        current, rpc = run_state_loop(RPC.robot_state_routine_thread, chunks)
+        assert rpc.state_parser.frame_count == rate * seconds
+        print(f"  {rate:>5} Hz  legacy {legacy / seconds * 100:7.2f}% core  "
+              f"current {current / seconds * 100:6.2f}% core  speedup x{legacy / current:.0f}")
+
+
+def bench_state_recv(seconds=60, rate=1000):
+    """Copies, GC collections and RSS while replaying a long stream through the receive buffer."""
+    print(f"20004 receive buffer: {seconds} s at {rate} Hz")
+    frame_len = len(make_frame(0))
+    stream = make_stream(rate)
+    rng = random.Random(0)
+
+    def chunks():
+        # Chunk boundaries drift across repetitions so the buffer really wraps with partial frames
+        pending = b""
+        for _ in range(seconds):
+            data = pending + stream
+            pos = 0
+            while len(data) - pos >= 2 * frame_len:
+                size = rng.randint(frame_len // 2, frame_len * 2)
+                yield data[pos:pos + size]
+                pos += size
+            pending = data[pos:]
+        yield pending
+
+    _, rpc = run_state_loop(RPC.robot_state_routine_thread, chunks())
+    stats = rpc.get_state_recv_stats()
+    print(f"  frames {stats['frames']}  wraps {rpc.state_recv_buffer.wraps}  "
+          f"buffer copies {stats['bytes_copied']} B  "
+          f"copied/frame {stats['copied_per_frame']:.1f} B  "
+          f"gc collections {stats['gc_collections']}  max rss {stats['max_rss_kb']} kB")
+
+
+def legacy_log_call(func):
+    """The log_call wrapper RPC methods used to have: it formatted every call eagerly."""
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        args_str = ', '.join(map(repr, args))
+        kwargs_str = ', '.join([f"{key}={value}" for key, value in kwargs.items()])
+        if (kwargs_str) == "":
+            call_message = f"Calling {func.__name__}" + f"({args_str}" + ")."
+        else:
+            call_message = f"Calling {func.__name__}" + f"({args_str}" + "," + f"{kwargs_str})."
+
+        self.log_info(call_message)
+        result = func(self, *args, **kwargs)
+        if isinstance(result, (list, tuple)) and len(result) > 0:
+            if result[0] == 0:
+                self.log_debug(f"{func.__name__} returned: {result}.")
+            else:
+                self.log_error(f"{func.__name__} Error occurred. returned: {result}")
+        else:
+            if result == 0:
+                self.log_debug(f"{func.__name__} returned: {result}.")
+            else:
+                self.log_error(f"{func.__name__} Error occurred. returned: {result}")
+
+        return result
+
+    return wrapper
+
+
+class LoopbackProxy:
+    """Stands in for the 20003 ServerProxy so only SDK-side cost is measured."""
+
+    def ServoJ(self, *params):
+        return 0
+
+    def ServoMoveStart(self):
+        return 0
+
+    def ServoMoveEnd(self):
+        return 0
+
+
+def make_loopback_rpc(logger):
+    rpc = make_replay_rpc([])
+    rpc.robot = LoopbackProxy()
+    rpc.state_buffer.publish(memoryview(make_frame(1)), 0, len(make_frame(1)), time.time())
+    rpc.logger = logger
+    return rpc
+
+
+def time_per_call(call, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        call()
+    return (time.perf_counter() - start) / count
+
+
+def bench_log_call(count=100000):
+    """Per-call SDK cost of GetActualJointPosDegree and ServoJ with logging off, filtered and on."""
+    print(f"log_call: per-call cost over {count} calls")
+    logger = logging.getLogger("bench.log_call")
+    logger.propagate = False
+    handler = logging.StreamHandler(open(os.devnull, "w"))
+    handler.setFormatter(logging.Formatter('[%(levelname)s] [%(asctime)s pid:%(process)d]  %(message)s'))
+    logger.addHandler(handler)
+    modes = [("logger None", None, None), ("level ERROR", logger, logging.ERROR), ("level DEBUG", logger, logging.DEBUG)]
+    calls = {
+        "GetActualJointPosDegree": lambda rpc, method: method(rpc),
+        "ServoJ": lambda rpc, method: method(rpc, [0.0] * 6, [0.0] * 4),
+    }
+    for name, call in calls.items():
+        current = getattr(RPC, name)
+        undecorated = current.__wrapped__  # without log_call
+        legacy = legacy_log_call(undecorated)
+        for label, mode_logger, level in modes:
+            if level is not None:
+                logger.setLevel(level)
+            rpc = make_loopback_rpc(mode_logger)
+            bare = time_per_call(lambda: call(rpc, undecorated), count)
+            old = time_per_call(lambda: call(rpc, legacy), count)
+            new = time_per_call(lambda: call(rpc, current), count)
+            print(f"  {name:<24} {label:<12} without log_call {bare * 1e6:6.2f} us  "
+                  f"legacy {old * 1e6:6.2f} us  current {new * 1e6:6.2f} us")
+    handler.stream.close()
+
+
+class LegacyBufferedFileHandler(RotatingFileHandler):
+    """The handler logging mode 1 used to install: every 50th record flushed the batch on the caller."""
+
+    def __init__(self, filename, mode='a', maxBytes=0, backupCount=0, encoding=None, delay=False):
+        super().__init__(filename, mode, maxBytes, backupCount, encoding, delay)
+        self.buffer = []
+
+    def emit(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= 50:
+            for r in self.buffer:
+                super().emit(r)
+            self.buffer = []
+
+
+def bench_log_pipeline(count=20000, directory="bench_logs"):
+    """Latency a logging call adds to the calling thread, legacy buffered handler versus AsyncLogHandler."""
+    print(f"log pipeline: caller-side latency over {count} records, 50 kB rotation")
+    os.makedirs(directory, exist_ok=True)
+    formatter = logging.Formatter('[%(levelname)s] [%(asctime)s pid:%(process)d]  %(message)s')
+    handlers = [
+        ("legacy", LegacyBufferedFileHandler(os.path.join(directory, "legacy.log"), maxBytes=50 * 1024, backupCount=5)),
+        ("async", AsyncLogHandler(os.path.join(directory, "async.log"), maxBytes=50 * 1024, backupCount=5)),
+    ]
+    for label, handler in handlers:
+        handler.setFormatter(formatter)
+        if isinstance(handler, AsyncLogHandler):
+            handler.start()
+        logger = logging.getLogger(f"bench.log_pipeline.{label}")
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(handler)
+        latencies = []
+        for i in range(count):
+            start = time.perf_counter()
+            logger.info("Calling %s(%s).", "ServoJ", [0.1 * i] * 6)
+            latencies.append(time.perf_counter() - start)
+            if i % 10 == 0:
+                time.sleep(0)
+        handler.close()
+        latencies.sort()
+        p50, p99, worst = latencies[count // 2], latencies[count * 99 // 100], latencies[-1]
+        dropped = getattr(handler, "dropped", 0)
+        print(f"  {label:<7} p50 {p50 * 1e6:7.1f} us  p99 {p99 * 1e6:7.1f} us  max {worst * 1e6:8.1f} us  "
+              f"dropped {dropped}")
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+def bench_servo_stream(seconds=2, periods=(0.008, 0.002, 0.001)):
+    """Send-time jitter of ServoJ paced with time.sleep(cmdT) versus ServoStreamer deadlines."""
+    print(f"ServoJ pacing: {seconds} s per period, deviation of each send from t0 + k*cmdT")
+    rpc = make_loopback_rpc(None)
+    for period in periods:
+        count = int(seconds / period)
+        trajectory = [[0.001 * k] * 6 for k in range(count)]
+
+        start = time.perf_counter()
+        lateness = []
+        for k, point in enumerate(trajectory):
+            lateness.append(time.perf_counter() - (start + k * period))
+            rpc.ServoJ(point, [0.0] * 4, cmdT=period)
+            time.sleep(period)
+        lateness.sort()
+
+        error, stats = ServoStreamer(rpc, cmdT=period).run(trajectory)
+        assert error == 0 and stats["points"] == count
+        print(f"  cmdT {period * 1e3:4.1f} ms  sleep-paced p99 {lateness[count * 99 // 100] * 1e3:8.3f} ms  "
+              f"max {lateness[-1] * 1e3:8.3f} ms | streamer p99 {stats['jitter_p99'] * 1e3:6.3f} ms  "
+              f"max {stats['jitter_max'] * 1e3:6.3f} ms  overruns {stats['overruns']}")
+
+
+
+class DownloadServer:
+    """
+    Serves one /f/b framed file per connection on an ephemeral loopback port, like the controller's 20011 port.
+    With bad_md5 the header carries a digest that does not match the content.
+    """
+
+    def __init__(self, size, block=1024 * 1024, bad_md5=False):
+        self.size = size
+        self.block = os.urandom(block)
+        md5 = hashlib.md5()
+        for offset in range(0, size, block):
+            md5.update(self.block[:min(block, size - offset)])
+        self.md5 = "0" * 32 if bad_md5 else md5.hexdigest()
+        self.replies = queue.Queue()
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            with conn:
+                conn.sendall(f"/f/b{self.size + 50:10d}{self.md5}".encode())
+                for offset in range(0, self.size, len(self.block)):
+                    conn.sendall(self.block[:min(len(self.block), self.size - offset)])
+                conn.sendall(b"/b/f")
+                self.replies.put(conn.recv(16))
+
+    def close(self):
+        self.listener.close()
+
+
+class DownloadProxy:
+    def FileDownload(self, file_type, file_name):
+        return 0
+
+
+def legacy_file_download(rpc, file_type, file_name, save_path):
+    """The receive loop __FileDownLoad used to run: 50 MB preallocated, 1 kB recv, header re-checked per chunk."""
+    rpc.robot.FileDownload(file_type, file_name)
+    client = socket.create_connection((rpc.ip_address, rpc.FILE_DOWNLOAD_PORT), timeout=2)
+    total_buffer = bytearray(1024 * 1024 * 50)
+    total_size = 0
+    recv_md5 = ""
+    recv_size = 0
+    find_head_flag = False
+    while True:
+        buffer = client.recv(1024)
+        if len(buffer) < 1:
+            return -1
+        total_buffer[total_size:total_size + len(buffer)] = buffer
+        total_size += len(buffer)
+        if not find_head_flag and total_size > 4 and total_buffer[:4].decode('utf-8') == "/f/b":
+            find_head_flag = True
+        if find_head_flag and total_size > 14 + 32:
+            recv_size = int(total_buffer[4:14].decode('utf-8'))
+            recv_md5 = total_buffer[14:46].decode('utf-8')
+        if find_head_flag and total_size == recv_size:
+            break
+    file_buffer = total_buffer[14 + 32:total_size - 4]
+    with open(os.path.join(save_path, file_name), 'wb') as file_writer:
+        file_writer.write(file_buffer[:total_size - 16 - 32 - 2])
+    ok = calculate_file_md5(os.path.join(save_path, file_name)) == recv_md5
+    client.send(b"SUCCESS" if ok else b"FAIL")
+    client.close()
+    return 0 if ok else -1
+
+
+def bench_file_download(sizes=(40, 200), directory="bench_download"):
+    """Throughput and peak Python allocation of LuaDownLoad over loopback, legacy loop versus streaming."""
+    print("file download over loopback: throughput and peak traced allocation")
+    os.makedirs(directory, exist_ok=True)
+    rpc = make_replay_rpc([])
+    rpc.robot = DownloadProxy()
+    variants = [("legacy", lambda: legacy_file_download(rpc, 0, "bench.lua", directory)),
+                ("current", lambda: rpc.LuaDownLoad("bench.lua", directory))]
+    for size_mb in sizes:
+        server = DownloadServer(size_mb * 1024 * 1024)
+        rpc.FILE_DOWNLOAD_PORT = server.port
+        for label, download in variants:
+            if label == "legacy" and size_mb >= 50:
+                print(f"  {size_mb:>4} MB  {label:<7} not supported (50 MB buffer)")
+                continue
+            start = time.perf_counter()
+            assert download() == 0
+            elapsed = time.perf_counter() - start
+            tracemalloc.start()
+            assert download() == 0
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  {size_mb:>4} MB  {label:<7} {size_mb / elapsed:8.1f} MB/s  peak {peak / 1024 / 1024:7.2f} MB")
+        server.close()
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+class UploadServer:
+    """Accepts /f/b framed uploads on an ephemeral loopback port, verifies the MD5 and answers like the controller."""
+
+    def __init__(self):
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        buffer = bytearray(1024 * 1024)
+        view = memoryview(buffer)
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            with conn:
+                head = b""
+                while len(head) < 46:
+                    head += conn.recv(46 - len(head))
+                remaining = int(head[4:14]) - 46
+                md5 = hashlib.md5()
+                while remaining > 0:
+                    length = conn.recv_into(view[:min(remaining, len(buffer))])
+                    if remaining > 4:
+                        md5.update(view[:min(length, remaining - 4)])
+                    remaining -= length
+                conn.sendall(b"SUCCESS" if md5.hexdigest() == head[14:46].decode() else b"FAIL")
+
+    def close(self):
+        self.listener.close()
+
+
+class UploadProxy:
+    def FileUpload(self, file_type, file_name):
+        return 0
+
+    def LuaUpLoadUpdate(self, file_name):
+        return [0, ""]
+
+
+def legacy_file_upload(rpc, file_type, file_path):
+    """The send loop __FileUpLoad used to run: MD5 pass, 2 MB reads, unchecked send, fixed 0.5 s sleep."""
+    rpc.robot.FileUpload(file_type, os.path.basename(file_path))
+    client = socket.create_connection((rpc.ip_address, rpc.FILE_UPLOAD_PORT), timeout=20)
+    total_size = os.path.getsize(file_path) + 46 + 4
+    client.send(f"/f/b{total_size:10d}{calculate_file_md5(file_path)}".encode('utf-8'))
+    with open(file_path, "rb") as f:
+        while data := f.read(2 * 1024 * 1024):
+            client.sendall(data)  # send() here would drop the unsent tail of each chunk
+    client.send(b"/b/f")
+    time.sleep(0.5)
+    result_buf = client.recv(1024)
+    client.close()
+    return 0 if result_buf[:7] == b"SUCCESS" else -1
+
+
+def bench_file_upload(sizes=(1, 200), directory="bench_upload"):
+    """
+    Wall time of TrajectoryJUpLoad over loopback, legacy loop versus cached MD5 + sendfile.
+    "cold" is the first upload of a new file (MD5 not cached yet), "warm" re-uploads it unchanged.
+    """
+    print("file upload over loopback: wall time per upload, cold (first upload) and warm (unchanged file)")
+    os.makedirs(directory, exist_ok=True)
+    rpc = make_replay_rpc([])
+    rpc.robot = UploadProxy()
+    server = UploadServer()
+    rpc.FILE_UPLOAD_PORT = server.port
+    for size_mb in sizes:
+        path = os.path.join(directory, f"traj_{size_mb}.txt")
+        with open(path, "wb") as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1024 * 1024))
+        for label, upload in [("legacy", lambda: legacy_file_upload(rpc, 20, path)),
+                              ("current", lambda: rpc.TrajectoryJUpLoad(path))]:
+            timings = []
+            for _ in range(2):
+                start = time.perf_counter()
+                assert upload() == 0
+                timings.append(time.perf_counter() - start)
+            cold, warm = timings
+            print(f"  {size_mb:>4} MB  {label:<7} cold {cold * 1e3:8.1f} ms {size_mb / cold:8.1f} MB/s  "
+                  f"warm {warm * 1e3:8.1f} ms {size_mb / warm:8.1f} MB/s")
+        os.remove(path)
+    server.close()
+    os.rmdir(directory)
+
+
+
+def parse_chunks(chunks, size=RPC.BUFFER_SIZE):
+    """Feed chunks through StateRecvBuffer and RobotStateParser the way the receive thread does."""
+    recv_buffer = StateRecvBuffer(size)
+    parser = RobotStateParser()
+    frames = []
+    for chunk in chunks:
+        view = recv_buffer.recv_view()
+        view[:len(chunk)] = chunk
+        recv_buffer.commit(len(chunk))
+        recv_buffer.parse(parser, lambda offset, frame_len: frames.append(bytes(recv_buffer.buf[offset:offset + frame_len])))
+    return frames, parser
+
+
+def check_state_parser(frame_count=3000):
+    """Every frame of a chunked stream is decoded once, in order, and the published state is the last frame."""
+    frame_len = len(make_frame(0))
+    frames = [make_frame(i) for i in range(frame_count)]
+    chunks = split_stream(b"".join(frames), frame_len, random.Random(1))
+    decoded, parser = parse_chunks(chunks)
+    assert decoded == frames and parser.checksum_errors == 0
+
+    _, rpc = run_state_loop(RPC.robot_state_routine_thread, chunks)
+    state = rpc.state_buffer.snapshot().state
+    last = RobotStatePkg.from_buffer_copy(frames[-1][:sizeof(RobotStatePkg)])
+    assert rpc.state_parser.frame_count == frame_count
+    assert state.frame_cnt == last.frame_cnt and list(state.jt_cur_pos) == list(last.jt_cur_pos)
+    print(f"  state parser: {frame_count} frames decoded in order, snapshot matches the last frame")
+
+
+def check_state_resync(frame_count=3000):
+    """The parser drops garbage, bad checksums and truncated frames and resumes on the next valid frame."""
+    rng = random.Random(2)
+    frame_len = len(make_frame(0))
+    stream = bytearray()
+    expected = []
+    for i in range(frame_count):
+        frame = make_frame(i)
+        damage = i % 10
+        if damage == 3:
+            # garbage that cannot contain a frame head
+            stream += bytes(rng.choice(range(0x5A)) for _ in range(rng.randint(1, 64)))
+        elif damage == 5:
+            # corrupted checksum
+            frame = frame[:-1] + bytes([frame[-1] ^ 0xFF])
+        elif damage == 7:
+            # frame cut off mid-body, the next frame follows immediately
+            frame = frame[:rng.randint(6, frame_len - 1)]
+        elif damage == 9:
+            # stray head bytes
+            stream += b"\x5a"
+        stream += frame
+        if damage not in (5, 7):
+            expected.append(frame)
+    # a false head found while resyncing may claim up to 64 kB, clean frames at the end let it complete
+    for i in range(frame_count, frame_count + StateRecvBuffer.MAX_FRAME_LEN // frame_len + 1):
+        stream += make_frame(i)
+        expected.append(make_frame(i))
+    decoded, parser = parse_chunks(split_stream(bytes(stream), frame_len, rng))
+    assert decoded == expected, "resync lost or invented frames"
+    assert parser.checksum_errors >= frame_count // 10
+    print(f"  state resync: all {len(expected)} intact frames recovered, "
+          f"{parser.checksum_errors} checksum errors")
+
+
+def check_download_md5(size=256 * 1024, directory="bench_check"):
+    """A download whose MD5 does not match is answered FAIL and leaves the existing file untouched."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "check.lua")
+    with open(path, "wb") as f:
+        f.write(b"original")
+    rpc = make_replay_rpc([])
+    rpc.robot = DownloadProxy()
+    try:
+        server = DownloadServer(size, bad_md5=True)
+        rpc.FILE_DOWNLOAD_PORT = server.port
+        assert rpc.LuaDownLoad("check.lua", directory) == RobotError.ERR_DOWN_LOAD_FILE_FAILED
+        server.close()
+        with open(path, "rb") as f:
+            assert f.read() == b"original"
+        assert os.listdir(directory) == ["check.lua"], "temporary file left behind"
+        assert server.replies.get(timeout=2) == b"FAIL"
+
+        server = DownloadServer(size)
+        rpc.FILE_DOWNLOAD_PORT = server.port
+        assert rpc.LuaDownLoad("check.lua", directory) == 0
+        server.close()
+        assert calculate_file_md5(path) == server.md5 and server.replies.get(timeout=2) == b"SUCCESS"
+    finally:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+    print("  file download: MD5 mismatch answered FAIL, existing file kept; matching MD5 replaces it")
+
+
+def run_checks():
+    """Loopback correctness checks for the paths the benchmarks time."""
+    print("correctness checks")
+    check_state_parser()
+    check_state_resync()
+    check_download_md5()
+
+
+BENCHMARKS = {
+    "state_parser": bench_state_parser,
+    "state_recv": bench_state_recv,
+    "log_call": bench_log_call,
+    "log_pipeline": bench_log_pipeline,
+    "servo_stream": bench_servo_stream,
+    "file_download": bench_file_download,
+    "file_upload": bench_file_upload,
+    "check": run_checks,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -1,18 +1,39 @@
 import xmlrpc.client
+import http.client
+import errno
 import os
+import asyncio
+import inspect
 import socket
+import selectors
 import hashlib
 import time
 from datetime import datetime
 import logging
 from functools import wraps
 from logging.handlers import RotatingFileHandler
-from queue import Queue
+from queue import Queue, Empty
 import threading
 import struct
+import random
 import sys
 import ctypes
 from ctypes import *
+import gc
+import json
+import mmap
+from collections import namedtuple, deque, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # from Cython.Compiler.Options import error_on_unknown_names
 
@@ -136,39 +157,1460 @@ class RobotStatePkg(Structure):
         ("check_sum", c_ushort)]  # 校验和
 
 
-class BufferedFileHandler(RotatingFileHandler):
-    def __init__(self, filename, mode='a', maxBytes=0, backupCount=0, encoding=None, delay=False):
-        super().__init__(filename, mode, maxBytes, backupCount, encoding, delay)
-        self.buffer = []
+class RobotStateParser:
+    """20004端口状态帧解析器：按帧头整段查找，按data_len整帧校验，不再逐字节处理"""
+    FRAME_HEAD = b"\x5a\x5a"
+    HEAD_LEN = 5  # 帧头2字节 + 帧计数1字节 + 数据长度2字节
+    CHECKSUM_LEN = 2
 
-    def emit(self, record):
-        # log_entry = self.format(record)  # 格式化日志记录
-        # print(log_entry)  # 打印日志条目
-        if RPC.log_output_model == 2:
-            RPC.queue.put(record)
+    def __init__(self):
+        self.frame_count = 0  # 校验通过的帧数
+        self.checksum_errors = 0  # 校验失败的帧数
+
+    def parse(self, buf, start, end, on_frame):
+        """
+        解析buf[start:end]中的完整帧，每个校验通过的帧调用on_frame(offset, frame_len)
+        返回未消费数据的起始位置（不完整帧留待下次接收后继续解析）
+        """
+        view = memoryview(buf)
+        pos = start
+        try:
+            while True:
+                head = buf.find(self.FRAME_HEAD, pos, end)
+                if head < 0:
+                    # 末尾单个0x5A可能是被截断的帧头
+                    if end > pos and buf[end - 1] == 0x5A:
+                        return end - 1
+                    return end
+                if head + self.HEAD_LEN > end:
+                    return head
+                data_len = buf[head + 3] | (buf[head + 4] << 8)
+                body_end = head + self.HEAD_LEN + data_len
+                if body_end + self.CHECKSUM_LEN > end:
+                    return head
+                checkdata = buf[body_end] | (buf[body_end + 1] << 8)
+                if sum(view[head:body_end]) == checkdata:
+                    self.frame_count += 1
+                    on_frame(head, body_end + self.CHECKSUM_LEN - head)
+                    pos = body_end + self.CHECKSUM_LEN
+                else:
+                    # 校验失败，从帧头的下一个字节重新同步（帧头前多出的0x5A不会跳过真正的帧头）
+                    self.checksum_errors += 1
+                    pos = head + 1
+        finally:
+            view.release()
+
+
+class StateRecvBuffer:
+    """
+    20004端口预分配环形接收缓冲区
+    recv_into直接写入写指针处，帧在缓冲区内原地解析；尾部空间不足时仅将残留的不完整帧搬回缓冲区头部
+    """
+    MAX_FRAME_LEN = RobotStateParser.HEAD_LEN + 0xFFFF + RobotStateParser.CHECKSUM_LEN
+
+    def __init__(self, size):
+        if size < 4 * self.MAX_FRAME_LEN:
+            raise ValueError("接收缓冲区至少需要 %d 字节" % (4 * self.MAX_FRAME_LEN))
+        self.size = size
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.read_pos = 0  # 未解析数据起始位置
+        self.write_pos = 0  # 下一次recv_into写入位置
+        self.bytes_received = 0
+        self.bytes_copied = 0  # 搬移残留帧复制的字节数
+        self.wraps = 0
+        self._c_buf = (c_char * size).from_buffer(self.buf)
+        self.address = addressof(self._c_buf)  # 缓冲区首地址，供memmove直接拷贝帧内字段
+
+    def reset(self):
+        """丢弃缓冲区中的数据，重连后使用"""
+        self.read_pos = 0
+        self.write_pos = 0
+
+    def recv_from(self, sock):
+        """从socket接收数据到写指针处，返回接收字节数"""
+        recvbyte = sock.recv_into(self.recv_view())
+        self.commit(recvbyte)
+        return recvbyte
+
+    def recv_view(self):
+        """下一次接收的目标区域，尾部空间不足一帧时先搬移残留帧"""
+        if self.size - self.write_pos < self.MAX_FRAME_LEN:
+            self._wrap()
+        return self.view[self.write_pos:]
+
+    def commit(self, recvbyte):
+        """确认recv_view()中新接收的字节数"""
+        if recvbyte > 0:
+            self.write_pos += recvbyte
+            self.bytes_received += recvbyte
+
+    def parse(self, parser, on_frame):
+        """解析缓冲区中所有完整帧，on_frame(offset, frame_len)的偏移量相对于self.buf"""
+        self.read_pos = parser.parse(self.buf, self.read_pos, self.write_pos, on_frame)
+        if self.read_pos == self.write_pos:
+            self.read_pos = self.write_pos = 0
+
+    def _wrap(self):
+        # 残留数据小于一帧，而读指针已接近缓冲区尾部，源与目标区域不会重叠
+        pending = self.write_pos - self.read_pos
+        if pending > 0:
+            self.buf[:pending] = self.view[self.read_pos:self.write_pos]
+            self.bytes_copied += pending
+        self.read_pos = 0
+        self.write_pos = pending
+        self.wraps += 1
+
+
+"""   
+@brief  机器人状态快照
+@param  seq 接收线程发布的帧序号，单调递增
+@param  frame_cnt 控制器帧计数
+@param  recv_time 接收时间戳，time.time()
+@param  state 该帧完整的RobotStatePkg副本
+"""
+RobotStateSnapshot = namedtuple("RobotStateSnapshot", ["seq", "frame_cnt", "recv_time", "state"])
+
+
+class StateDoubleBuffer:
+    """
+    机器人状态双缓冲区：接收线程写入非当前槽位后递增序号发布，读取方无锁拷贝当前槽位，
+    若拷贝期间写线程已开始覆盖该槽位则重试，保证读取到的所有字段来自同一帧
+    """
+
+    def __init__(self):
+        size = sizeof(RobotStatePkg)
+        self._slots = (bytearray(size), bytearray(size))
+        self._recv_times = [0.0, 0.0]
+        self._writing = 0  # 正在写入的序号
+        self.seq = 0  # 已发布的序号
+
+    def publish(self, view, offset, frame_len, recv_time):
+        """发布一帧，view为接收缓冲区的memoryview"""
+        seq = self.seq + 1
+        slot = self._slots[seq & 1]
+        data_len = min(frame_len - RobotStateParser.CHECKSUM_LEN, len(slot))
+        self._writing = seq
+        slot[:data_len] = view[offset:offset + data_len]
+        if data_len < len(slot):
+            slot[data_len:] = bytes(len(slot) - data_len)
+        self._recv_times[seq & 1] = recv_time
+        self.seq = seq
+
+    def snapshot(self):
+        """获取最新一帧的完整快照"""
+        while True:
+            seq = self.seq
+            state = RobotStatePkg.from_buffer_copy(self._slots[seq & 1])
+            recv_time = self._recv_times[seq & 1]
+            # 写线程尚未开始写seq+2(与本槽位相同)，拷贝有效
+            if self._writing - seq < 2:
+                return RobotStateSnapshot(seq, state.frame_cnt, recv_time, state)
+
+
+class StateHistory:
+    """
+    实时状态历史环形缓冲区(需要numpy)
+    预分配2倍容量的结构化数组，每帧同时写入i和i+capacity两个位置，任意不超过容量的最近窗口都是连续内存，
+    查询返回零拷贝视图；视图与环形缓冲区共享内存，超过capacity帧后会被新数据覆盖，需长期保存时请调用copy()
+    """
+    FIELDS = ("jt_cur_pos", "actual_qd", "actual_qdd", "jt_cur_tor", "jt_tgt_tor", "jointDriverTorque")
+
+    def __init__(self, capacity, fields=FIELDS):
+        if np is None:
+            raise ImportError("StateHistory 需要安装 numpy")
+        capacity = int(capacity)
+        if capacity <= 0:
+            raise ValueError("capacity 必须大于0")
+        frame_dtype = np.dtype(RobotStatePkg)
+        self.capacity = capacity
+        self.dtype = np.dtype([("seq", np.int64), ("recv_time", np.float64)] +
+                              [(name, frame_dtype.fields[name][0]) for name in fields])
+        self._frames = np.zeros(2 * capacity, dtype=self.dtype)
+        self._seq = self._frames["seq"]
+        self._recv_time = self._frames["recv_time"]
+        base = self._frames.ctypes.data
+        # (目标偏移, 帧内偏移, 字节数)
+        self._copies = [(self.dtype.fields[name][1], frame_dtype.fields[name][1], frame_dtype.fields[name][0].itemsize)
+                        for name in fields]
+        self._base = base
+        self._mirror = base + capacity * self.dtype.itemsize
+        self.count = 0  # 累计写入帧数
+
+    def append(self, frame_addr, frame_len, seq, recv_time):
+        """在接收线程中调用，frame_addr为帧在接收缓冲区中的地址；帧长不足时缺少的字段部分补0"""
+        index = self.count % self.capacity
+        row = index * self.dtype.itemsize
+        data_len = frame_len - RobotStateParser.CHECKSUM_LEN
+        for dst, src, size in self._copies:
+            valid = min(size, max(0, data_len - src))
+            if valid:
+                memmove(self._base + row + dst, frame_addr + src, valid)
+                memmove(self._mirror + row + dst, frame_addr + src, valid)
+            if valid < size:
+                memset(self._base + row + dst + valid, 0, size - valid)
+                memset(self._mirror + row + dst + valid, 0, size - valid)
+        self._seq[index] = self._seq[index + self.capacity] = seq
+        self._recv_time[index] = self._recv_time[index + self.capacity] = recv_time
+        self.count += 1
+
+    def _window(self, length):
+        """最近length帧的连续视图"""
+        count = self.count
+        length = min(length, count, self.capacity)
+        end = (count - 1) % self.capacity + 1 + self.capacity if count else 0
+        return self._frames[end - length:end]
+
+    def latest(self, n):
+        """最近n帧"""
+        return self._window(int(n))
+
+    def history(self, seconds):
+        """最近seconds秒内接收的帧(以最新一帧的接收时间为准)"""
+        window = self._window(self.capacity)
+        if len(window) == 0:
+            return window
+        times = window["recv_time"]
+        start = np.searchsorted(times, times[-1] - seconds, side="left")
+        return window[start:]
+
+    def since(self, seq):
+        """序号大于seq的帧，seq取自RobotStateSnapshot.seq或本缓冲区返回的seq字段"""
+        window = self._window(self.capacity)
+        start = np.searchsorted(window["seq"], seq, side="right")
+        return window[start:]
+
+
+class StateRecorder:
+    """
+    实时状态列式记录器(需要numpy)
+    接收线程只把帧拷贝到预分配的暂存块中，写满一块后交给写线程按列转置并追加写入文件，接收线程不做任何磁盘IO；
+    写线程落后导致暂存块用尽时丢弃整块并计入dropped_frames
+    文件格式：文件头 MAGIC + uint32头长度 + JSON(列名与dtype，以空格补齐使文件头总长为8的倍数)，随后为若干数据块，
+    每块为 CHUNK_HEADER(帧数, 首末seq, 首末接收时间) + 逐列连续数据(每列按8字节对齐)；
+    追加到已有文件时列名与dtype必须与当前版本一致，否则抛出ValueError，末尾不完整的数据块被截掉
+    """
+    MAGIC = b"FRSTATE1"
+    CHUNK_MAGIC = b"CHNK"
+    CHUNK_HEADER = struct.Struct("<4sIqqdd")
+
+    def __init__(self, path, chunk_frames=1000, spare_chunks=4):
+        if np is None:
+            raise ImportError("StateRecorder 需要安装 numpy")
+        self.path = path
+        self.chunk_frames = int(chunk_frames)
+        self.frame_dtype = np.dtype(RobotStatePkg)
+        self.frame_size = self.frame_dtype.itemsize
+        self.columns = [("seq", np.dtype(np.int64)), ("recv_time", np.dtype(np.float64))] + \
+                       [(name, self.frame_dtype.fields[name][0]) for name in self.frame_dtype.names]
+        self.frames = 0  # 已交给写线程的帧数
+        self.dropped_frames = 0
+        self.chunks_written = 0
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._check_existing(path)
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            header = json.dumps({"version": 1, "columns": [[name, np.lib.format.dtype_to_descr(dtype.base),
+                                                            list(dtype.shape)]
+                                                           for name, dtype in self.columns]}).encode("utf-8")
+            header += b" " * (-(len(self.MAGIC) + 4 + len(header)) % 8)
+            self._file.write(self.MAGIC + struct.pack("<I", len(header)) + header)
+            self._file.flush()
+        self._free = Queue()
+        for _ in range(spare_chunks):
+            self._free.put(self._new_chunk())
+        self._full = Queue()
+        self._chunk = self._free.get()
+        self._lock = threading.Lock()  # 仅与close()互斥，接收线程正常情况下不会等待
+        self._closed = False
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def _check_existing(self, path):
+        """追加前检查已有文件的列与当前版本一致，并截掉末尾不完整的数据块"""
+        recording = StateRecording(path)
+        try:
+            if recording.columns != self.columns:
+                raise ValueError("记录文件的列或数据类型与当前版本不一致，不能追加: %s" % path)
+            end = recording.data_end
+        finally:
+            recording.close()
+        if end < os.path.getsize(path):
+            os.truncate(path, end)
+
+    def _new_chunk(self):
+        frames = bytearray(self.chunk_frames * self.frame_size)
+        c_frames = (c_char * len(frames)).from_buffer(frames)
+        return {"frames": frames, "address": addressof(c_frames), "c_frames": c_frames,
+                "seq": np.zeros(self.chunk_frames, np.int64),
+                "recv_time": np.zeros(self.chunk_frames, np.float64), "count": 0}
+
+    def append(self, frame_addr, frame_len, seq, recv_time):
+        """在接收线程中调用，只做内存拷贝"""
+        with self._lock:
+            if not self._closed:
+                self._append(frame_addr, frame_len, seq, recv_time)
+
+    def _append(self, frame_addr, frame_len, seq, recv_time):
+        chunk = self._chunk
+        if chunk is None:
+            # 写线程落后，暂存块用尽
+            try:
+                chunk = self._chunk = self._free.get_nowait()
+            except Empty:
+                self.dropped_frames += 1
+                return
+        index = chunk["count"]
+        dst = chunk["address"] + index * self.frame_size
+        size = min(frame_len - RobotStateParser.CHECKSUM_LEN, self.frame_size)
+        memmove(dst, frame_addr, size)
+        if size < self.frame_size:
+            memset(dst + size, 0, self.frame_size - size)
+        chunk["seq"][index] = seq
+        chunk["recv_time"][index] = recv_time
+        chunk["count"] = index + 1
+        if index + 1 == self.chunk_frames:
+            self._submit()
+
+    def _submit(self):
+        chunk = self._chunk
+        self.frames += chunk["count"]
+        self._full.put(chunk)
+        try:
+            self._chunk = self._free.get_nowait()
+        except Empty:
+            self._chunk = None
+
+    def _write_loop(self):
+        while True:
+            chunk = self._full.get()
+            if chunk is None:
+                break
+            self._write_chunk(chunk)
+            chunk["count"] = 0
+            self._free.put(chunk)
+
+    def _write_chunk(self, chunk):
+        count = chunk["count"]
+        if count == 0:
+            return
+        frames = np.frombuffer(chunk["frames"], dtype=self.frame_dtype, count=count)
+        times = chunk["recv_time"]
+        parts = [self.CHUNK_HEADER.pack(self.CHUNK_MAGIC, count, int(chunk["seq"][0]), int(chunk["seq"][count - 1]),
+                                        float(times[0]), float(times[count - 1]))]
+        for name, dtype in self.columns:
+            column = chunk[name][:count] if name in ("seq", "recv_time") else frames[name]
+            data = np.ascontiguousarray(column).tobytes()
+            parts.append(data)
+            parts.append(bytes(-len(data) % 8))
+        self._file.write(b"".join(parts))
+        self._file.flush()
+        self.chunks_written += 1
+
+    def close(self):
+        """写出未满的暂存块并关闭文件"""
+        with self._lock:
+            self._closed = True
+            if self._chunk is not None and self._chunk["count"] > 0:
+                self._submit()
+        self._full.put(None)
+        self._thread.join()
+        self._file.close()
+
+
+class StateRecording:
+    """
+    读取StateRecorder生成的记录文件(需要numpy)
+    文件以mmap只读映射，单个数据块内的列为零拷贝视图，跨块查询时按块时间索引只拼接命中的块
+    """
+
+    def __init__(self, path):
+        if np is None:
+            raise ImportError("StateRecording 需要安装 numpy")
+        self._fd = open(path, "rb")
+        self._mm = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ)
+        magic_len = len(StateRecorder.MAGIC)
+        if self._mm[:magic_len] != StateRecorder.MAGIC:
+            raise ValueError("不是机器人状态记录文件: %s" % path)
+        header_len = struct.unpack_from("<I", self._mm, magic_len)[0]
+        header = json.loads(bytes(self._mm[magic_len + 4:magic_len + 4 + header_len]).decode("utf-8"))
+        self.columns = []
+        for name, descr, shape in header["columns"]:
+            dtype = np.lib.format.descr_to_dtype(self._descr_from_json(descr))
+            self.columns.append((name, np.dtype((dtype, tuple(shape))) if shape else dtype))
+        self.chunks = []  # (数据偏移, 帧数, 首seq, 末seq, 首时间, 末时间)
+        offset = magic_len + 4 + header_len
+        header_size = StateRecorder.CHUNK_HEADER.size
+        while offset + header_size <= len(self._mm):
+            magic, count, seq_first, seq_last, t_first, t_last = StateRecorder.CHUNK_HEADER.unpack_from(self._mm, offset)
+            size = sum(self._column_size(dtype, count) for _, dtype in self.columns)
+            if magic != StateRecorder.CHUNK_MAGIC or offset + header_size + size > len(self._mm):
+                break  # 末尾不完整的数据块(例如记录中断)
+            self.chunks.append((offset + header_size, count, seq_first, seq_last, t_first, t_last))
+            offset += header_size + size
+        self.data_end = offset  # 最后一个完整数据块的结束位置
+
+    @staticmethod
+    def _descr_from_json(descr):
+        """JSON中的结构体描述还原为numpy descr(列表转回元组)"""
+        if isinstance(descr, str):
+            return descr
+        fields = []
+        for field in descr:
+            name, fmt = field[0], StateRecording._descr_from_json(field[1])
+            fields.append((name, fmt, tuple(field[2])) if len(field) > 2 else (name, fmt))
+        return fields
+
+    @staticmethod
+    def _column_size(dtype, count):
+        size = dtype.itemsize * count
+        return size + (-size % 8)
+
+    def __len__(self):
+        return sum(chunk[1] for chunk in self.chunks)
+
+    def chunk(self, index):
+        """第index个数据块的全部列，零拷贝"""
+        offset, count = self.chunks[index][:2]
+        result = {}
+        for name, dtype in self.columns:
+            result[name] = np.frombuffer(self._mm, dtype=dtype, count=count, offset=offset)
+            offset += self._column_size(dtype, count)
+        return result
+
+    def read(self, names=None, t_start=None, t_end=None):
+        """
+        按列读取，返回{列名: 数组}
+        @param names 需要的列名，默认全部
+        @param t_start, t_end 接收时间范围，按块时间索引筛选数据块后再按帧筛选
+        """
+        if names is None:
+            names = [name for name, _ in self.columns]
+        selected = [i for i, chunk in enumerate(self.chunks)
+                    if (t_start is None or chunk[5] >= t_start) and (t_end is None or chunk[4] <= t_end)]
+        parts = [self.chunk(i) for i in selected]
+        if not parts:
+            return {name: np.zeros(0, dtype=dict(self.columns)[name]) for name in names}
+        times = parts[0]["recv_time"] if len(parts) == 1 else np.concatenate([part["recv_time"] for part in parts])
+        mask = None
+        if t_start is not None or t_end is not None:
+            mask = np.ones(len(times), dtype=bool)
+            if t_start is not None:
+                mask &= times >= t_start
+            if t_end is not None:
+                mask &= times <= t_end
+        result = {}
+        for name in names:
+            column = parts[0][name] if len(parts) == 1 else np.concatenate([part[name] for part in parts])
+            result[name] = column if mask is None else column[mask]
+        return result
+
+    def close(self):
+        self._mm.close()
+        self._fd.close()
+
+
+class RobotMotionError(Exception):
+    """
+    运动指令失败：指令返回错误码，或执行期间控制器报主故障/碰撞
+    @param  error 指令返回的错误码，执行期间失败时为0
+    @param  main_code 主故障码
+    @param  sub_code 子故障码
+    @param  collision 碰撞状态
+    """
+
+    def __init__(self, message, error=0, main_code=0, sub_code=0, collision=0):
+        super().__init__(message)
+        self.error = error
+        self.main_code = main_code
+        self.sub_code = sub_code
+        self.collision = collision
+
+
+class _TrackedMotion:
+    """MotionTracker中的一条运动指令"""
+    __slots__ = ("future", "name", "accepted", "started", "idle_seen", "queue_peak", "queue_raised")
+
+    def __init__(self, future, name, motion_done, queue_len):
+        self.future = future
+        self.name = name
+        self.accepted = False  # 控制器已接受
+        self.started = False  # 已观察到开始执行
+        self.idle_seen = motion_done == 1  # 登记后出现过motion_done为1的帧
+        self.queue_peak = queue_len  # 登记后mc_queue_len的最大值
+        self.queue_raised = False  # mc_queue_len曾高于登记时的值
+
+
+class MotionTracker:
+    """
+    运动完成跟踪：运动指令在下发前按提交顺序登记，记录下发前一帧的motion_done与mc_queue_len，
+    控制器接受后参与完成判断，由状态接收线程逐帧判断：
+    1. main_code 或 collisionState 非零时，所有未完成指令立即失败；
+    2. 登记后观察到 motion_done 由1变为0，或 mc_queue_len 先升高再降低，视为该指令已开始；
+       较晚的指令已开始时较早的指令也视为已开始；没有观察到开始的指令(如零位移运动)不会完成，需要时对Future设置超时；
+    3. 运动中 trajectory_pnum 变化或 mc_queue_len 减少时，最早的已开始指令已交接给后续指令，判为完成，
+       最后一条指令不据此判断；
+    4. motion_done 为1且 mc_queue_len 为0时，所有已开始的指令完成。
+    跟踪期间运动队列中不应混入未经跟踪提交的运动指令，否则完成判断会提前或推迟。
+    """
+
+    _FIELDS = {name: (getattr(RobotStatePkg, name).offset, struct.Struct(fmt)) for name, fmt in (
+        ("main_code", "<i"), ("sub_code", "<i"), ("motion_done", "<i"),
+        ("mc_queue_len", "<i"), ("collisionState", "<b"), ("trajectory_pnum", "<i"))}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._commands = []  # [_TrackedMotion]，已接受的指令在前，只有最后一条可能尚未接受
+        self._last_pnum = None
+        self.pending = 0  # 未完成指令数，接收线程据此跳过空闲帧
+        self.completed = 0
+        self.failed = 0
+        self.dispatch = None  # 设置Future结果的执行方式 dispatch(func)，None为在接收线程中直接执行
+
+    def _finish(self, action):
+        # Future的完成回调随set_result执行，多台机器人共用接收线程时交给dispatch执行
+        if self.dispatch is None:
+            action()
         else:
-            self.buffer.append(record)
-            if len(self.buffer) >= 50:
-                for r in self.buffer:
-                    super().emit(r)
-                self.buffer = []
+            self.dispatch(action)
+
+    def add(self, future, name, motion_done, queue_len):
+        """
+        下发运动指令前登记，登记后的状态帧用于判断指令是否开始
+        @param  motion_done, queue_len 下发前最新一帧的 motion_done 与 mc_queue_len
+        @return 登记的指令，控制器接受后调用accept()，下发失败时调用discard()
+        """
+        command = _TrackedMotion(future, name, motion_done, queue_len)
+        with self._lock:
+            self._commands.append(command)
+            self.pending = len(self._commands)
+        return command
+
+    def accept(self, command):
+        """控制器已接受指令"""
+        with self._lock:
+            command.accepted = True
+
+    def discard(self, command):
+        """
+        下发失败，取消登记
+        @return False-指令已因故障或连接关闭失败
+        """
+        with self._lock:
+            if command not in self._commands:
+                return False
+            self._commands.remove(command)
+            self.pending = len(self._commands)
+        return True
 
+    def _field(self, view, offset, name):
+        field_offset, fmt = self._FIELDS[name]
+        return fmt.unpack_from(view, offset + field_offset)[0]
+
+    def on_state(self, view, offset, recv_time):
+        """状态接收线程每帧调用，view为接收缓冲区的memoryview"""
+        main_code = self._field(view, offset, "main_code")
+        collision = self._field(view, offset, "collisionState")
+        if main_code != 0 or collision != 0:
+            sub_code = self._field(view, offset, "sub_code")
+            with self._lock:
+                done, self._commands = self._commands, []
+                self.pending = 0
+                self.failed += len(done)
+                self._last_pnum = None
+            def fail():
+                for command in done:
+                    command.future.set_exception(RobotMotionError(
+                        f"{command.name} 执行失败 main_code={main_code} sub_code={sub_code} collision={collision}",
+                        main_code=main_code, sub_code=sub_code, collision=collision))
+            self._finish(fail)
+            return
+
+        motion_done = self._field(view, offset, "motion_done")
+        queue_len = self._field(view, offset, "mc_queue_len")
+        pnum = self._field(view, offset, "trajectory_pnum")
+        moving = motion_done == 0 or queue_len > 0
+        with self._lock:
+            commands = self._commands
+            started = False
+            for command in reversed(commands):
+                if not command.started:
+                    if motion_done == 1:
+                        command.idle_seen = True
+                    elif command.idle_seen:
+                        command.started = True
+                    if queue_len > command.queue_peak:
+                        command.queue_peak = queue_len
+                        command.queue_raised = True
+                    elif command.queue_raised and queue_len < command.queue_peak:
+                        command.started = True
+                    command.started = command.started or started
+                started = command.started
+
+            accepted = len(commands) if not commands or commands[-1].accepted else len(commands) - 1
+            if moving:
+                handed_over = accepted - 1 - queue_len
+                if self._last_pnum is not None and pnum != self._last_pnum:
+                    handed_over = max(handed_over, 1)
+                self._last_pnum = pnum
+                limit = min(handed_over, accepted - 1)
+            else:
+                limit = accepted
+                self._last_pnum = None
+            count = 0
+            while count < limit and commands[count].started:
+                count += 1
+            if count == 0:
+                return
+            done, self._commands = commands[:count], commands[count:]
+            self.pending = len(self._commands)
+            self.completed += count
+
+        def complete():
+            for command in done:
+                command.future.set_result(0)
+        self._finish(complete)
+
+    def fail_all(self, error, message):
+        """使所有未完成指令失败，用于连接关闭"""
+        with self._lock:
+            done, self._commands = self._commands, []
+            self.pending = 0
+            self._last_pnum = None
+        for command in done:
+            command.future.set_exception(RobotMotionError(f"{command.name} {message}", error=error))
+
+
+class UpgradeWatcher:
+    """
+    软件升级进度跟踪：状态接收线程逐帧读取softwareUpgradeState，变化时记录并唤醒等待方，
+    不再按固定间隔查询；0为空闲或上传中，1~100为升级完成百分比，负数为升级失败
+    """
+
+    _STATE = (RobotStatePkg.softwareUpgradeState.offset, struct.Struct("<i"))
+
+    def __init__(self, callback=None, initial=None, dispatch=None):
+        """
+        @param  callback 升级状态变化时调用 callback(state)
+        @param  initial 发起升级前的升级状态，上一次升级遗留的状态不视为本次升级开始
+        @param  dispatch callback的执行方式 dispatch(func)，None为在状态接收线程中直接调用
+        """
+        self.callback = callback
+        self.initial = initial
+        self.dispatch = dispatch
+        self.state = None
+        self.history = []  # [(接收时间, 升级状态)]
+        self._cond = threading.Condition()
+
+    def on_state(self, view, offset, recv_time):
+        """状态接收线程每帧调用，view为接收缓冲区的memoryview"""
+        field_offset, fmt = self._STATE
+        state = fmt.unpack_from(view, offset + field_offset)[0]
+        if state == self.state:
+            return
+        with self._cond:
+            self.state = state
+            self.history.append((recv_time, state))
+            self._cond.notify_all()
+        if self.callback is not None:
+            if self.dispatch is None:
+                self.callback(state)
+            else:
+                self.dispatch(lambda: self.callback(state))
+
+    def wait(self, start_timeout=2.0, deadline=None):
+        """
+        等待升级开始并结束
+        @param  start_timeout 等待升级开始(状态非0)的时间，单位 [s]
+        @param  deadline time.monotonic()截止时间，None为一直等待
+        @return 错误码 成功-0  升级未开始- -1  超过截止时间- RobotError.ERR_RPC_ERROR  失败-升级状态
+        """
+        start_end = time.monotonic() + start_timeout
+        with self._cond:
+            while not self.state or (self.state == self.initial and not 0 < self.state < 100):
+                remaining = start_end - time.monotonic()
+                if remaining <= 0:
+                    return -1
+                self._cond.wait(remaining)
+            while 0 < self.state < 100:
+                if deadline is None:
+                    self._cond.wait()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return RobotError.ERR_RPC_ERROR
+                self._cond.wait(remaining)
+            return 0 if self.state == 100 else self.state
+
+
+class ServoStreamer:
+    """
+    ServoJ高频下发：ServoMoveStart后按绝对截止时间 t0 + k*cmdT 依次下发轨迹点，每个点先睡眠到
+    截止时间前spin_time，再自旋等待到截止时间，睡眠误差不会逐点累积；结束或stop()后ServoMoveEnd
+    统计下发抖动(实际下发时刻与截止时间之差)、超时(一次下发耗时超过cmdT，下一点已迟到)，
+    并将指令与状态接收线程的jt_cur_pos对比，估计跟随滞后与误差(需要numpy)
+    """
+
+    SPIN_TIME = 0.001  # 单位 [s]
+
+    def __init__(self, robot, cmdT=0.008, axis_pos=(0.0, 0.0, 0.0, 0.0), filterT=0.0, gain=0.0,
+                 spin_time=SPIN_TIME, max_lag=50):
+        """
+        @param  robot RPC对象
+        @param  cmdT 下发周期，单位 [s]，同时作为ServoJ的cmdT参数
+        @param  axis_pos 外部轴位置，整条轨迹不变
+        @param  spin_time 截止时间前的自旋等待时间，单位 [s]
+        @param  max_lag 估计跟随滞后时搜索的最大周期数
+        """
+        self.robot = robot
+        self.cmdT = cmdT
+        self.axis_pos = list(axis_pos)
+        self.filterT = filterT
+        self.gain = gain
+        self.spin_time = spin_time
+        self.max_lag = max_lag
+        self._stop = False
+
+    def stop(self):
+        """在其他线程中调用，下发完当前点后结束"""
+        self._stop = True
+
+    def wait_until(self, deadline):
+        """睡眠到deadline前spin_time，再自旋到deadline(time.perf_counter()时刻)"""
+        remaining = deadline - time.perf_counter() - self.spin_time
+        if remaining > 0:
+            time.sleep(remaining)
+        while time.perf_counter() < deadline:
+            pass
+
+    def run(self, trajectory):
+        """
+        下发整条轨迹
+        @param  trajectory 关节位置序列，单位 [°]，numpy数组(N×6)或逐点产生的可迭代对象(生成器)
+        @return 错误码 成功-0  失败-错误码
+        @return 统计 dict points 下发点数, duration 用时, jitter_mean/jitter_p99/jitter_max 下发抖动,
+                send_mean/send_max 单次ServoJ耗时, overruns 超时点数, tracking_lag 跟随滞后周期数,
+                tracking_rms/tracking_max 各关节跟随误差，单位 [s] 或 [°]
+        """
+        robot = self.robot
+        error = robot.ServoMoveStart()
+        if error != 0:
+            return error, None
+        self._stop = False
+        period = self.cmdT
+        jitters = []
+        send_times = []
+        commanded = []
+        actual = []
+        overruns = 0
+        error = 0
+        start = time.perf_counter()
+        deadline = start
+        try:
+            for point in trajectory:
+                if self._stop:
+                    break
+                self.wait_until(deadline)
+                sent = time.perf_counter()
+                state = robot.robot_state_pkg
+                ret = robot.ServoJ(point, self.axis_pos, cmdT=period, filterT=self.filterT, gain=self.gain)
+                finished = time.perf_counter()
+                if ret != 0:
+                    error = ret
+                    break
+                jitters.append(sent - deadline)
+                send_times.append(finished - sent)
+                commanded.append(list(point))
+                actual.append(list(state.jt_cur_pos))
+                deadline += period
+                if finished > deadline:
+                    overruns += 1
+        finally:
+            end_error = robot.ServoMoveEnd()
+        duration = time.perf_counter() - start
+        if error == 0:
+            error = end_error
+        return error, self._stats(jitters, send_times, commanded, actual, overruns, duration)
+
+    def _stats(self, jitters, send_times, commanded, actual, overruns, duration):
+        count = len(jitters)
+        stats = {"points": count, "duration": duration, "overruns": overruns}
+        if count == 0:
+            return stats
+        ordered = sorted(jitters)
+        stats.update({
+            "jitter_mean": sum(jitters) / count,
+            "jitter_p99": ordered[min(count - 1, count * 99 // 100)],
+            "jitter_max": ordered[-1],
+            "send_mean": sum(send_times) / count,
+            "send_max": max(send_times),
+        })
+        if np is not None:
+            # actual[k]为下发第k点时的实际位置，与lag个周期前的指令对比，取均方误差最小的lag
+            commanded = np.asarray(commanded, dtype=np.float64)
+            actual = np.asarray(actual, dtype=np.float64)
+            best = None
+            for lag in range(1, min(self.max_lag, count - 1) + 1):
+                diff = actual[lag:] - commanded[:-lag]
+                rms = np.sqrt(np.mean(diff * diff, axis=0))
+                if best is None or rms.sum() < best[1].sum():
+                    best = (lag, rms, np.abs(diff).max(axis=0))
+            if best is not None:
+                stats.update({"tracking_lag": best[0], "tracking_rms": best[1].tolist(),
+                              "tracking_max": best[2].tolist()})
+        return stats
+
+
+class TorqueControlLoop:
+    """
+    ServoJT力矩控制回路：ServoJTStart后由状态接收线程驱动，每次接收到新的状态帧即在接收线程中调用
+    control(jt_cur_pos, actual_qd, jt_cur_tor)，返回的6关节力矩交给专用的下发线程，经专用长连接以ServoJT下发，
+    返回None时本帧不下发；一次接收到多帧时只对最新一帧计算，下发期间新计算的力矩覆盖尚未下发的力矩，
+    接收线程不等待网络。ServoJT超过SEND_TIMEOUT未返回时视为连接异常，回路停止。
+    RobotFleet中多台机器人共用接收线程，control也在下发线程中执行，接收线程只读取状态。
+    统计从帧到达(recv返回)到ServoJT返回的端到端延迟及其分位数
+    """
+    SEND_TIMEOUT = 0.1  # 单次ServoJT的应答超时时间，单位 [s]
+
+    _FIELDS = {name: (getattr(RobotStatePkg, name).offset, struct.Struct(fmt)) for name, fmt in (
+        ("jt_cur_pos", "<6d"), ("actual_qd", "<6d"), ("jt_cur_tor", "<6d"),
+        ("safety_stop0_state", "<b"), ("safety_stop1_state", "<b"))}
+
+    def __init__(self, robot, control, interval=0.001, max_samples=100000):
+        """
+        @param  robot RPC对象
+        @param  control 控制函数 control(jt_cur_pos, actual_qd, jt_cur_tor) -> 6关节力矩(Nm)或None，
+                参数为tuple，单位 [°]、[°/s]、[Nm]；在接收线程中执行(RobotFleet中在下发线程中执行)，应尽快返回
+        @param  interval ServoJT指令周期，单位 [s]，范围[0.001~0.008]
+        @param  max_samples 保存的最大延迟样本数
+        """
+        self.robot = robot
+        self.control = control
+        self.interval = float(interval)
+        self.frames = 0  # 调用control的帧数
+        self.commands = 0  # 成功下发的指令数
+        self.skipped = 0  # control返回None的帧数
+        self.coalesced = 0  # 下发期间被新一帧覆盖而未下发的力矩数
+        self.error = 0  # 最近一次ServoJT失败的错误码，安全停止时为 RobotError.ERR_SAFETY_STOP
+        self.exception = None  # control或下发抛出的异常，出现后回路停止
+        self._latency = deque(maxlen=max_samples)  # (control耗时, 下发耗时, 端到端延迟)，单位 [s]
+        self._transport = None
+        self._proxy = None
+        self._pending = None  # 待下发的 (状态, 力矩, recv_tick, 计算完成时刻)，力矩为None时由下发线程计算
+        self._pending_lock = threading.Lock()
+        self._pending_event = threading.Event()
+        self._running = False
+        self._sender = None
+        self._compute_in_sender = False
+
+    def start(self):
+        """
+        建立专用长连接并预热，ServoJTStart后在接收线程中开始回路
+        @return 错误码 成功-0  失败-错误码
+        """
+        robot = self.robot
+        if robot.torque_loop is not None:
+            raise RuntimeError("已有力矩控制回路在运行")
+        # 下发失败时不退避重试也不共用指令的断路器：异常直接停止回路
+        self._transport = KeepAliveTransport(timeout=self.SEND_TIMEOUT,
+                                             retry_policy=RetryPolicy(attempts=1, base_delay=0.0, max_delay=0.0,
+                                                                      connect_timeout=self.SEND_TIMEOUT),
+                                             breaker=CircuitBreaker(failure_threshold=1))
+        self._proxy = xmlrpc.client.ServerProxy('http://' + robot.ip_address + ":20003", transport=self._transport)
+        try:
+            self._proxy.GetControllerIP()
+        except (OSError, xmlrpc.client.Error):
+            self._transport.close()
+            return RobotError.ERR_SOCKET_COM_FAILED
+        error = robot.ServoJTStart()
+        if error != 0:
+            self._transport.close()
+            return error
+        self.exception = None
+        self._pending = None
+        self._running = True
+        # 设置了回调执行方式(RobotFleet共用接收线程)时，control不在接收线程中执行
+        self._compute_in_sender = robot.callback_dispatch is not None
+        self._sender = threading.Thread(target=self._send_loop, name="TorqueControlSender", daemon=True)
+        self._sender.start()
+        robot.torque_loop = self
+        return 0
 
-class LogWriterThread(threading.Thread):
-    def __init__(self, queue, log_handler):
+    def stop(self):
+        """
+        停止回路并ServoJTEnd，可在任意线程调用
+        @return 错误码 成功-0  失败-错误码
+        """
+        robot = self.robot
+        if robot.torque_loop is self:
+            robot.torque_loop = None
+        self._running = False
+        self._pending_event.set()
+        sender = self._sender
+        if sender is not None and sender is not threading.current_thread():
+            sender.join(self.SEND_TIMEOUT * 2)
+        error = robot.ServoJTEnd()
+        if self._transport is not None:
+            self._transport.close()
+        return error
+
+    def on_state(self, view, offset, recv_tick):
+        """在接收线程中调用，view[offset:]为最新一帧，recv_tick为recv返回时的time.perf_counter()"""
+        fields = self._FIELDS
+        pos_offset, fmt6 = fields["jt_cur_pos"]
+        stop0_offset, fmt1 = fields["safety_stop0_state"]
+        stop1_offset = fields["safety_stop1_state"][0]
+        state = (fmt6.unpack_from(view, offset + pos_offset),
+                 fmt6.unpack_from(view, offset + fields["actual_qd"][0]),
+                 fmt6.unpack_from(view, offset + fields["jt_cur_tor"][0]))
+        torque = computed = None
+        if not self._compute_in_sender:
+            try:
+                torque = self._compute(state)
+            except Exception as ex:
+                self._fail(ex)
+                return
+            if torque is None:
+                return
+            computed = time.perf_counter()
+        with self._pending_lock:
+            if fmt1.unpack_from(view, offset + stop0_offset)[0] == 1 or \
+                    fmt1.unpack_from(view, offset + stop1_offset)[0] == 1:
+                # 安全停止期间丢弃尚未下发的力矩
+                self._pending = None
+                self.error = RobotError.ERR_SAFETY_STOP
+                return
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = (state, torque, recv_tick, computed)
+        self._pending_event.set()
+
+    def _compute(self, state):
+        """调用control，返回待下发的力矩列表，返回None时本帧不下发"""
+        self.frames += 1
+        torque = self.control(*state)
+        if torque is None:
+            self.skipped += 1
+            return None
+        return [float(t) for t in torque]
+
+    def _send_loop(self):
+        """下发线程：取出最新的力矩(RobotFleet中先调用control计算)以ServoJT下发，网络等待不占用接收线程"""
+        while True:
+            self._pending_event.wait()
+            with self._pending_lock:
+                self._pending_event.clear()
+                pending, self._pending = self._pending, None
+            if not self._running:
+                return
+            if pending is None:
+                continue
+            state, torque, recv_tick, computed = pending
+            try:
+                if torque is None:
+                    torque = self._compute(state)
+                    if torque is None:
+                        continue
+                    computed = time.perf_counter()
+                error = self._proxy.ServoJT(torque, self.interval)
+            except Exception as ex:
+                self._fail(ex)
+                return
+            sent = time.perf_counter()
+            if error != 0:
+                self.error = error
+                continue
+            self.commands += 1
+            self._latency.append((computed - recv_tick, sent - computed, sent - recv_tick))
+
+    def _fail(self, ex):
+        # 控制函数或连接异常，停止回路，由调用方检查exception后调用stop()
+        self.exception = ex
+        self._running = False
+        self._pending_event.set()
+        if self.robot.torque_loop is self:
+            self.robot.torque_loop = None
+
+    def latency_stats(self):
+        """
+        延迟统计
+        @return dict frames 计算帧数, commands 下发指令数, skipped 未下发帧数, coalesced 被新一帧覆盖的帧数,
+                error 最近错误码, compute_*/send_*/total_* 的 mean、p50、p90、p99、max，单位 [s]
+        """
+        stats = {"frames": self.frames, "commands": self.commands, "skipped": self.skipped,
+                 "coalesced": self.coalesced, "error": self.error}
+        samples = list(self._latency)
+        count = len(samples)
+        if count == 0:
+            return stats
+        for index, name in enumerate(("compute", "send", "total")):
+            ordered = sorted(sample[index] for sample in samples)
+            stats[name + "_mean"] = sum(ordered) / count
+            for percent in (50, 90, 99):
+                stats["%s_p%d" % (name, percent)] = ordered[min(count - 1, count * percent // 100)]
+            stats[name + "_max"] = ordered[-1]
+        return stats
+
+
+class Kinematics:
+    """
+    本地正/逆运动学(需要numpy)，全部运算按批进行，供路径规划批量求解，也可替代MoveL/MoveJ中的
+    GetInverseKin/GetForwardKin往返；标准DH模型，长度单位 [mm]，角度单位 [°]，
+    位姿 [x,y,z,rx,ry,rz] 为基坐标系下当前工具的位姿，姿态按固定轴XYZ欧拉角 R = Rz(rz)·Ry(ry)·Rx(rx)；
+    逆解以参考关节位置为初值做阻尼最小二乘迭代，得到参考位置附近的解，对应控制器config=-1的求解方式
+    """
+
+    FR5_DH = (152.0, -425.0, -395.0, 102.0, 102.0, 100.0)  # FR5 名义DH参数 d1,a2,a3,d4,d5,d6，单位 [mm]
+    ALPHA = (np.pi / 2, 0.0, 0.0, np.pi / 2, -np.pi / 2, 0.0) if np is not None else None
+    POS_TOLERANCE = 1e-4  # 逆解收敛条件，单位 [mm]
+    ROT_TOLERANCE = 1e-7  # 单位 [rad]
+    MAX_ITERATIONS = 100
+    DAMPING = 1e-3
+
+    def __init__(self, dh=FR5_DH, compensation=(0.0, 0.0, 0.0, 0.0, 0.0, 0.0), tool=(0.0, 0.0, 0.0, 0.0, 0.0, 0.0),
+                 zero_offset=(0.0, 0.0, 0.0, 0.0, 0.0, 0.0)):
+        """
+        @param  dh 名义DH参数 d1,a2,a3,d4,d5,d6，单位 [mm]
+        @param  compensation GetDHCompensation返回的补偿值 cmpstD1,cmpstA2,cmpstA3,cmpstD4,cmpstD5,cmpstD6
+        @param  tool 工具坐标系相对末端法兰的位姿(GetTCPOffset)，单位 [mm][°]
+        @param  zero_offset 关节零位与DH模型零位之差，单位 [°]
+        """
+        if np is None:
+            raise ImportError("Kinematics 需要安装 numpy")
+        d1, a2, a3, d4, d5, d6 = np.add(dh, compensation).tolist()
+        self.dh = (d1, a2, a3, d4, d5, d6)
+        self.tool = list(map(float, tool))
+        self._a = np.array([0.0, a2, a3, 0.0, 0.0, 0.0])
+        self._d = np.array([d1, 0.0, 0.0, d4, d5, d6])
+        self._cos_alpha = np.cos(self.ALPHA).round(12)
+        self._sin_alpha = np.sin(self.ALPHA).round(12)
+        self._zero = np.radians(np.asarray(zero_offset, dtype=np.float64))
+        self._tool = self.pose_to_matrix(self.tool)[0]
+        self._tool_inv = np.linalg.inv(self._tool)
+
+    @staticmethod
+    def pose_to_matrix(poses):
+        """位姿 (N×6或6) 转齐次变换矩阵 (N×4×4)"""
+        poses = np.asarray(poses, dtype=np.float64).reshape(-1, 6)
+        rx, ry, rz = np.radians(poses[:, 3:]).T
+        cx, sx, cy, sy, cz, sz = np.cos(rx), np.sin(rx), np.cos(ry), np.sin(ry), np.cos(rz), np.sin(rz)
+        matrix = np.zeros((len(poses), 4, 4))
+        matrix[:, 0, 0] = cz * cy
+        matrix[:, 0, 1] = cz * sy * sx - sz * cx
+        matrix[:, 0, 2] = cz * sy * cx + sz * sx
+        matrix[:, 1, 0] = sz * cy
+        matrix[:, 1, 1] = sz * sy * sx + cz * cx
+        matrix[:, 1, 2] = sz * sy * cx - cz * sx
+        matrix[:, 2, 0] = -sy
+        matrix[:, 2, 1] = cy * sx
+        matrix[:, 2, 2] = cy * cx
+        matrix[:, :3, 3] = poses[:, :3]
+        matrix[:, 3, 3] = 1.0
+        return matrix
+
+    @staticmethod
+    def matrix_to_pose(matrix):
+        """齐次变换矩阵 (N×4×4) 转位姿 (N×6)"""
+        rot = matrix[:, :3, :3]
+        ry = np.arctan2(-rot[:, 2, 0], np.hypot(rot[:, 0, 0], rot[:, 1, 0]))
+        rz = np.arctan2(rot[:, 1, 0], rot[:, 0, 0])
+        rx = np.arctan2(rot[:, 2, 1], rot[:, 2, 2])
+        return np.concatenate([matrix[:, :3, 3], np.degrees(np.stack([rx, ry, rz], axis=1))], axis=1)
+
+    def _frames(self, theta):
+        """各关节坐标系相对基坐标系的变换 (N×7×4×4)，第0个为基坐标系，最后一个为末端法兰"""
+        count = len(theta)
+        ct, st = np.cos(theta), np.sin(theta)
+        zeros = np.zeros_like(theta)
+        links = np.stack([ct, -st * self._cos_alpha, st * self._sin_alpha, self._a * ct,
+                          st, ct * self._cos_alpha, -ct * self._sin_alpha, self._a * st,
+                          zeros, zeros + self._sin_alpha, zeros + self._cos_alpha, zeros + self._d,
+                          zeros, zeros, zeros, zeros + 1.0], axis=2).reshape(count, 6, 4, 4)
+        frames = np.empty((count, 7, 4, 4))
+        frames[:, 0] = np.eye(4)
+        for joint in range(6):
+            frames[:, joint + 1] = frames[:, joint] @ links[:, joint]
+        return frames
+
+    def _theta(self, joints):
+        return np.radians(np.asarray(joints, dtype=np.float64).reshape(-1, 6)) + self._zero
+
+    def fk_many(self, joints):
+        """
+        批量正运动学
+        @param  joints 关节位置 (N×6)，单位 [°]
+        @return 工具位姿 (N×6)，单位 [mm][°]
+        """
+        frames = self._frames(self._theta(joints))
+        return self.matrix_to_pose(frames[:, 6] @ self._tool)
+
+    def fk(self, joint_pos):
+        """单点正运动学，返回工具位姿列表"""
+        return self.fk_many([joint_pos])[0].tolist()
+
+    def ik_many(self, poses, joint_ref):
+        """
+        批量逆运动学
+        @param  poses 工具位姿 (N×6)，单位 [mm][°]
+        @param  joint_ref 参考关节位置 (N×6或6)，单位 [°]，路径规划时可传入上一点的解
+        @return 关节位置 (N×6)，单位 [°]，各关节与参考位置之差不超过180°
+        @return 是否收敛 (N,) bool数组，未收敛的行无效
+        """
+        target = self.pose_to_matrix(poses)
+        count = len(target)
+        # 目标法兰位姿
+        target = target @ self._tool_inv
+        ref = np.broadcast_to(self._theta(joint_ref), (count, 6))
+        result = ref.copy()
+        converged = np.zeros(count, dtype=bool)
+        # 只对未收敛的行继续迭代
+        index = np.arange(count)
+        theta = result.copy()
+        damping = self.DAMPING ** 2 * np.eye(6)
+        for _ in range(self.MAX_ITERATIONS):
+            frames = self._frames(theta)
+            flange = frames[:, 6]
+            pos_err = target[:, :3, 3] - flange[:, :3, 3]
+            rot_err = self._rotation_error(target[:, :3, :3] @ flange[:, :3, :3].swapaxes(1, 2))
+            done = ((pos_err * pos_err).sum(axis=1) < self.POS_TOLERANCE ** 2) & \
+                   ((rot_err * rot_err).sum(axis=1) < self.ROT_TOLERANCE ** 2)
+            if done.any():
+                result[index[done]] = theta[done]
+                converged[index[done]] = True
+                keep = ~done
+                if not keep.any():
+                    break
+                index, theta, target, frames = index[keep], theta[keep], target[keep], frames[keep]
+                flange, pos_err, rot_err = flange[keep], pos_err[keep], rot_err[keep]
+            # 几何雅可比，位置行换算为 [m] 使位置与姿态误差量级相当
+            axes = frames[:, :6, :3, 2]
+            arms = flange[:, None, :3, 3] - frames[:, :6, :3, 3]
+            linear = np.stack([axes[..., 1] * arms[..., 2] - axes[..., 2] * arms[..., 1],
+                               axes[..., 2] * arms[..., 0] - axes[..., 0] * arms[..., 2],
+                               axes[..., 0] * arms[..., 1] - axes[..., 1] * arms[..., 0]], axis=2)
+            jacobian = np.concatenate([linear * 1e-3, axes], axis=2).swapaxes(1, 2)
+            error = np.concatenate([pos_err * 1e-3, rot_err], axis=1)
+            jjt = jacobian @ jacobian.swapaxes(1, 2) + damping
+            theta = theta + (jacobian.swapaxes(1, 2) @ np.linalg.solve(jjt, error[:, :, None]))[:, :, 0]
+        theta = result
+        theta = ref + (theta - ref + np.pi) % (2 * np.pi) - np.pi
+        return np.degrees(theta - self._zero), converged
+
+    def ik(self, desc_pos, joint_ref):
+        """
+        单点逆运动学
+        @return 是否收敛
+        @return 关节位置列表，未收敛时为None
+        """
+        joints, converged = self.ik_many([desc_pos], joint_ref)
+        if not converged[0]:
+            return False, None
+        return True, joints[0].tolist()
+
+    @staticmethod
+    def _rotation_error(rot):
+        """旋转矩阵 (N×3×3) 的旋转向量 (N×3)，单位 [rad]"""
+        vee = 0.5 * np.stack([rot[:, 2, 1] - rot[:, 1, 2], rot[:, 0, 2] - rot[:, 2, 0],
+                              rot[:, 1, 0] - rot[:, 0, 1]], axis=1)
+        sin = np.sqrt((vee * vee).sum(axis=1))
+        cos = 0.5 * (rot[:, 0, 0] + rot[:, 1, 1] + rot[:, 2, 2] - 1.0)
+        angle = np.arctan2(sin, cos)
+        scale = np.where(sin > 1e-12, angle / np.maximum(sin, 1e-12), 1.0)
+        result = vee * scale[:, None]
+        # 转角接近π时反对称部分趋于0，转轴由对称部分 (R+Rᵀ)/2 = cosθ·I + (1-cosθ)·n·nᵀ 求出
+        near_pi = (cos < 0.0) & (sin < 1e-4)
+        if near_pi.any():
+            sym = rot[near_pi]
+            cos_pi = cos[near_pi][:, None, None]
+            outer = (0.5 * (sym + sym.swapaxes(1, 2)) - cos_pi * np.eye(3)) / (1.0 - cos_pi)
+            column = np.argmax(np.diagonal(outer, axis1=1, axis2=2), axis=1)
+            rows = np.arange(len(column))
+            axis = outer[rows, column] / np.sqrt(outer[rows, column, column])[:, None]
+            # 方向与反对称部分一致，恰好为π时两个方向等价
+            sign = np.where((axis * vee[near_pi]).sum(axis=1) < 0.0, -1.0, 1.0)
+            result[near_pi] = axis * (sign * angle[near_pi])[:, None]
+        return result
+
+
+class SegmentWeldPlan:
+    """
+    分段焊接计划：起点到终点的直线按 焊接长度/非焊接长度 交替分段，一次算出所有分段终点的位姿，
+    位置按距离线性插值，姿态按起点到终点的相对旋转等比例插值(计算位姿需要numpy)
+    """
+
+    DISTANCE_TOLERANCE = 0.01  # 本地计算的直线长度与GetSegWeldDisDir的允许偏差，单位 [mm]
+
+    def __init__(self, start_pos, end_pos, weld_length, no_weld_length, distance):
+        """
+        @param  start_pos 起点位姿，单位 [mm][°]
+        @param  end_pos 终点位姿，单位 [mm][°]
+        @param  weld_length 焊接长度，单位 [mm]
+        @param  no_weld_length 非焊接长度，单位 [mm]
+        @param  distance GetSegWeldDisDir返回的起点到终点的距离，单位 [mm]
+        """
+        self.start_pos = list(map(float, start_pos))
+        self.end_pos = list(map(float, end_pos))
+        self.distance = float(distance)
+        self.ends, self.weld = self.segments(self.distance, float(weld_length), float(no_weld_length))
+
+    @staticmethod
+    def segments(distance, weld_length, no_weld_length):
+        """
+        焊接段与非焊接段交替，从焊接段开始，最后一段截止于终点，长度为0的段省略
+        @return 各段终点至起点的距离列表，各段是否焊接列表
+        """
+        if weld_length <= 0 or no_weld_length < 0:
+            raise ValueError("焊接长度须大于0，非焊接长度不能小于0")
+        ends = []
+        weld = []
+        position = 0.0
+        welding = True
+        while position < distance:
+            length = weld_length if welding else no_weld_length
+            if length > 0:
+                position = min(distance, position + length)
+                ends.append(position)
+                weld.append(welding)
+            welding = not welding
+        return ends, weld
+
+    def local_distance(self):
+        """按起点与终点坐标计算的直线长度，单位 [mm]"""
+        return sum((b - a) ** 2 for a, b in zip(self.start_pos[:3], self.end_pos[:3])) ** 0.5
+
+    def is_consistent(self):
+        """本地直线长度与控制器计算的距离一致且可进行本地插值"""
+        return np is not None and abs(self.local_distance() - self.distance) <= self.DISTANCE_TOLERANCE
+
+    def poses(self):
+        """
+        各段终点位姿
+        @return 位姿 (N×6)，单位 [mm][°]
+        """
+        fraction = np.asarray(self.ends) / self.distance if self.distance > 0 else np.ones(len(self.ends))
+        start, end = Kinematics.pose_to_matrix([self.start_pos, self.end_pos])
+        # 起点到终点的相对旋转按转角等比例插值(Rodrigues公式)
+        rotvec = Kinematics._rotation_error((start[:3, :3].T @ end[:3, :3])[None])[0]
+        angle = np.sqrt(rotvec @ rotvec)
+        axis = rotvec / angle if angle > 1e-12 else np.zeros(3)
+        skew = np.array([[0.0, -axis[2], axis[1]], [axis[2], 0.0, -axis[0]], [-axis[1], axis[0], 0.0]])
+        theta = (fraction * angle)[:, None, None]
+        rotations = np.eye(3) + np.sin(theta) * skew + (1.0 - np.cos(theta)) * (skew @ skew)
+        matrix = np.zeros((len(fraction), 4, 4))
+        matrix[:, :3, :3] = start[:3, :3] @ rotations
+        matrix[:, :3, 3] = start[:3, 3] + fraction[:, None] * (end[:3, 3] - start[:3, 3])
+        matrix[:, 3, 3] = 1.0
+        return Kinematics.matrix_to_pose(matrix)
+
+
+class KinematicsCache:
+    """
+    运动学结果LRU缓存：键为 (方法名, 参数, 工具号, 工件号)，参数中的位姿/关节位置(list或tuple)按quantum取整后比较，
+    只缓存控制器成功返回的结果
+    """
+
+    def __init__(self, maxsize=1024, quantum=1e-3):
+        """
+        @param  maxsize 最大缓存条数
+        @param  quantum 量化步长，位置单位 [mm]，角度单位 [°]
+        """
+        self.maxsize = maxsize
+        self.quantum = quantum
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.dh_compensation = None  # 最近一次读取的DH补偿值，改变时清空
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, method, params, tool, user):
+        quantum = self.quantum
+        return (method, tuple(tuple(round(value / quantum) for value in param)
+                              if isinstance(param, (list, tuple)) else param for param in params), tool, user)
+
+    def get(self, key):
+        """命中时返回缓存的结果并移到最近使用端，未命中返回None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries),
+                "invalidations": self.invalidations}
+
+
+class ConfigCache:
+    """
+    控制器配置读取缓存：键为 (方法名, 参数, 工具号, 工件号)，只缓存控制器成功返回的结果，
+    超过ttl后重新读取；对应的Set*指令执行后按方法名清除
+    """
+
+    def __init__(self, ttl=30.0):
+        """
+        @param  ttl 缓存有效期，单位 [s]，None为不过期
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = {}  # 键 -> (结果, 过期时间time.monotonic())
+        self._lock = threading.Lock()
+
+    def key(self, method, params, tool, user):
+        return method, params, tool, user
+
+    def get(self, key):
+        """命中且未过期时返回缓存的结果，否则返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and time.monotonic() > entry[1]:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (value, expires)
+
+    def invalidate(self, *methods):
+        """清除指定方法的缓存"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in methods]:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries),
+                "invalidations": self.invalidations}
+
+
+class AsyncLogHandler(logging.Handler):
+    """
+    非阻塞日志处理器：emit在调用线程中格式化日志记录（之后修改参数不影响日志内容），
+    将文本追加到有界队列(deque)，队列满时丢弃并计数，不等待文件写入；
+    后台线程按批一次写入文件，文件超过maxBytes时在后台线程轮转
+    """
+    FLUSH_INTERVAL = 0.05  # 后台线程写入间隔，单位 [s]
+
+    def __init__(self, filename, maxBytes=0, backupCount=0, capacity=10000, encoding=None):
         super().__init__()
-        self.queue = queue
-        self.log_handler = log_handler
-        self.daemon = True
+        self.target = RotatingFileHandler(filename, mode='a', maxBytes=maxBytes, backupCount=backupCount,
+                                          encoding=encoding, delay=True)
+        self.capacity = capacity
+        self.records = deque()
+        self.dropped = 0  # 队列满时丢弃的记录数
+        self.written = 0
+        self.rotations = 0
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = None
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def start(self):
+        """启动后台写入线程"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write_loop, daemon=True)
+            self._thread.start()
+
+    def emit(self, record):
+        records = self.records
+        if self._closed or len(records) >= self.capacity:
+            self.dropped += 1
+            return
+        try:
+            msg = self.format(record) + self.target.terminator
+        except Exception:
+            self.handleError(record)
+            return
+        records.append(msg)
+        if len(records) == self.capacity // 2:
+            self._wakeup.set()
+
+    def flush(self):
+        self._wakeup.set()
+
+    def close(self):
+        """写完队列中剩余的记录后关闭文件"""
+        if not self._closed:
+            self._closed = True
+            if self._thread is not None:
+                self._wakeup.set()
+                self._thread.join()
+            else:
+                self._write_batch()
+            self.target.close()
+        super().close()
 
-    def run(self):
+    def _write_loop(self):
         while True:
-            record = self.queue.get()
-            if record is None:
-                break
-            log_entry = self.log_handler.format(record)
-            self.log_handler.stream.write(log_entry + self.log_handler.terminator)
-            self.log_handler.flush()
+            self._wakeup.wait(self.FLUSH_INTERVAL)
+            self._wakeup.clear()
+            self._write_batch()
+            if self._closed:
+                self._write_batch()
+                return
+
+    def _write_batch(self):
+        records = self.records
+        if not records:
+            return
+        target = self.target
+        if target.stream is None:
+            target.stream = target._open()
+        size = target.stream.tell()
+        chunks = []
+        while records:
+            msg = records.popleft()
+            if target.maxBytes > 0 and size > 0 and size + len(msg) >= target.maxBytes:
+                target.stream.write("".join(chunks))
+                chunks = []
+                target.doRollover()
+                if target.stream is None:
+                    target.stream = target._open()
+                self.rotations += 1
+                size = 0
+            chunks.append(msg)
+            size += len(msg)
+            self.written += 1
+            if len(chunks) % 64 == 0:
+                time.sleep(0)  # 主动让出GIL，避免长批次阻塞记录日志的线程
+        target.stream.write("".join(chunks))
+        target.stream.flush()
 
 
 def calculate_file_md5(file_path):
@@ -176,23 +1618,450 @@ def calculate_file_md5(file_path):
         raise ValueError(f"{file_path} 不存在")
     md5 = hashlib.md5()
     with open(file_path, 'rb') as file:
-        while chunk := file.read(8192):  # Read in 8KB chunks
+        while chunk := file.read(1024 * 1024):  # Read in 1MB chunks
             md5.update(chunk)
     return md5.hexdigest()
 
 
+_file_md5_cache = {}  # 绝对路径 -> ((文件大小, 修改时间, inode, 状态改变时间), MD5)
+_file_md5_lock = threading.Lock()
+
+
+def _file_md5_key(stat):
+    # 同一秒内原地改写或替换为同样大小的文件时修改时间可能不变，inode或状态改变时间会变
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino, stat.st_ctime_ns
+
+
+def cached_file_md5(file_path):
+    """
+    文件MD5，按文件大小、修改时间、inode与状态改变时间缓存，同一文件上传到多台控制器或重复上传时只读取一次；
+    上传协议的文件头在文件内容之前携带MD5，无法边发送边计算，首次上传需先读取一遍文件，
+    随后sendfile发送的内容通常已在页缓存中；计算期间文件被修改时不缓存
+    """
+    path = os.path.abspath(file_path)
+    key = _file_md5_key(os.stat(path))
+    with _file_md5_lock:
+        entry = _file_md5_cache.get(path)
+    if entry is not None and entry[0] == key:
+        return entry[1]
+    md5 = calculate_file_md5(path)
+    if _file_md5_key(os.stat(path)) == key:
+        with _file_md5_lock:
+            _file_md5_cache[path] = (key, md5)
+    return md5
+
+
+class RPCUnavailable(Exception):
+    """
+    XML-RPC请求按重试策略重试后仍失败，或断路器打开时拒绝发送；不是socket.error的子类，
+    不会被指令实现中的 except socket.error 重试循环捕获，由xmlrpc_timeout转换为 RobotError.ERR_RPC_ERROR
+    """
+
+
+class RetryPolicy:
+    """
+    XML-RPC请求出现连接异常时的重试策略：最多attempts次，指数退避并加随机抖动，不超过指令的deadline；
+    只重试请求发出之前的异常，已发出的请求可能已被控制器执行，MoveL等指令重发会重复运动
+    """
+
+    def __init__(self, attempts=3, base_delay=0.05, max_delay=1.0, jitter=0.5, connect_timeout=2.0):
+        """
+        @param  attempts 最多尝试次数
+        @param  base_delay 第一次重试前的等待时间，之后每次加倍，单位 [s]
+        @param  max_delay 最长等待时间，单位 [s]
+        @param  jitter 随机抖动比例，实际等待时间在 [1-jitter, 1] 倍之间
+        @param  connect_timeout 建立TCP连接的超时时间，单位 [s]，控制器断电时不必等待系统默认的连接超时
+        """
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.connect_timeout = connect_timeout
+
+    def delay(self, attempt):
+        """第attempt次失败后的等待时间"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * (1.0 - self.jitter * random.random())
+
+
+class CircuitBreaker:
+    """
+    断路器：请求连续失败failure_threshold次，或实时端口断开后重连失败时打开，打开期间指令不发送，
+    直接返回 RobotError.ERR_RPC_ERROR；打开reset_timeout后放行一次试探请求，成功则关闭，失败则重新打开
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=2.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0  # 连续失败次数
+        self.trips = 0  # 累计打开次数
+        self.rejected = 0  # 打开期间拒绝的指令数
+        self._open_until = None  # 打开状态持续到的time.monotonic()时刻，None为关闭
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self._open_until is None:
+            return "closed"
+        return "half_open" if self._probing or time.monotonic() >= self._open_until else "open"
+
+    def rejecting(self):
+        """打开且未到试探时间时返回True并计数，关闭时只读取一个属性"""
+        open_until = self._open_until
+        if open_until is None or time.monotonic() >= open_until:
+            return False
+        self.rejected += 1
+        return True
+
+    def allow(self):
+        """发送请求前调用，半开状态只放行一个试探请求"""
+        if self._open_until is None:
+            return True
+        with self._lock:
+            if self._open_until is None:
+                return True
+            if self._probing or time.monotonic() < self._open_until:
+                self.rejected += 1
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        if self.failures or self._open_until is not None:
+            self.reset()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self._open()
+
+    def trip(self):
+        """立即打开，实时端口重连失败时调用；已到试探时间时重新打开"""
+        with self._lock:
+            if self._open_until is None or time.monotonic() >= self._open_until:
+                self._open()
+
+    def reset(self):
+        """关闭断路器"""
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._open_until = None
+
+    def _open(self):
+        if self._open_until is None:
+            self.trips += 1
+        self._probing = False
+        self._open_until = time.monotonic() + self.reset_timeout
+
+
+class _NoDelayHTTPConnection(http.client.HTTPConnection):
+    connect_timeout = None  # 建立连接的超时时间，之后恢复为timeout
+
+    def connect(self):
+        timeout = self.timeout
+        if self.connect_timeout is not None:
+            self.timeout = self.connect_timeout if timeout is None else min(timeout, self.connect_timeout)
+        try:
+            super().connect()
+        finally:
+            self.timeout = timeout
+        self.sock.settimeout(timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class KeepAliveTransport(xmlrpc.client.Transport):
+    """
+    20003端口长连接Transport：HTTP/1.1连接用完后放回空闲池供下一次调用复用，并设置TCP_NODELAY；
+    多个线程同时调用时各自取用一条连接，复用的空闲连接已被控制器关闭时重新连接后重发一次；
+    请求发出前的连接异常按retry_policy退避重试，请求发出后的异常不重试，仍失败或断路器打开时抛出RPCUnavailable；
+    指令传入deadline时，等待应答的超时时间不超过截止时间；按方法名记录往返耗时
+    """
+
+    def __init__(self, timeout=None, retry_policy=None, breaker=None):
+        super().__init__()
+        self.timeout = timeout  # 新建连接的超时时间，None为阻塞等待
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.connects = 0  # 累计建立的TCP连接数
+        self.retries = 0  # 累计重试次数
+        self.failures = 0  # 重试后仍失败的请求数
+        self.timings = {}  # 方法名 -> [调用次数, 总耗时, 最大耗时, 最近一次耗时]，单位 [s]
+        self._lock = threading.Lock()
+        self._idle = []
+        self._local = threading.local()
+
+    def set_timeout(self, timeout):
+        """修改超时时间，同时作用于空闲连接"""
+        with self._lock:
+            self.timeout = timeout
+            for connection in self._idle:
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+
+    def make_connection(self, host):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            chost, self._extra_headers, x509 = self.get_host_info(host)
+            connection = _NoDelayHTTPConnection(chost, timeout=self.timeout)
+            connection.connect_timeout = self.retry_policy.connect_timeout
+            self._local.connection = connection
+            with self._lock:
+                self.connects += 1
+        timeout = self.timeout
+        deadline = getattr(_call_context, "deadline", None)
+        if deadline is not None:
+            remaining = max(0.001, deadline - time.monotonic())
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        if connection.timeout != timeout:
+            connection.timeout = timeout
+            if connection.sock is not None:
+                connection.sock.settimeout(timeout)
+        return connection
+
+    def request(self, host, handler, request_body, verbose=False):
+        policy = self.retry_policy
+        breaker = self.breaker
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                raise RPCUnavailable("断路器打开，%s 未发送" % self._method_name(request_body))
+            self._local.sent = False
+            try:
+                result = self._request_once(host, handler, request_body, verbose)
+            except (OSError, http.client.HTTPException) as ex:
+                breaker.record_failure()
+                attempt += 1
+                delay = policy.delay(attempt)
+                deadline = getattr(_call_context, "deadline", None)
+                if self._local.sent or attempt >= policy.attempts or \
+                        (deadline is not None and time.monotonic() + delay >= deadline):
+                    self.failures += 1
+                    raise RPCUnavailable("%s 请求失败: %s" % (self._method_name(request_body), ex)) from ex
+                self.retries += 1
+                time.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
+
+    def send_request(self, host, handler, request_body, debug):
+        # 请求完整写入socket后标记为已发出，之后的异常不再重试
+        connection = super().send_request(host, handler, request_body, debug)
+        self._local.sent = True
+        return connection
+
+    def _request_once(self, host, handler, request_body, verbose=False):
+        with self._lock:
+            self._local.connection = self._idle.pop() if self._idle else None
+        reused = self._local.connection is not None
+        start = time.perf_counter()
+        try:
+            # 与Transport.request相同，但只有复用的空闲连接才重发：新建的连接发出后断开时请求可能已被执行
+            for i in (0, 1):
+                try:
+                    return self.single_request(host, handler, request_body, verbose)
+                except http.client.RemoteDisconnected:
+                    if i or not reused:
+                        raise
+                except OSError as e:
+                    if i or not reused or e.errno not in (errno.ECONNRESET, errno.ECONNABORTED, errno.EPIPE):
+                        raise
+        finally:
+            elapsed = time.perf_counter() - start
+            method = self._method_name(request_body)
+            connection, self._local.connection = self._local.connection, None
+            with self._lock:
+                if connection is not None:
+                    self._idle.append(connection)
+                timing = self.timings.get(method)
+                if timing is None:
+                    self.timings[method] = [1, elapsed, elapsed, elapsed]
+                else:
+                    timing[0] += 1
+                    timing[1] += elapsed
+                    timing[2] = max(timing[2], elapsed)
+                    timing[3] = elapsed
+
+    def adopt(self, other):
+        """接收另一个Transport的空闲连接，使之后的请求不必重新建立连接"""
+        with other._lock:
+            idle, other._idle = other._idle, []
+        for connection in idle:
+            connection.timeout = self.timeout
+            connection.connect_timeout = self.retry_policy.connect_timeout
+            if connection.sock is not None:
+                connection.sock.settimeout(self.timeout)
+        with self._lock:
+            self._idle.extend(idle)
+
+    def close(self):
+        # 请求出错时Transport只关闭当前线程使用的连接，其余情况关闭所有空闲连接
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+            return
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    @staticmethod
+    def _method_name(request_body):
+        start = request_body.find(b"<methodName>") + len(b"<methodName>")
+        return request_body[start:request_body.find(b"</methodName>", start)].decode("ascii", "replace")
+
+
+_call_context = threading.local()  # 当前线程正在执行的指令的截止时间等上下文
+
+
 def xmlrpc_timeout(func):
+    """
+    指令调用检查，所有指令均可额外传入关键字参数 deadline：time.monotonic()截止时间，
+    等待重连或请求重试超过截止时间时指令返回 RobotError.ERROR_RECONN 或 RobotError.ERR_RPC_ERROR；
+    断路器打开时不发送，直接返回 RobotError.ERR_RPC_ERROR；处于本线程的batch()中时只记录指令
+    """
     @wraps(func)
-    def wrapper(self, *args, **kwargs):
-        if RPC.is_conect == False:
+    def wrapper(self, *args, deadline=None, **kwargs):
+        if self.is_conect == False:
             return -4
-        else:
-            result = func(self, *args, **kwargs)
-            return result
+        batch = getattr(_call_context, "batch", None)
+        if batch is not None and batch.rpc is self:
+            return batch.add(func, args, kwargs)
+        if self.breaker.rejecting():
+            return RobotError.ERR_RPC_ERROR
+        outer = getattr(_call_context, "deadline", None)
+        if deadline is not None:
+            _call_context.deadline = deadline if outer is None else min(outer, deadline)
+        try:
+            return func(self, *args, **kwargs)
+        except RPCUnavailable:
+            return RobotError.ERR_RPC_ERROR
+        finally:
+            _call_context.deadline = outer
 
     return wrapper
 
 
+class ReconnectManager:
+    """
+    断线重连：实时端口(20004)与指令端口(20003)并行恢复，均按指数退避加随机抖动重试；
+    实时端口以重连后收到第一帧校验通过的状态数据为恢复完成，指令端口以GetControllerIP应答为恢复完成，
+    应答所用的连接放入长连接池供之后的指令直接使用；两者都恢复后关闭断路器、唤醒等待重连的指令，并记录恢复耗时
+    """
+
+    BASE_DELAY = 0.05  # 第一次重试前的等待时间，单位 [s]
+    MAX_DELAY = 1.0  # 最长等待时间，单位 [s]
+    PROBE_TIMEOUT = 1.0  # 指令端口探测的连接与应答超时时间，单位 [s]
+
+    def __init__(self, rpc):
+        self.rpc = rpc
+        self.active = False  # 是否正在重连
+        self.waiting_frame = False  # 实时端口已连接，等待第一帧
+        self._lock = threading.Lock()
+        self._start = 0.0
+        self._realtime_time = None
+        self._command_time = None
+        self._command_thread = None
+        self.stats = {"reconnects": 0, "in_progress": False, "last_duration": None, "max_duration": 0.0,
+                      "total_duration": 0.0, "last_realtime_duration": None, "last_command_duration": None,
+                      "realtime_attempts": 0, "command_attempts": 0}
+
+    def backoff(self):
+        """依次产生重试等待时间"""
+        delay = self.BASE_DELAY
+        while True:
+            yield delay * (0.5 + 0.5 * random.random())
+            delay = min(self.MAX_DELAY, delay * 2)
+
+    def begin(self):
+        """实时端口断开时调用，同时开始恢复指令端口；重连过程中再次断开时不重新计时"""
+        with self._lock:
+            self.waiting_frame = False
+            if self.active:
+                return
+            self.active = True
+            self.stats["in_progress"] = True
+            self._start = time.monotonic()
+            self._realtime_time = None
+            self._command_time = None
+            self._command_thread = threading.Thread(target=self._revive_command_channel, daemon=True)
+            self._command_thread.start()
+
+    def realtime_connected(self):
+        """实时端口TCP连接成功，之后由接收线程收到第一帧时调用realtime_ready()"""
+        self.waiting_frame = True
+
+    def realtime_ready(self):
+        """接收线程在重连后收到第一帧校验通过的状态数据时调用"""
+        with self._lock:
+            self.waiting_frame = False
+            if not self.active or self._realtime_time is not None:
+                return
+            self._realtime_time = time.monotonic()
+        self._finish()
+
+    def _revive_command_channel(self):
+        rpc = self.rpc
+        # 断线前的空闲连接已失效
+        rpc.transport.close()
+        # 探测由本方法退避重试，不使用断路器
+        probe = KeepAliveTransport(self.PROBE_TIMEOUT, RetryPolicy(attempts=1, connect_timeout=self.PROBE_TIMEOUT),
+                                   CircuitBreaker(failure_threshold=sys.maxsize))
+        proxy = xmlrpc.client.ServerProxy('http://' + rpc.ip_address + ":20003", transport=probe)
+        for delay in self.backoff():
+            if rpc.closeRPC_state or rpc.stop_event.is_set():
+                return
+            self.stats["command_attempts"] += 1
+            try:
+                proxy.GetControllerIP()
+                break
+            except (RPCUnavailable, OSError, http.client.HTTPException, xmlrpc.client.Error):
+                time.sleep(delay)
+        rpc.transport.adopt(probe)
+        with self._lock:
+            self._command_time = time.monotonic()
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            if not self.active or self._realtime_time is None or self._command_time is None:
+                return
+            self.active = False
+            stats = self.stats
+            duration = max(self._realtime_time, self._command_time) - self._start
+            stats["reconnects"] += 1
+            stats["in_progress"] = False
+            stats["last_duration"] = duration
+            stats["max_duration"] = max(stats["max_duration"], duration)
+            stats["total_duration"] += duration
+            stats["last_realtime_duration"] = self._realtime_time - self._start
+            stats["last_command_duration"] = self._command_time - self._start
+        rpc = self.rpc
+        rpc.reconnect_flag = False
+        rpc.breaker.reset()
+        rpc.connected_event.set()
+
+
+class _CallArgs:
+    """log_call的参数，日志记录真正输出时才格式化"""
+    __slots__ = ("args", "kwargs")
+
+    def __init__(self, args, kwargs):
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self):
+        args_str = ', '.join(map(repr, self.args))
+        if not self.kwargs:
+            return args_str
+        kwargs_str = ', '.join([f"{key}={value}" for key, value in self.kwargs.items()])
+        return args_str + "," + kwargs_str
+
+
 class RobotError:
     ERR_SUCCESS = 0
     ERR_POINTTABLE_NOTFOUND = -7  # 上传文件不存在
@@ -202,6 +2071,7 @@ class RobotError:
     ERR_SOCKET_COM_FAILED = -2
     ERR_OTHER = -1
     ERROR_RECONN = -8
+    ERR_SAFETY_STOP = 99  # 安全停止信号(safety_stop0_state/safety_stop1_state)触发，运动指令未下发
     ERR_SOCKET_RECV_FAILED=-16    #/* socket接收失败 */
     ERR_SOCKET_SEND_FAILED=-15    #/* socket发送失败 */
     ERR_FILE_OPEN_FAILED=-14    #/* 文件打开失败 */
@@ -220,10 +2090,11 @@ class RPC():
 
     logger = None
     log_output_model = -1
-    queue = Queue(maxsize=10000 * 1024)
-    logging_thread = None
+    log_handler = None  # 后台写入的日志处理器
     is_conect = True
     ROBOT_REALTIME_PORT = 20004
+    FILE_UPLOAD_PORT = 20010  # 文件上传端口
+    FILE_DOWNLOAD_PORT = 20011  # 文件下载端口
     # BUFFER_SIZE = 1024 * 8
     BUFFER_SIZE = 1024 * 1024
     thread=  threading.Thread()
@@ -234,46 +2105,80 @@ class RPC():
     reconnect_lock = False
     reconnect_flag = False
     g_sock_com_err = RobotError.ERROR_RECONN
+    WAIT_SLICE = 0.05  # 等待重连期间检查断路器的间隔，单位 [s]
 
 
-    def __init__(self, ip="192.168.58.2"):
-        self.lock = threading.Lock()  # 增加锁
-        self.ip_address = ip
-        link = 'http://' + self.ip_address + ":20003"
-        self.robot = xmlrpc.client.ServerProxy(link)#xmlrpc连接机器人20003端口，用于发送机器人指令数据帧
-
-        self.sock_cli_state = None
-        self.robot_realstate_exit = False
-        self.robot_state_pkg = RobotStatePkg#机器人状态数据
-
-        self.stop_event = threading.Event()  # 停止事件
+    def __init__(self, ip="192.168.58.2", receiver=True):
+        """
+        @param  ip 控制器IP
+        @param  receiver True-创建本实例的20004端口接收线程，False-由RobotFleet的共享接收线程接收
+        """
+        self._init_state(ip)
         self.connect_to_robot()
-        thread= threading.Thread(target=self.robot_state_routine_thread)#创建线程循环接收机器人状态数据
-        thread.daemon = True
-        thread.start()
-        time.sleep(1)
+        if receiver:
+            thread= threading.Thread(target=self.robot_state_routine_thread)#创建线程循环接收机器人状态数据
+            thread.daemon = True
+            thread.start()
+            time.sleep(1)
         print(self.robot)
 
 
         try:
-            # 调用 XML-RPC 方法
-            socket.setdefaulttimeout(1)
+            # 调用 XML-RPC 方法，重试不超过1秒
+            _call_context.deadline = time.monotonic() + 1
             self.robot.GetControllerIP()
         except socket.timeout:
             print("XML-RPC connection timed out.")
-            RPC.is_conect = False
+            self.is_conect = False
 
-        except socket.error as e:
+        except (socket.error, RPCUnavailable) as e:
             print("可能是网络故障，请检查网络连接。")
-            RPC.is_conect = False
+            self.is_conect = False
         except Exception as e:
             print("An error occurred during XML-RPC call:", e)
-            RPC.is_conect = False
+            self.is_conect = False
         finally:
-            # 恢复默认超时时间
-            self.robot = None
-            socket.setdefaulttimeout(None)
-            self.robot = xmlrpc.client.ServerProxy(link)
+            _call_context.deadline = None
+            self.breaker.reset()
+
+    def _init_state(self, ip):
+        """初始化实例状态，不建立任何连接；回放上下文等不连接控制器的实例也由此初始化"""
+        self.lock = threading.Lock()  # 增加锁
+        self.ip_address = ip
+        # 连接与日志状态均属于实例，同一进程中的多台机器人互不影响
+        self.is_conect = True
+        self.log_output_model = -1
+        self.log_handler = None
+        self.reconnect_flag = False
+        link = 'http://' + self.ip_address + ":20003"
+        self.retry_policy = RetryPolicy()
+        self.breaker = CircuitBreaker()  # 请求连续失败或实时端口重连失败时打开
+        self.transport = KeepAliveTransport(retry_policy=self.retry_policy, breaker=self.breaker)
+        self.multicall_supported = None  # 控制器是否支持system.multicall，首次批量提交时确定
+        self.robot = xmlrpc.client.ServerProxy(link, transport=self.transport)#xmlrpc连接机器人20003端口，用于发送机器人指令数据帧
+
+        self.sock_cli_state = None
+        self.robot_realstate_exit = False
+        self.state_buffer = StateDoubleBuffer()#机器人状态数据
+        self.state_history = None
+        self.state_recorder = None
+        self.motion_tracker = MotionTracker()
+        self.torque_loop = None  # 接收线程驱动的ServoJT力矩控制回路
+        self.upgrade_watcher = None  # SoftwareUpgrade阻塞等待期间的升级进度跟踪
+        self.callback_dispatch = None  # 用户回调的执行方式 dispatch(func)，None为在状态接收线程中直接调用
+        self.kinematics = None  # 本地运动学，enable_local_kinematics()后启用
+        self.kin_cache = KinematicsCache()  # GetInverseKin/GetForwardKin结果缓存
+        self.config_cache = ConfigCache()  # GetTCPOffset等配置读取结果缓存
+        self.motion_submit_queue = None
+        self.file_transfer_lock = threading.Lock()  # 20010/20011端口文件传输互斥
+
+        self.stop_event = threading.Event()  # 停止事件
+        self.connected_event = threading.Event()  # 连接可用事件，重连期间清除
+        self.connected_event.set()
+        self.reconnect_wait_lock = threading.Lock()
+        self.reconnect_wait_stats = {"waits": 0, "timeouts": 0, "unreachable": 0, "blocked_time": 0.0,
+                                     "max_blocked_time": 0.0}
+        self.reconnect_manager = ReconnectManager(self)
 
     def connect_to_robot(self):
         """连接到机器人的实时端口"""
@@ -289,58 +2194,36 @@ class RPC():
             return False
         except Exception as ex:
             self.sock_cli_state_state = False
-            print("SDK连接机器人实时端口失败", ex)
+            # 重连时每次尝试都会调用，只记录debug日志，不输出到终端
+            self.log_debug("SDK连接机器人实时端口失败: %s" % ex)
             return False
         return True
 
     def reconnect(self):
-        """自动重连"""
+        """
+        自动重连，在状态接收线程中调用：重新连接实时端口，同时由ReconnectManager在后台恢复指令端口；
+        返回后接收线程收到第一帧有效数据且指令端口恢复时，等待重连的指令才被唤醒
+        """
         max_retries = 1000
-        retry_interval = 2  # 2秒
-        # with self.lock:  # 加锁
-        # RPC.is_conect = False
-        # print("断联")
+        manager = self.reconnect_manager
         self.reconnect_flag = True
-        for attempt in range(max_retries):
-            # print(f"尝试重新连接，第 {attempt + 1} 次")
-            # print(f"尝试重新连接")
+        self.connected_event.clear()
+        manager.begin()
+        for attempt, delay in zip(range(max_retries), manager.backoff()):
             # 确保 self.sock_cli_state 是新的 socket 对象
             if self.sock_cli_state:
                 self.sock_cli_state.close()  # 关闭旧的 socket
                 self.sock_cli_state = None  # 重置为 None
-            # 重新初始化 XML-RPC 连接
-            # self.robot = None
-            # link = 'http://' + self.ip_address + ":20003"
-            # self.robot = xmlrpc.client.ServerProxy(link)
-            # 尝试连接
-
+            manager.stats["realtime_attempts"] += 1
             if self.connect_to_robot():
-                # print("重新连接成功")
                 self.SDK_state = True
-                self.reconnect_flag = False
+                manager.realtime_connected()
                 return True
-                # 验证 XML-RPC 连接
-                # try:
-                #     time.sleep(1)
-                #     self.Mode(0)  # 调用一个简单的 XML-RPC 方法
-                #     time.sleep(1)
-                #     self.Mode(1)  # 调用一个简单的 XML-RPC 方法
-                #     time.sleep(1)
-                #     # self.robot.Mode(0)  # 调用一个简单的 XML-RPC 方法
-                #     # time.sleep(1)
-                #     # self.robot.Mode(1)  # 调用一个简单的 XML-RPC 方法
-                #     # time.sleep(1)
-                #     # self.Mode(0)  # 调用一个简单的 XML-RPC 方法
-                #     print("XML-RPC 连接验证成功")
-                #     self.reconnect_flag = False
-                #     # RPC.is_conect = True
-                #     return True
-                # except Exception as ex:
-                #     print("XML-RPC 连接验证失败:", ex)
-                #     self.SDK_state = False
-            else:
-                # print(f"重新连接失败，等待 {retry_interval} 秒后重试...")
-                time.sleep(retry_interval)
+            if self.closeRPC_state or self.stop_event.is_set():
+                return False
+            # 控制器不可达，指令直接失败而不是等待重连
+            self.breaker.trip()
+            time.sleep(delay)
 
         print("已达到最大重连次数，连接失败")
         self.SDK_state = False
@@ -362,6 +2245,42 @@ class RPC():
         #         return
 
 
+    def wait_connected(self, deadline=None):
+        """
+        等待重连完成，重连成功时立即唤醒；断路器打开（实时端口重连失败）时不再等待，立即返回False
+        @param  deadline time.monotonic()截止时间，默认使用当前指令传入的deadline，均未指定时等到重连成功或断路器打开
+        @return True-连接可用，False-超过截止时间或控制器不可达
+        """
+        if self.connected_event.is_set():
+            return True
+        if deadline is None:
+            deadline = getattr(_call_context, "deadline", None)
+        start = now = time.monotonic()
+        ready = unreachable = False
+        while True:
+            if self.breaker.state != "closed":
+                unreachable = True
+                break
+            # 断路器打开不会唤醒connected_event，按WAIT_SLICE检查一次
+            timeout = self.WAIT_SLICE if deadline is None else min(self.WAIT_SLICE, deadline - now)
+            if timeout <= 0:
+                break
+            ready = self.connected_event.wait(timeout)
+            now = time.monotonic()
+            if ready:
+                break
+        blocked = now - start
+        with self.reconnect_wait_lock:
+            stats = self.reconnect_wait_stats
+            stats["waits"] += 1
+            stats["blocked_time"] += blocked
+            stats["max_blocked_time"] = max(stats["max_blocked_time"], blocked)
+            if unreachable:
+                stats["unreachable"] += 1
+            elif not ready:
+                stats["timeouts"] += 1
+        return ready
+
     def robot_state_routine_thread_old(self):
         """处理机器人状态数据包的线程例程"""
 
@@ -456,102 +2375,76 @@ class RPC():
                     # print("SDK读取机器人实时数据失败", ex)
                     self.reconnect()
 
+    def _state_receiver(self):
+        """
+        创建20004端口的接收函数，本实例的接收线程与RobotFleet的共享接收线程共用
+        @return receive(sock) 接收一次并解析其中的完整帧，返回接收字节数
+        """
+        parser = RobotStateParser()
+        recv_buffer = StateRecvBuffer(self.BUFFER_SIZE)
+        self.state_parser = parser
+        self.state_recv_buffer = recv_buffer
+        recvview = recv_buffer.view
+        publish = self.state_buffer.publish
+        motion_tracker = self.motion_tracker
+        recv_time = 0.0
+        last_frame = -1  # 本次接收中最新一帧的偏移量
+
+        reconnect_manager = self.reconnect_manager
+
+        def on_frame(offset, frame_len):
+            nonlocal last_frame
+            last_frame = offset
+            if reconnect_manager.waiting_frame:
+                reconnect_manager.realtime_ready()
+            publish(recvview, offset, frame_len, recv_time)
+            history = self.state_history
+            if history is not None:
+                history.append(recv_buffer.address + offset, frame_len, self.state_buffer.seq, recv_time)
+            recorder = self.state_recorder
+            if recorder is not None:
+                recorder.append(recv_buffer.address + offset, frame_len, self.state_buffer.seq, recv_time)
+            if motion_tracker.pending:
+                motion_tracker.on_state(recvview, offset, recv_time)
+            upgrade_watcher = self.upgrade_watcher
+            if upgrade_watcher is not None:
+                upgrade_watcher.on_state(recvview, offset, recv_time)
+
+        def receive(sock):
+            nonlocal recv_time, last_frame
+            recvbyte = recv_buffer.recv_from(sock)
+            if recvbyte <= 0:
+                return recvbyte
+            recv_tick = time.perf_counter()
+            recv_time = time.time()
+            last_frame = -1
+            recv_buffer.parse(parser, on_frame)
+            torque_loop = self.torque_loop
+            if torque_loop is not None and last_frame >= 0:
+                torque_loop.on_state(recvview, last_frame, recv_tick)
+            return recvbyte
+
+        return receive
+
     def robot_state_routine_thread(self):
         """处理机器人状态数据包的线程例程"""
+        receive = self._state_receiver()
+        recv_buffer = self.state_recv_buffer
 
         while not self.closeRPC_state:
-            recvbuf = bytearray(self.BUFFER_SIZE)
-            tmp_recvbuf = bytearray(self.BUFFER_SIZE)
-            state_pkg = bytearray(self.BUFFER_SIZE)
-            find_head_flag = False
-            index = 0
-            length = 0
-            tmp_len = 0
-            expected_length = self.BUFFER_SIZE  # 初始期望接收长度
-
+            recv_buffer.reset()
             try:
                 while not self.robot_realstate_exit and not self.stop_event.is_set():
-                    recvbyte = self.sock_cli_state.recv_into(recvbuf)
+                    recvbyte = receive(self.sock_cli_state)
 
                     if recvbyte <= 0:
                         self.sock_cli_state.close()
                         print("接收机器人状态字节 -1")
                         if not self.reconnect():
                             return
+                        recv_buffer.reset()
                         continue
 
-                    # 处理临时缓冲区数据
-                    if tmp_len > 0:
-                        if tmp_len + recvbyte <= self.BUFFER_SIZE:
-                            recvbuf[:tmp_len + recvbyte] = tmp_recvbuf[:tmp_len] + recvbuf[:recvbyte]
-                            recvbyte += tmp_len
-                            tmp_len = 0
-                        else:
-                            tmp_len = 0
-
-                    i = 0
-                    while i < recvbyte:
-                        # 查找包头
-                        if format(recvbuf[i], '02X') == "5A" and not find_head_flag:
-                            if i + 4 < recvbyte and format(recvbuf[i + 1], '02X') == "5A":
-                                find_head_flag = True
-                                state_pkg[0] = recvbuf[i]
-                                index = 1
-                                length = (recvbuf[i + 4] << 8) | recvbuf[i + 3]
-
-                                # 检查长度是否超过预期
-                                if length + 7 > expected_length:
-                                    expected_length = length + 7
-                                    # 需要接收更多数据
-                                    tmp_recvbuf[:recvbyte - i] = recvbuf[i:recvbyte]
-                                    tmp_len = recvbyte - i
-                                    find_head_flag = False
-                                    break
-
-                                i += 1
-                            else:
-                                i += 1
-                                continue
-
-                        # 已找到包头，收集数据
-                        elif find_head_flag and index < length + 5:
-                            if i >= recvbyte:
-                                break
-
-                            state_pkg[index] = recvbuf[i]
-                            index += 1
-                            i += 1
-
-                        # 检查校验和
-                        elif find_head_flag and index >= length + 5:
-                            if i + 1 < recvbyte:
-                                checksum = sum(state_pkg[:index])
-                                checkdata = (recvbuf[i + 1] << 8) | recvbuf[i]
-
-                                if checksum == checkdata:
-                                    self.robot_state_pkg = RobotStatePkg.from_buffer_copy(state_pkg[:index])
-                                    find_head_flag = False
-                                    index = 0
-                                    length = 0
-                                    expected_length = self.BUFFER_SIZE  # 重置期望长度
-                                    i += 2
-                                else:
-                                    # 校验失败处理
-                                    self.robot_state_pkg.jt_cur_pos[0] = 0
-                                    self.robot_state_pkg.jt_cur_pos[1] = 0
-                                    self.robot_state_pkg.jt_cur_pos[2] = 0
-                                    find_head_flag = False
-                                    index = 0
-                                    length = 0
-                                    i += 2
-                            else:
-                                # 数据不足，保存到临时缓冲区
-                                tmp_recvbuf[:recvbyte - i] = recvbuf[i:recvbyte]
-                                tmp_len = recvbyte - i
-                                break
-                        else:
-                            i += 1
-
             except Exception as ex:
                 if not self.closeRPC_state:
                     self.sock_cli_state.close()
@@ -560,9 +2453,418 @@ class RPC():
                     # print("SDK读取机器人实时数据失败", ex)
                     self.reconnect()
 
+    @property
+    def robot_state_pkg(self):
+        """最新一帧机器人状态的副本，需要读取多个字段时应先取出再读取，保证字段来自同一帧"""
+        return self.state_buffer.snapshot().state
+
+    def get_state_snapshot(self):
+        """
+        获取最新一帧机器人状态快照，读取方不加锁
+        @return RobotStateSnapshot(seq, frame_cnt, recv_time, state)，seq为0表示尚未收到状态帧
+        """
+        return self.state_buffer.snapshot()
+
+    def enable_state_history(self, capacity=10000, fields=StateHistory.FIELDS):
+        """
+        开启实时状态历史记录(需要numpy)
+        @param  capacity 保存的最大帧数，例如1kHz采样保存10秒为10000
+        @param  fields 记录的RobotStatePkg字段
+        @return StateHistory 对象，可调用history(seconds)、since(seq)查询
+        """
+        self.state_history = StateHistory(capacity, fields)
+        return self.state_history
+
+    def disable_state_history(self):
+        """关闭实时状态历史记录"""
+        self.state_history = None
+
+    def start_state_recording(self, path, chunk_frames=1000):
+        """
+        开始将每个校验通过的20004状态帧记录到列式文件(需要numpy)，文件已存在时追加
+        @param  path 记录文件路径
+        @param  chunk_frames 每个数据块的帧数
+        @return StateRecorder 对象
+        """
+        self.stop_state_recording()
+        self.state_recorder = StateRecorder(path, chunk_frames)
+        return self.state_recorder
+
+    def stop_state_recording(self):
+        """
+        停止状态记录
+        @return 记录统计 {"frames": 写入帧数, "dropped_frames": 丢弃帧数}，未在记录时返回None
+        """
+        recorder = self.state_recorder
+        if recorder is None:
+            return None
+        self.state_recorder = None
+        recorder.close()
+        return {"frames": recorder.frames, "dropped_frames": recorder.dropped_frames}
+
+    def start_torque_control(self, control, interval=0.001):
+        """
+        开始由状态接收线程驱动的ServoJT力矩控制，结束时调用返回对象的stop()
+        @param  control 控制函数 control(jt_cur_pos, actual_qd, jt_cur_tor) -> 6关节力矩(Nm)或None
+        @param  interval ServoJT指令周期，单位 [s]
+        @return 错误码 成功-0  失败-错误码
+        @return TorqueControlLoop 对象，可调用latency_stats()获取端到端延迟
+        """
+        loop = TorqueControlLoop(self, control, interval)
+        return loop.start(), loop
+
+    def enable_local_kinematics(self, dh=Kinematics.FR5_DH, zero_offset=(0.0, 0.0, 0.0, 0.0, 0.0, 0.0), verify=True,
+                                samples=50, pos_tolerance=0.1, joint_tolerance=0.01):
+        """
+        启用本地运动学(需要numpy)：以名义DH参数加控制器的DH补偿值(GetDHCompensation)与当前工具坐标系
+        (GetTCPOffset)建立模型，经verify_kinematics验证通过后，MoveL/MoveJ未给出joint_pos/desc_pos时
+        在本地求解，不再调用GetInverseKin/GetForwardKin；本地模型的位姿为基坐标系下的位姿，运动指令的工具号
+        与建模时的工具号不同、工件号不为0或本地逆解不收敛时仍由控制器求解。更换工具坐标系后需重新调用；
+        本地模型不含基座安装角度，GetRobotInstallAngle不为0时不启用
+        @param  dh 名义DH参数 d1,a2,a3,d4,d5,d6，单位 [mm]，默认FR5
+        @param  zero_offset 关节零位与DH模型零位之差，单位 [°]
+        @param  verify 是否先与控制器对比验证
+        @param  samples 验证的随机位姿数
+        @param  pos_tolerance 正解位置允许误差，单位 [mm]
+        @param  joint_tolerance 逆解关节允许误差，单位 [°]
+        @return 错误码 成功-0  失败-错误码，验证未通过或安装角度不为0时返回 RobotError.ERR_OTHER
+        @return 验证统计 dict，见verify_kinematics，未验证时为None
+        """
+        error, angle = self.GetRobotInstallAngle()
+        if error != 0:
+            return error, None
+        if any(abs(float(value)) > 1e-6 for value in angle):
+            self.log_error("本地运动学不支持非零安装角度 %s" % (angle,))
+            return RobotError.ERR_OTHER, None
+        error, compensation = self.GetDHCompensation()
+        if error != 0:
+            return error, None
+        error, tool = self.GetTCPOffset(0)
+        if error != 0:
+            return error, None
+        kinematics = Kinematics(dh, compensation, tool, zero_offset)
+        kinematics.tool_id = self.robot_state_pkg.tool
+        stats = None
+        if verify:
+            error, stats = self.verify_kinematics(kinematics, samples, pos_tolerance, joint_tolerance)
+            if error != 0:
+                return error, stats
+            if not stats["passed"]:
+                return RobotError.ERR_OTHER, stats
+        self.kinematics = kinematics
+        return 0, stats
+
+    def disable_local_kinematics(self):
+        """停用本地运动学，MoveL/MoveJ恢复由控制器求解"""
+        self.kinematics = None
+
+    def verify_kinematics(self, kinematics, samples=50, pos_tolerance=0.1, joint_tolerance=0.01, seed=None):
+        """
+        在随机关节位置上将本地正/逆解与控制器GetForwardKin/GetInverseKinRef对比，所有查询合并为一次批量提交
+        @param  kinematics Kinematics对象
+        @param  samples 随机关节位置数，各关节在[-170°,170°]内均匀分布
+        @param  seed 随机数种子
+        @return 错误码 成功-0  失败-错误码
+        @return 统计 dict samples 样本数, fk_pos_max 正解位置最大误差 [mm], fk_rot_max 正解姿态最大误差 [°],
+                ik_joint_max 逆解关节最大误差 [°], ik_unconverged 本地逆解未收敛数, passed 是否通过
+        """
+        rng = np.random.default_rng(seed)
+        joints = rng.uniform(-170.0, 170.0, (samples, 6))
+        refs = joints + rng.uniform(-2.0, 2.0, (samples, 6))
+        with self.batch():
+            fk_calls = [self.GetForwardKin(joint.tolist()) for joint in joints]
+        poses = []
+        for call in fk_calls:
+            error, pose = call.result()
+            if error != 0:
+                return error, None
+            poses.append(pose)
+        with self.batch():
+            ik_calls = [self.GetInverseKinRef(0, pose, ref.tolist()) for pose, ref in zip(poses, refs)]
+        solutions = []
+        for call in ik_calls:
+            error, joint = call.result()
+            if error != 0:
+                return error, None
+            solutions.append(joint)
+        poses = np.asarray(poses)
+        local_poses = kinematics.fk_many(joints)
+        rot_diff = (local_poses[:, 3:] - poses[:, 3:] + 180.0) % 360.0 - 180.0
+        local_joints, converged = kinematics.ik_many(poses, refs)
+        joint_diff = np.abs((local_joints - np.asarray(solutions) + 180.0) % 360.0 - 180.0)[converged]
+        stats = {
+            "samples": samples,
+            "fk_pos_max": float(np.abs(local_poses[:, :3] - poses[:, :3]).max()),
+            "fk_rot_max": float(np.abs(rot_diff).max()),
+            "ik_joint_max": float(joint_diff.max()) if len(joint_diff) else 0.0,
+            "ik_unconverged": int(samples - converged.sum()),
+        }
+        stats["passed"] = stats["fk_pos_max"] <= pos_tolerance and stats["ik_joint_max"] <= joint_tolerance and \
+            stats["ik_unconverged"] <= samples // 20
+        return 0, stats
+
+    def _local_forward_kin(self, joint_pos, tool, user):
+        """本地正解，不可用或使用工件坐标系(user不为0)时返回None"""
+        kinematics = self.kinematics
+        if kinematics is None or tool != kinematics.tool_id or user != 0:
+            return None
+        return kinematics.fk(joint_pos)
+
+    def _local_inverse_kin(self, desc_pos, tool, user):
+        """以当前关节位置为参考的本地逆解，不可用、使用工件坐标系(user不为0)或不收敛时返回None"""
+        kinematics = self.kinematics
+        if kinematics is None or tool != kinematics.tool_id or user != 0:
+            return None
+        converged, joint_pos = kinematics.ik(desc_pos, list(self.robot_state_pkg.jt_cur_pos))
+        return joint_pos if converged else None
+
+    # 执行后清空运动学缓存的指令
+    KINEMATICS_SETTERS = ("SetToolCoord", "SetToolList", "SetExToolCoord", "SetExToolList", "SetWObjCoord",
+                          "SetWObjList", "SetRobotInstallPos", "SetRobotInstallAngle", "SetAxisDHParaConfig")
+
+    # 执行后清除配置缓存的指令
+    CONFIG_SETTERS = KINEMATICS_SETTERS + ("SetLoadWeight", "SetLoadCoord", "SetLimitPositive", "SetLimitNegative",
+                                           "SoftwareUpgrade")
+
+    def _cached_call(self, cache, method, params, key_params=None):
+        """
+        经缓存调用控制器方法，返回值与self.robot直接调用相同；未命中时向控制器查询，
+        成功结果([0, ...])按当前工具号、工件号缓存
+        @param  key_params 缓存键使用的参数，默认为params
+        """
+        pkg = self.robot_state_pkg
+        key = cache.key(method, params if key_params is None else key_params, pkg.tool, pkg.user)
+        result = self._cache_lookup(cache, key)
+        if result is None:
+            result = getattr(self.robot, method)(*params)
+            if isinstance(result, list) and result[0] == 0:
+                cache.put(key, list(result))
+            return result
+        return list(result)
+
+    def _cache_lookup(self, cache, key):
+        return cache.get(key)
+
+    def _call_many(self, calls):
+        """
+        按顺序调用多个控制器方法，控制器支持时合并为一次system.multicall请求
+        @param  calls [(方法名, 参数元组)]
+        @return 各方法的返回值列表；任一方法失败时抛出xmlrpc.client.Fault，与直接调用相同
+        """
+        if len(calls) > 1 and self.multicall_supported is not False:
+            try:
+                results = self.robot.system.multicall(
+                    [{"methodName": method, "params": list(params)} for method, params in calls])
+            except xmlrpc.client.Fault:
+                self.multicall_supported = False
+            else:
+                self.multicall_supported = True
+                for result in results:
+                    if isinstance(result, dict):
+                        raise xmlrpc.client.Fault(result["faultCode"], result["faultString"])
+                return [result[0] for result in results]
+        return [getattr(self.robot, method)(*params) for method, params in calls]
+
+    def _cached_kin(self, method, *params):
+        """
+        经运动学缓存调用控制器的GetInverseKin/GetInverseKinRef/GetForwardKin；
+        GetInverseKin的config为-1时控制器选取当前关节位置附近的解，当前关节位置也作为缓存键的一部分，
+        机器人移动后不会取到其他位置时求得的解
+        """
+        if method == "GetInverseKin" and params[2] == -1:
+            key_params = params + (tuple(self.robot_state_pkg.jt_cur_pos),)
+            return self._cached_call(self.kin_cache, method, params, key_params)
+        return self._cached_call(self.kin_cache, method, params)
+
+    def _cached_config(self, method, *params):
+        """经配置缓存调用控制器的配置读取方法"""
+        return self._cached_call(self.config_cache, method, params)
+
+    def refresh_config(self):
+        """
+        重新读取所有已缓存的配置，合并为一次批量提交
+        @return 错误码 成功-0  失败-第一个失败的错误码
+        """
+        queries = dict.fromkeys((method, params) for method, params, tool, user in self.config_cache.keys())
+        self.config_cache.clear()
+        with self.batch():
+            calls = [getattr(self, method)(*params) for method, params in queries]
+        for call in calls:
+            result = call.result()
+            error = result[0] if isinstance(result, tuple) else result
+            if error != 0:
+                return error
+        return 0
+
+    def get_config_cache_stats(self):
+        """
+        获取配置缓存统计
+        @return dict hits 命中次数, misses 未命中次数, size 缓存条数, invalidations 清除次数
+        """
+        return self.config_cache.stats()
+
+    def invalidate_kinematics_cache(self):
+        """清空运动学缓存并停用本地运动学，设置工具/工件坐标系、安装角度或DH参数后自动调用"""
+        self.kin_cache.clear()
+        self.kinematics = None
+
+    def get_kinematics_cache_stats(self):
+        """
+        获取运动学缓存统计
+        @return dict hits 命中次数, misses 未命中次数, size 缓存条数, invalidations 清空次数
+        """
+        return self.kin_cache.stats()
+
+    MOTION_COMMANDS = ("MoveJ", "MoveL", "MoveC", "Circle", "MoveCart", "NewSpiral")
+
+    def submit_motion(self, command, *args, **kwargs):
+        """
+        非阻塞提交运动指令，由后台线程按提交顺序依次下发，可连续提交带平滑过渡(blendR/blendT)的运动
+        @param  command 运动指令名称，MOTION_COMMANDS 之一，如 "MoveL"
+        @param  args, kwargs 与对应指令的参数相同
+        @return concurrent.futures.Future，状态接收线程判断运动完成后结果为0；指令返回错误码，
+                或执行期间 main_code/collisionState 非零时抛出 RobotMotionError
+        """
+        if command not in self.MOTION_COMMANDS:
+            raise ValueError(f"不支持的运动指令 {command}")
+        future = Future()
+        with self.lock:
+            if self.motion_submit_queue is None:
+                self.motion_submit_queue = Queue()
+                thread = threading.Thread(target=self.motion_submit_thread, args=(self.motion_submit_queue,))
+                thread.daemon = True
+                thread.start()
+            self.motion_submit_queue.put((future, command, args, kwargs))
+        return future
+
+    def motion_submit_thread(self, submit_queue):
+        """运动指令下发线程，控制器接受后交由MotionTracker跟踪完成"""
+        while True:
+            item = submit_queue.get()
+            if item is None:
+                return
+            future, command, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            pkg = self.robot_state_pkg
+            if pkg.main_code != 0 or pkg.collisionState != 0:
+                future.set_exception(RobotMotionError(
+                    f"{command} 未下发 main_code={pkg.main_code} sub_code={pkg.sub_code} collision={pkg.collisionState}",
+                    main_code=pkg.main_code, sub_code=pkg.sub_code, collision=pkg.collisionState))
+                continue
+            # 下发前登记，指令返回前已开始甚至完成的运动也能被观察到
+            tracked = self.motion_tracker.add(future, command, pkg.motion_done, pkg.mc_queue_len)
+            try:
+                error = getattr(self, command)(*args, **kwargs)
+            except Exception as ex:
+                if self.motion_tracker.discard(tracked):
+                    future.set_exception(ex)
+                continue
+            if error != 0:
+                if self.motion_tracker.discard(tracked):
+                    future.set_exception(RobotMotionError(f"{command} 返回错误码 {error}", error=error))
+                continue
+            self.motion_tracker.accept(tracked)
+
+    def stop_motion_submit(self):
+        """停止运动指令下发线程，尚未下发的指令取消，未完成的指令失败"""
+        with self.lock:
+            submit_queue, self.motion_submit_queue = self.motion_submit_queue, None
+        if submit_queue is not None:
+            while True:
+                try:
+                    item = submit_queue.get_nowait()
+                except Empty:
+                    break
+                if item is not None:
+                    item[0].cancel()
+            submit_queue.put(None)
+        self.motion_tracker.fail_all(RobotError.ERR_SOCKET_COM_FAILED, "连接已关闭，运动未完成")
+
+    def get_state_recv_stats(self):
+        """
+        获取20004端口接收统计
+        @return dict frames 有效帧数, checksum_errors 校验失败帧数, bytes_received 接收字节数,
+                bytes_copied 缓冲区搬移字节数, copied_per_frame 平均每帧复制字节数(含状态结构体拷贝),
+                gc_collections 进程累计GC次数, max_rss_kb 进程峰值常驻内存
+        """
+        parser = getattr(self, "state_parser", None)
+        recv_buffer = getattr(self, "state_recv_buffer", None)
+        if parser is None or recv_buffer is None:
+            return None
+        frames = parser.frame_count
+        copied = recv_buffer.bytes_copied + frames * sizeof(RobotStatePkg)
+        stats = {
+            "frames": frames,
+            "checksum_errors": parser.checksum_errors,
+            "bytes_received": recv_buffer.bytes_received,
+            "bytes_copied": recv_buffer.bytes_copied,
+            "copied_per_frame": copied / frames if frames else 0.0,
+            "gc_collections": sum(gen["collections"] for gen in gc.get_stats()),
+            "max_rss_kb": None,
+        }
+        if resource is not None:
+            stats["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return stats
+
+    def batch(self):
+        """
+        批量提交指令，with块内调用的指令返回BatchCall，退出时合并发送
+            with robot.batch() as batch:
+                robot.SetSpeed(20)
+                move = robot.MoveL(desc_pos, 0, 0)
+            error = move.result()
+        @return RPCBatch
+        """
+        return RPCBatch(self)
+
+    def get_log_stats(self):
+        """
+        获取后台日志写入统计
+        @return dict queued 队列中待写入的记录数, written 已写入数, dropped 队列满时丢弃数, rotations 文件轮转次数；
+                未使用后台写入模式时返回None
+        """
+        handler = self.log_handler
+        if handler is None:
+            return None
+        return {"queued": len(handler.records), "written": handler.written, "dropped": handler.dropped,
+                "rotations": handler.rotations}
+
+    def get_rpc_timings(self):
+        """
+        获取20003端口各方法的往返耗时
+        @return dict connects 累计建立的TCP连接数, methods {方法名: {count, mean, max, last}}，耗时单位 [s]
+        """
+        transport = self.transport
+        with transport._lock:
+            methods = {name: {"count": count, "mean": total / count, "max": longest, "last": last}
+                       for name, (count, total, longest, last) in transport.timings.items()}
+            return {"connects": transport.connects, "methods": methods}
+
+    def get_rpc_health(self):
+        """
+        获取20003端口请求的重试与断路器状态
+        @return dict breaker 断路器状态 closed/open/half_open, failures 连续失败次数, trips 断路器打开次数,
+                rejected 断路器拒绝的指令数, retries 累计重试次数, failed_requests 重试后仍失败的请求数
+        """
+        breaker = self.breaker
+        return {"breaker": breaker.state, "failures": breaker.failures, "trips": breaker.trips,
+                "rejected": breaker.rejected, "retries": self.transport.retries,
+                "failed_requests": self.transport.failures}
+
+    def get_reconnect_stats(self):
+        """
+        获取断线重连统计
+        @return dict reconnects 完成的重连次数, in_progress 是否正在重连, last_duration/max_duration/total_duration
+                从断开到两个端口都恢复的耗时, last_realtime_duration 实时端口收到第一帧的耗时,
+                last_command_duration 指令端口恢复的耗时, realtime_attempts/command_attempts 累计连接尝试次数，单位 [s]
+        """
+        return dict(self.reconnect_manager.stats)
+
     def setup_logging(self, output_model=1, file_path="", file_num=5):
         """用于处理日志"""
-        self.logger = logging.getLogger("RPCLogger")
+        # 每个控制器使用独立的子日志器，多台机器人的日志不会写入彼此的文件
+        self.logger = logging.getLogger("RPCLogger").getChild(self.ip_address.replace(".", "_"))
         log_level = logging.DEBUG
         log_handler = None
 
@@ -581,14 +2883,11 @@ class RPC():
             return -1  # 如果目录不存在，则返回错误码
 
         if output_model == 0:
-            RPC.log_output_model = 0
+            self.log_output_model = 0
             log_handler = RotatingFileHandler(file_path, maxBytes=50 * 1024, backupCount=file_num)
-        elif output_model == 1:
-            RPC.log_output_model = 1
-            log_handler = BufferedFileHandler(file_path, mode='a', maxBytes=50 * 1024, backupCount=file_num)
-        elif output_model == 2:
-            RPC.log_output_model = 2
-            log_handler = BufferedFileHandler(file_path, mode='a', maxBytes=50 * 1024, backupCount=file_num)
+        elif output_model == 1 or output_model == 2:
+            self.log_output_model = output_model
+            log_handler = AsyncLogHandler(file_path, maxBytes=50 * 1024, backupCount=file_num)
             self.start_logging_thread(log_handler)
 
         formatter = logging.Formatter('[%(levelname)s] [%(asctime)s pid:%(process)d]  %(message)s')
@@ -602,15 +2901,13 @@ class RPC():
 
     def start_logging_thread(self, log_handler):
         """创建线程进行日志存储"""
-        logging_thread = LogWriterThread(RPC.queue, log_handler)
-        RPC.logging_thread = logging_thread  # 存储日志线程的引用
-        logging_thread.start()
+        log_handler.start()
+        self.log_handler = log_handler  # 存储日志处理器的引用
 
     def join_logging_thread(self):
         """通知日志线程停止"""
-        if RPC.logging_thread is not None:
-            RPC.queue.put(None)  # 通知日志线程停止
-            RPC.logging_thread.join()  # 等待日志线程完成
+        if self.log_handler is not None:
+            self.log_handler.close()  # 写完队列中的日志后停止
 
     def __del__(self):
         """垃圾回收器，类似于析构"""
@@ -624,33 +2921,37 @@ class RPC():
         return log_level
 
     def log_call(func):
-        """记录函数调用的日志操作"""
+        """记录函数调用的日志操作，未设置日志或等级被过滤时不做任何格式化"""
+        name = func.__name__
+
         @wraps(func)
         def wrapper(self, *args, **kwargs):
-            args_str = ', '.join(map(repr, args))
-            kwargs_str = ', '.join([f"{key}={value}" for key, value in kwargs.items()])
-            if (kwargs_str) == "":
-                call_message = f"Calling {func.__name__}" + f"({args_str}" + ")."
-            else:
-                call_message = f"Calling {func.__name__}" + f"({args_str}" + "," + f"{kwargs_str})."
+            logger = self.logger
+            if logger is None:
+                return func(self, *args, **kwargs)
 
-            self.log_info(call_message)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Calling %s(%s).", name, _CallArgs(args, kwargs))
             result = func(self, *args, **kwargs)
+            if isinstance(result, BatchCall):
+                return result
             if isinstance(result, (list, tuple)) and len(result) > 0:
-                if result[0] == 0:
-                    self.log_debug(f"{func.__name__} returned: {result}.")
-                else:
-                    self.log_error(f"{func.__name__} Error occurred. returned: {result}")
+                error = result[0]
             else:
-                if result == 0:
-                    self.log_debug(f"{func.__name__} returned: {result}.")
-                else:
-                    self.log_error(f"{func.__name__} Error occurred. returned: {result}")
+                error = result
+            if error == 0:
+                logger.debug("%s returned: %s.", name, result)
+            else:
+                logger.error("%s Error occurred. returned: %s", name, result)
 
             return result
 
         return wrapper
 
+    def sleep(self, seconds):
+        """指令实现中两次请求之间的等待，batch()回放指令时只等待一次"""
+        time.sleep(seconds)
+
     def log_debug(self, message):
         """用于记录debug等级日志"""
         if self.logger:
@@ -683,22 +2984,26 @@ class RPC():
             sock1.sendall(message.encode('utf-8'))
 
             response = sock1.recv(1024).decode('utf-8')
-
-            value =response.split('III')
-            if len(value) ==6:
-                if value[4] == "1":
-                    return 0
-                else:
-                    print("error happended",value[4])
-                    return -1
-            else:
-                return -1
+            return self.parse_message_response(response)
         except Exception as e:
             print(f'An error occurred: {e}')
 
         finally:
             sock1.close()
 
+    @staticmethod
+    def parse_message_response(response):
+        """解析8080端口的应答，成功返回0，失败返回-1"""
+        value =response.split('III')
+        if len(value) ==6:
+            if value[4] == "1":
+                return 0
+            else:
+                print("error happended",value[4])
+                return -1
+        else:
+            return -1
+
     """2024.12.23"""
     """   
        @brief 安全代码获取
@@ -706,8 +3011,9 @@ class RPC():
     """
 
     def GetSafetyCode(self):
-        if (self.robot_state_pkg.safety_stop0_state == 1) or (self.robot_state_pkg.safety_stop1_state == 1):
-            return 99
+        pkg = self.robot_state_pkg
+        if (pkg.safety_stop0_state == 1) or (pkg.safety_stop1_state == 1):
+            return RobotError.ERR_SAFETY_STOP
         return 0
     """2024.12.23"""
     """   
@@ -738,8 +3044,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetControllerIP(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -763,8 +3069,8 @@ class RPC():
     @xmlrpc_timeout
     def Mode(self, state):
         flag = True
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
 
         state = int(state)
         flag = True
@@ -786,8 +3092,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def DragTeachSwitch(self, state):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         state = int(state)  # 强制转换为int型
         flag = True
         while flag:
@@ -808,8 +3114,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def IsInDragTeach(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -832,8 +3138,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def RobotEnable(self, state):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         state = int(state)  # 强制转换为int型
         flag = True
         while flag:
@@ -862,8 +3168,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def StartJOG(self, ref, nb, dir, max_dis, vel=20.0, acc=100.0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         ref = int(ref)  # 强制转换为int型
@@ -890,8 +3196,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def StopJOG(self, ref):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         ref = int(ref)  # 强制转换为int型
         flag = True
         while flag:
@@ -911,8 +3217,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ImmStopJOG(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -942,8 +3248,8 @@ class RPC():
     @xmlrpc_timeout
     def MoveJ(self, joint_pos, tool, user, desc_pos=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0], vel=20.0, acc=0.0, ovl=100.0,
               exaxis_pos=[0.0, 0.0, 0.0, 0.0], blendT=-1.0, offset_flag=0, offset_pos=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0]):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         joint_pos = list(map(float, joint_pos))
@@ -959,12 +3265,14 @@ class RPC():
         offset_pos = list(map(float, offset_pos))
         if (desc_pos[0] == 0.0) and (desc_pos[1] == 0.0) and (desc_pos[2] == 0.0) and (desc_pos[3] == 0.0) and (
                 desc_pos[4] == 0.0) and (desc_pos[5] == 0.0):  # 若未输入参数则调用正运动学求解
-            ret = self.robot.GetForwardKin(joint_pos)  # 正运动学求解
-            if ret[0] == 0:
-                desc_pos = [ret[1], ret[2], ret[3], ret[4], ret[5], ret[6]]
-            else:
-                error = ret[0]
-                return error
+            desc_pos = self._local_forward_kin(joint_pos, tool, user)
+            if desc_pos is None:
+                ret = self._cached_kin("GetForwardKin", joint_pos)  # 正运动学求解
+                if ret[0] == 0:
+                    desc_pos = [ret[1], ret[2], ret[3], ret[4], ret[5], ret[6]]
+                else:
+                    error = ret[0]
+                    return error
         flag = True
         while flag:
             try:
@@ -1000,8 +3308,8 @@ class RPC():
     def MoveL(self, desc_pos, tool, user, joint_pos=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0], vel=20.0, acc=0.0, ovl=100.0,
               blendR=-1.0, blendMode = 0,exaxis_pos=[0.0, 0.0, 0.0, 0.0], search=0, offset_flag=0,
               offset_pos=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0],overSpeedStrategy=0,speedPercent=10):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         desc_pos = list(map(float, desc_pos))
@@ -1025,12 +3333,14 @@ class RPC():
                 return error
         if ((joint_pos[0] == 0.0) and (joint_pos[1] == 0.0) and (joint_pos[2] == 0.0) and (joint_pos[3] == 0.0)
                 and (joint_pos[4] == 0.0) and (joint_pos[5] == 0.0)):  # 若未输入参数则调用逆运动学求解
-            ret = self.robot.GetInverseKin(0, desc_pos, -1)  # 逆运动学求解
-            if ret[0] == 0:
-                joint_pos = [ret[1], ret[2], ret[3], ret[4], ret[5], ret[6]]
-            else:
-                error1 = ret[0]
-                return error1
+            joint_pos = self._local_inverse_kin(desc_pos, tool, user)
+            if joint_pos is None:
+                ret = self._cached_kin("GetInverseKin", 0, desc_pos, -1)  # 逆运动学求解
+                if ret[0] == 0:
+                    joint_pos = [ret[1], ret[2], ret[3], ret[4], ret[5], ret[6]]
+                else:
+                    error1 = ret[0]
+                    return error1
 
         flag = True
         while flag:
@@ -1081,8 +3391,8 @@ class RPC():
               vel_t=20.0, acc_t=100.0, exaxis_pos_t=[0.0, 0.0, 0.0, 0.0], offset_flag_t=0,
               offset_pos_t=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
               ovl=100.0, blendR=-1.0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         desc_pos_p = list(map(float, desc_pos_p))
@@ -1110,7 +3420,7 @@ class RPC():
 
         if ((joint_pos_p[0] == 0.0) and (joint_pos_p[1] == 0.0) and (joint_pos_p[2] == 0.0) and (joint_pos_p[3] == 0.0)
                 and (joint_pos_p[4] == 0.0) and (joint_pos_p[5] == 0.0)):  # 若未输入参数则调用逆运动学求解
-            retp = self.robot.GetInverseKin(0, desc_pos_p, -1)  # 逆运动学求解
+            retp = self._cached_kin("GetInverseKin", 0, desc_pos_p, -1)  # 逆运动学求解
             if retp[0] == 0:
                 joint_pos_p = [retp[1], retp[2], retp[3], retp[4], retp[5], retp[6]]
             else:
@@ -1119,7 +3429,7 @@ class RPC():
 
         if ((joint_pos_t[0] == 0.0) and (joint_pos_t[1] == 0.0) and (joint_pos_t[2] == 0.0) and (joint_pos_t[3] == 0.0)
                 and (joint_pos_t[4] == 0.0) and (joint_pos_t[5] == 0.0)):  # 若未输入参数则调用逆运动学求解
-            rett = self.robot.GetInverseKin(0, desc_pos_t, -1)  # 逆运动学求解
+            rett = self._cached_kin("GetInverseKin", 0, desc_pos_t, -1)  # 逆运动学求解
             if rett[0] == 0:
                 joint_pos_t = [rett[1], rett[2], rett[3], rett[4], rett[5], rett[6]]
             else:
@@ -1167,8 +3477,8 @@ class RPC():
                vel_p=20.0, acc_p=0.0, exaxis_pos_p=[0.0, 0.0, 0.0, 0.0], vel_t=20.0, acc_t=0.0,
                exaxis_pos_t=[0.0, 0.0, 0.0, 0.0],
                ovl=100.0, offset_flag=0, offset_pos=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0], oacc=100.0, blendR=-1):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         desc_pos_p = list(map(float, desc_pos_p))
@@ -1196,7 +3506,7 @@ class RPC():
 
         if ((joint_pos_p[0] == 0.0) and (joint_pos_p[1] == 0.0) and (joint_pos_p[2] == 0.0) and (joint_pos_p[3] == 0.0)
                 and (joint_pos_p[4] == 0.0) and (joint_pos_p[5] == 0.0)):  # 若未输入参数则调用逆运动学求解
-            retp = self.robot.GetInverseKin(0, desc_pos_p, -1)  # 逆运动学求解
+            retp = self._cached_kin("GetInverseKin", 0, desc_pos_p, -1)  # 逆运动学求解
             if retp[0] == 0:
                 joint_pos_p = [retp[1], retp[2], retp[3], retp[4], retp[5], retp[6]]
             else:
@@ -1205,7 +3515,7 @@ class RPC():
 
         if ((joint_pos_t[0] == 0.0) and (joint_pos_t[1] == 0.0) and (joint_pos_t[2] == 0.0) and (joint_pos_t[3] == 0.0)
                 and (joint_pos_t[4] == 0.0) and (joint_pos_t[5] == 0.0)):  # 若未输入参数则调用逆运动学求解
-            rett = self.robot.GetInverseKin(0, desc_pos_t, -1)  # 逆运动学求解
+            rett = self._cached_kin("GetInverseKin", 0, desc_pos_t, -1)  # 逆运动学求解
             if rett[0] == 0:
                 joint_pos_t = [rett[1], rett[2], rett[3], rett[4], rett[5], rett[6]]
             else:
@@ -1306,8 +3616,8 @@ class RPC():
     def NewSpiral(self, desc_pos, tool, user, param, joint_pos=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0], vel=20.0, acc=0.0,
                   exaxis_pos=[0.0, 0.0, 0.0, 0.0],
                   ovl=100.0, offset_flag=0, offset_pos=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0]):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         desc_pos = list(map(float, desc_pos))
@@ -1329,7 +3639,7 @@ class RPC():
 
         if ((joint_pos[0] == 0.0) and (joint_pos[1] == 0.0) and (joint_pos[2] == 0.0) and (joint_pos[3] == 0.0)
                 and (joint_pos[4] == 0.0) and (joint_pos[5] == 0.0)):  # 若未输入参数则调用逆运动学求解
-            ret = self.robot.GetInverseKin(0, desc_pos, -1)  # 逆运动学求解
+            ret = self._cached_kin("GetInverseKin", 0, desc_pos, -1)  # 逆运动学求解
             if ret[0] == 0:
                 joint_pos = [ret[1], ret[2], ret[3], ret[4], ret[5], ret[6]]
             else:
@@ -1354,8 +3664,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ServoMoveStart(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -1374,8 +3684,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ServoMoveEnd(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -1401,8 +3711,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ServoJ(self, joint_pos,axisPos, acc=0.0, vel=0.0, cmdT=0.008, filterT=0.0, gain=0.0, id=0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         joint_pos = list(map(float, joint_pos))
@@ -1439,8 +3749,8 @@ class RPC():
     @xmlrpc_timeout
     def ServoCart(self, mode, desc_pos, pos_gain=[1.0, 1.0, 1.0, 1.0, 1.0, 1.0], acc=0.0, vel=0.0, cmdT=0.008,
                   filterT=0.0, gain=0.0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         mode = int(mode)
@@ -1469,8 +3779,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ServoJTStart(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -1491,8 +3801,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ServoJT(self, torque, interval):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         torque = list(map(float, torque))
@@ -1516,8 +3826,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ServoJTEnd(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -1544,8 +3854,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def MoveCart(self, desc_pos, tool, user, vel=20.0, acc=0.0, ovl=100.0, blendT=-1.0, config=-1):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         desc_pos = list(map(float, desc_pos))
@@ -1575,8 +3885,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SplineStart(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -1602,8 +3912,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SplinePTP(self, joint_pos, tool, user, desc_pos=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0], vel=20.0, acc=100.0, ovl=100.0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         joint_pos = list(map(float, joint_pos))
@@ -1615,7 +3925,7 @@ class RPC():
         ovl = float(ovl)
         if ((desc_pos[0] == 0.0) and (desc_pos[1] == 0.0) and (desc_pos[2] == 0.0) and (desc_pos[3] == 0.0)
                 and (desc_pos[4] == 0.0) and (desc_pos[5] == 0.0)):  # 若未输入参数则调用正运动学求解
-            ret = self.robot.GetForwardKin(joint_pos)  # 正运动学求解
+            ret = self._cached_kin("GetForwardKin", joint_pos)  # 正运动学求解
             if ret[0] == 0:
                 desc_pos = [ret[1], ret[2], ret[3], ret[4], ret[5], ret[6]]
             else:
@@ -1640,8 +3950,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SplineEnd(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -1662,8 +3972,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def NewSplineStart(self, type, averageTime=2000):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         type = int(type)
         averageTime = int(averageTime)
         flag = True
@@ -1694,8 +4004,8 @@ class RPC():
     @xmlrpc_timeout
     def NewSplinePoint(self, desc_pos, tool, user, lastFlag, joint_pos=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0], vel=0.0,
                        acc=0.0, ovl=100.0, blendR=0.0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         desc_pos = list(map(float, desc_pos))
@@ -1709,7 +4019,7 @@ class RPC():
         blendR = float(blendR)
         if ((joint_pos[0] == 0.0) and (joint_pos[1] == 0.0) and (joint_pos[2] == 0.0) and (joint_pos[3] == 0.0)
                 and (joint_pos[4] == 0.0) and (joint_pos[5] == 0.0)):  # 若未输入参数则调用逆运动学求解
-            ret = self.robot.GetInverseKin(0, desc_pos, -1)  # 逆运动学求解
+            ret = self._cached_kin("GetInverseKin", 0, desc_pos, -1)  # 逆运动学求解
             if ret[0] == 0:
                 joint_pos = [ret[1], ret[2], ret[3], ret[4], ret[5], ret[6]]
             else:
@@ -1734,8 +4044,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def NewSplineEnd(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -1755,8 +4065,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def StopMotion(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -1807,8 +4117,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def PointsOffsetEnable(self, flag, offset_pos):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = int(flag)
         offset_pos = list(map(float, offset_pos))
         flag_tmp = True
@@ -1830,8 +4140,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def PointsOffsetDisable(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -1858,8 +4168,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetDO(self, id, status, smooth=0, block=0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         status = int(status)
         smooth = int(smooth)
@@ -1886,8 +4196,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetToolDO(self, id, status, smooth=0, block=0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         status = int(status)
         smooth = int(smooth)
@@ -1913,8 +4223,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetAO(self, id, value, block=0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         value = float(value)
         block = int(block)
@@ -1939,8 +4249,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetToolAO(self, id, value, block=0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         value = float(value)
         block = int(block)
@@ -2025,8 +4335,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WaitDI(self, id, status, maxtime, opt):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         status = int(status)
         maxtime = int(maxtime)
@@ -2054,8 +4364,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WaitMultiDI(self, mode, id, status, maxtime, opt):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         mode = int(mode)
         id = int(id)
         status = int(status)
@@ -2083,8 +4393,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WaitToolDI(self, id, status, maxtime, opt):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         id = id+1 #控制器内部1对应di0,2对应di1
         status = int(status)
@@ -2214,7 +4524,8 @@ class RPC():
         #     return error, [do_state_h, do_state_l]
         # else:
         #     return error
-        return 0, [self.robot_state_pkg.cl_dgt_output_h,self.robot_state_pkg.cl_dgt_output_l]
+        pkg = self.robot_state_pkg
+        return 0, [pkg.cl_dgt_output_h,pkg.cl_dgt_output_l]
 
     """   
     @brief  等待控制箱模拟量输入
@@ -2229,8 +4540,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WaitAI(self, id, sign, value, maxtime, opt):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         sign = int(sign)
         value = float(value)
@@ -2259,8 +4570,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WaitToolAI(self, id, sign, value, maxtime, opt):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         sign = int(sign)
         value = float(value)
@@ -2289,8 +4600,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetSpeed(self, vel):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         vel = int(vel)
         flag = True
         while flag:
@@ -2312,8 +4623,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetSysVarValue(self, id, value):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         value = float(value)
         flag = True
@@ -2335,8 +4646,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetToolPoint(self, point_num):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         point_num = int(point_num)
         flag = True
         while flag:
@@ -2358,8 +4669,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ComputeTool(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -2383,8 +4694,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetTcp4RefPoint(self, point_num):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         point_num = int(point_num)
         flag = True
         while flag:
@@ -2406,8 +4717,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ComputeTcp4(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -2436,8 +4747,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetToolCoord(self, id, t_coord, type, install, toolID, loadNum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         t_coord = list(map(float, t_coord))
         type = int(type)
@@ -2452,6 +4763,8 @@ class RPC():
             except socket.error as e:
                 flag = True
 
+        self.config_cache.invalidate("GetTCPOffset", "GetTargetPayload", "GetTargetPayloadCog")
+        self.invalidate_kinematics_cache()
         return error
 
     """   
@@ -2467,8 +4780,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetToolList(self, id, t_coord, type, install , loadNum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         t_coord = list(map(float, t_coord))
         type = int(type)
@@ -2482,6 +4795,8 @@ class RPC():
             except socket.error as e:
                 flag = True
 
+        self.config_cache.invalidate("GetTCPOffset", "GetTargetPayload", "GetTargetPayloadCog")
+        self.invalidate_kinematics_cache()
         return error
 
     """   
@@ -2493,8 +4808,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetExTCPPoint(self, point_num):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         point_num = int(point_num)
         flag = True
         while flag:
@@ -2516,8 +4831,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ComputeExTCF(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -2543,8 +4858,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetExToolCoord(self, id, etcp, etool):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         etcp = list(map(float, etcp))
         etool = list(map(float, etool))
@@ -2556,6 +4871,8 @@ class RPC():
             except socket.error as e:
                 flag = True
 
+        self.config_cache.invalidate("GetTCPOffset")
+        self.invalidate_kinematics_cache()
         return error
 
     """   
@@ -2569,8 +4886,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetExToolList(self, id, etcp, etool):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         etcp = list(map(float, etcp))
         etool = list(map(float, etool))
@@ -2582,6 +4899,8 @@ class RPC():
             except socket.error as e:
                 flag = True
 
+        self.config_cache.invalidate("GetTCPOffset")
+        self.invalidate_kinematics_cache()
         return error
 
     """   
@@ -2593,8 +4912,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetWObjCoordPoint(self, point_num):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         point_num = int(point_num)
         flag = True
         while flag:
@@ -2617,8 +4936,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ComputeWObjCoord(self, method, refFrame):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         method = int(method)
         refFrame = int(refFrame)
         flag = True
@@ -2646,8 +4965,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetWObjCoord(self, id, coord, refFrame):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         coord = list(map(float, coord))
         refFrame = int(refFrame)
@@ -2659,6 +4978,8 @@ class RPC():
             except socket.error as e:
                 flag = True
 
+        self.config_cache.invalidate("GetWObjOffset")
+        self.invalidate_kinematics_cache()
         return error
 
     """   
@@ -2672,8 +4993,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetWObjList(self, id, coord, refFrame):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         coord = list(map(float, coord))
         refFrame = int(refFrame)
@@ -2685,6 +5006,8 @@ class RPC():
             except socket.error as e:
                 flag = True
 
+        self.config_cache.invalidate("GetWObjOffset")
+        self.invalidate_kinematics_cache()
         return error
 
     """   
@@ -2697,8 +5020,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetLoadWeight(self, loadNum, weight):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         loadNum = int(loadNum)
         weight = float(weight)
         flag = True
@@ -2709,6 +5032,7 @@ class RPC():
             except socket.error as e:
                 flag = True
 
+        self.config_cache.invalidate("GetTargetPayload")
         return error
 
     """   
@@ -2720,8 +5044,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetRobotInstallPos(self, method):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         method = int(method)
         flag = True
         while flag:
@@ -2731,6 +5055,8 @@ class RPC():
             except socket.error as e:
                 flag = True
 
+        self.config_cache.invalidate("GetRobotInstallAngle")
+        self.invalidate_kinematics_cache()
         return error
 
     """   
@@ -2743,8 +5069,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetRobotInstallAngle(self, yangle, zangle):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         yangle = float(yangle)
         zangle = float(zangle)
         flag = True
@@ -2755,6 +5081,8 @@ class RPC():
             except socket.error as e:
                 flag = True
 
+        self.config_cache.invalidate("GetRobotInstallAngle")
+        self.invalidate_kinematics_cache()
         return error
 
     """   
@@ -2768,8 +5096,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetLoadCoord(self, x, y, z):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         x = float(x)
         y = float(y)
         z = float(z)
@@ -2781,6 +5109,7 @@ class RPC():
             except socket.error as e:
                 flag = True
 
+        self.config_cache.invalidate("GetTargetPayloadCog")
         return error
 
     """   
@@ -2792,8 +5121,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WaitMs(self, t_ms):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         t_ms = int(t_ms)
         flag = True
         while flag:
@@ -2820,8 +5149,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetAnticollision(self, mode, level, config):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         mode = int(mode)
         level = list(map(float, level))
         config = int(config)
@@ -2848,8 +5177,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetCollisionStrategy(self, strategy,safeTime=1000,safeDistance=100,safeVel=250,safetyMargin=[10,10,10,10,10,10]):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         strategy = int(strategy)
         safeTime = int(safeTime)
         safeDistance = int(safeDistance)
@@ -2874,8 +5203,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetLimitPositive(self, p_limit):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         p_limit = list(map(float, p_limit))
         flag = True
         while flag:
@@ -2885,6 +5214,7 @@ class RPC():
             except socket.error as e:
                 flag = True
 
+        self.config_cache.invalidate("GetJointSoftLimitDeg")
         return error
 
     """   
@@ -2896,8 +5226,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetLimitNegative(self, n_limit):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         n_limit = list(map(float, n_limit))
         flag = True
         while flag:
@@ -2907,6 +5237,7 @@ class RPC():
             except socket.error as e:
                 flag = True
 
+        self.config_cache.invalidate("GetJointSoftLimitDeg")
         return error
 
     """   
@@ -2918,8 +5249,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ResetAllError(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -2939,8 +5270,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FrictionCompensationOnOff(self, state):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         state = int(state)
         flag = True
         while flag:
@@ -2961,8 +5292,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetFrictionValue_level(self, coeff):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         coeff = list(map(float, coeff))
         flag = True
         while flag:
@@ -2983,8 +5314,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetFrictionValue_wall(self, coeff):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         coeff = list(map(float, coeff))
         flag = True
         while flag:
@@ -3005,8 +5336,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetFrictionValue_ceiling(self, coeff):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         coeff = list(map(float, coeff))
         flag = True
         while flag:
@@ -3027,8 +5358,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetFrictionValue_freedom(self, coeff):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         coeff = list(map(float, coeff))
         flag = True
         while flag:
@@ -3054,12 +5385,12 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetRobotInstallAngle(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
-                _error = self.robot.GetRobotInstallAngle()
+                _error = self._cached_config("GetRobotInstallAngle")
                 flag = False
             except socket.error as e:
                 flag = True
@@ -3080,8 +5411,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetSysVarValue(self, id):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         id = int(id)
         flag = True
         while flag:
@@ -3114,8 +5445,9 @@ class RPC():
         #     return error, [_error[1], _error[2], _error[3], _error[4], _error[5], _error[6]]
         # else:
         #     return error
-        return 0,[self.robot_state_pkg.jt_cur_pos[0],self.robot_state_pkg.jt_cur_pos[1],self.robot_state_pkg.jt_cur_pos[2],
-                  self.robot_state_pkg.jt_cur_pos[3],self.robot_state_pkg.jt_cur_pos[4],self.robot_state_pkg.jt_cur_pos[5]]
+        pkg = self.robot_state_pkg
+        return 0,[pkg.jt_cur_pos[0],pkg.jt_cur_pos[1],pkg.jt_cur_pos[2],
+                  pkg.jt_cur_pos[3],pkg.jt_cur_pos[4],pkg.jt_cur_pos[5]]
     """   
     @brief  获取关节当前位置 (弧度)
     @param  [in] 默认参数 flag：0-阻塞，1-非阻塞 默认1
@@ -3126,8 +5458,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetActualJointPosRadian(self, flag=1):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = int(flag)
         flag_tmp = True
         while flag_tmp:
@@ -3160,8 +5492,9 @@ class RPC():
         #     return error, [_error[1], _error[2], _error[3], _error[4], _error[5], _error[6]]
         # else:
         #     return error
-        return 0,[self.robot_state_pkg.actual_qd[0],self.robot_state_pkg.actual_qd[1],self.robot_state_pkg.actual_qd[2],
-                  self.robot_state_pkg.actual_qd[3],self.robot_state_pkg.actual_qd[4],self.robot_state_pkg.actual_qd[5]]
+        pkg = self.robot_state_pkg
+        return 0,[pkg.actual_qd[0],pkg.actual_qd[1],pkg.actual_qd[2],
+                  pkg.actual_qd[3],pkg.actual_qd[4],pkg.actual_qd[5]]
 
     """   
     @brief  获取关节反馈加速度-deg/s^2
@@ -3180,8 +5513,9 @@ class RPC():
         #     return error, [_error[1], _error[2], _error[3], _error[4], _error[5], _error[6]]
         # else:
         #     return error
-        return 0,[self.robot_state_pkg.actual_qdd[0],self.robot_state_pkg.actual_qdd[1],self.robot_state_pkg.actual_qdd[2],
-                  self.robot_state_pkg.actual_qdd[3],self.robot_state_pkg.actual_qdd[4],self.robot_state_pkg.actual_qdd[5]]
+        pkg = self.robot_state_pkg
+        return 0,[pkg.actual_qdd[0],pkg.actual_qdd[1],pkg.actual_qdd[2],
+                  pkg.actual_qdd[3],pkg.actual_qdd[4],pkg.actual_qdd[5]]
 
     """   
     @brief  获取TCP指令合速度
@@ -3200,7 +5534,8 @@ class RPC():
         #     return error, [_error[1], _error[2]]
         # else:
         #     return error
-        return 0,[self.robot_state_pkg.target_TCP_CmpSpeed[0],self.robot_state_pkg.target_TCP_CmpSpeed[1]]
+        pkg = self.robot_state_pkg
+        return 0,[pkg.target_TCP_CmpSpeed[0],pkg.target_TCP_CmpSpeed[1]]
 
     """   
     @brief  获取TCP反馈合速度
@@ -3219,7 +5554,8 @@ class RPC():
         #     return error, [_error[1], _error[2]]
         # else:
         #     return error
-        return 0, [self.robot_state_pkg.actual_TCP_CmpSpeed[0], self.robot_state_pkg.actual_TCP_CmpSpeed[1]]
+        pkg = self.robot_state_pkg
+        return 0, [pkg.actual_TCP_CmpSpeed[0], pkg.actual_TCP_CmpSpeed[1]]
 
     """   
     @brief  获取TCP指令速度
@@ -3238,8 +5574,9 @@ class RPC():
         #     return error, [_error[1], _error[2], _error[3], _error[4], _error[5], _error[6]]
         # else:
         #     return error
-        return 0,[self.robot_state_pkg.target_TCP_Speed[0],self.robot_state_pkg.target_TCP_Speed[1],self.robot_state_pkg.target_TCP_Speed[2],
-                  self.robot_state_pkg.target_TCP_Speed[3],self.robot_state_pkg.target_TCP_Speed[4],self.robot_state_pkg.target_TCP_Speed[5]]
+        pkg = self.robot_state_pkg
+        return 0,[pkg.target_TCP_Speed[0],pkg.target_TCP_Speed[1],pkg.target_TCP_Speed[2],
+                  pkg.target_TCP_Speed[3],pkg.target_TCP_Speed[4],pkg.target_TCP_Speed[5]]
 
     """   
     @brief  获取TCP反馈速度
@@ -3258,8 +5595,9 @@ class RPC():
         #     return error, [_error[1], _error[2], _error[3], _error[4], _error[5], _error[6]]
         # else:
         #     return error
-        return 0,[self.robot_state_pkg.actual_TCP_Speed[0],self.robot_state_pkg.actual_TCP_Speed[1],self.robot_state_pkg.actual_TCP_Speed[2],
-                  self.robot_state_pkg.actual_TCP_Speed[3],self.robot_state_pkg.actual_TCP_Speed[4],self.robot_state_pkg.actual_TCP_Speed[5]]
+        pkg = self.robot_state_pkg
+        return 0,[pkg.actual_TCP_Speed[0],pkg.actual_TCP_Speed[1],pkg.actual_TCP_Speed[2],
+                  pkg.actual_TCP_Speed[3],pkg.actual_TCP_Speed[4],pkg.actual_TCP_Speed[5]]
 
     """   
     @brief  获取当前工具位姿
@@ -3278,8 +5616,9 @@ class RPC():
         #     return error, [_error[1], _error[2], _error[3], _error[4], _error[5], _error[6]]
         # else:
         #     return error
-        return 0,[self.robot_state_pkg.tl_cur_pos[0],self.robot_state_pkg.tl_cur_pos[1],self.robot_state_pkg.tl_cur_pos[2],
-                  self.robot_state_pkg.tl_cur_pos[3],self.robot_state_pkg.tl_cur_pos[4],self.robot_state_pkg.tl_cur_pos[5]]
+        pkg = self.robot_state_pkg
+        return 0,[pkg.tl_cur_pos[0],pkg.tl_cur_pos[1],pkg.tl_cur_pos[2],
+                  pkg.tl_cur_pos[3],pkg.tl_cur_pos[4],pkg.tl_cur_pos[5]]
 
     """   
     @brief  获取当前工具坐标系编号
@@ -3336,8 +5675,9 @@ class RPC():
         #     return error, [_error[1], _error[2], _error[3], _error[4], _error[5], _error[6]]
         # else:
         #     return error
-        return 0,[self.robot_state_pkg.flange_cur_pos[0],self.robot_state_pkg.flange_cur_pos[1],self.robot_state_pkg.flange_cur_pos[2],
-                  self.robot_state_pkg.flange_cur_pos[3],self.robot_state_pkg.flange_cur_pos[4],self.robot_state_pkg.flange_cur_pos[5]]
+        pkg = self.robot_state_pkg
+        return 0,[pkg.flange_cur_pos[0],pkg.flange_cur_pos[1],pkg.flange_cur_pos[2],
+                  pkg.flange_cur_pos[3],pkg.flange_cur_pos[4],pkg.flange_cur_pos[5]]
     """   
     @brief  逆运动学，笛卡尔位姿求解关节位置
     @param  [in] 必选参数 type:0-绝对位姿 (基坐标系)，1-相对位姿（基坐标系），2-相对位姿（工具坐标系）
@@ -3350,15 +5690,18 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetInverseKin(self, type, desc_pos, config=-1):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         type = int(type)
         desc_pos = list(map(float, desc_pos))
         config = int(config)
         flag = True
         while flag:
             try:
-                _error = self.robot.GetInverseKin(type, desc_pos, config)
+                if type == 0:
+                    _error = self._cached_kin("GetInverseKin", type, desc_pos, config)
+                else:
+                    _error = self.robot.GetInverseKin(type, desc_pos, config)
                 flag = False
             except socket.error as e:
                 flag = True
@@ -3381,15 +5724,18 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetInverseKinRef(self, type, desc_pos, joint_pos_ref):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         type = int(type)
         desc_pos = list(map(float, desc_pos))
         joint_pos_ref = list(map(float, joint_pos_ref))
         flag = True
         while flag:
             try:
-                _error = self.robot.GetInverseKinRef(type, desc_pos, joint_pos_ref)
+                if type == 0:
+                    _error = self._cached_kin("GetInverseKinRef", type, desc_pos, joint_pos_ref)
+                else:
+                    _error = self.robot.GetInverseKinRef(type, desc_pos, joint_pos_ref)
                 flag = False
             except socket.error as e:
                 flag = True
@@ -3412,8 +5758,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetInverseKinHasSolution(self, type, desc_pos, joint_pos_ref):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         type = int(type)
         desc_pos = list(map(float, desc_pos))
         joint_pos_ref = list(map(float, joint_pos_ref))
@@ -3441,13 +5787,13 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetForwardKin(self, joint_pos):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         joint_pos = list(map(float, joint_pos))
         flag = True
         while flag:
             try:
-                _error = self.robot.GetForwardKin(joint_pos)
+                _error = self._cached_kin("GetForwardKin", joint_pos)
                 flag = False
             except socket.error as e:
                 flag = True
@@ -3475,8 +5821,9 @@ class RPC():
         #     return error, [_error[1], _error[2], _error[3], _error[4], _error[5], _error[6]]
         # else:
         #     return error
-        return 0,[self.robot_state_pkg.jt_cur_tor[0],self.robot_state_pkg.jt_cur_tor[1],self.robot_state_pkg.jt_cur_tor[2],
-                  self.robot_state_pkg.jt_cur_tor[3],self.robot_state_pkg.jt_cur_tor[4],self.robot_state_pkg.jt_cur_tor[5]]
+        pkg = self.robot_state_pkg
+        return 0,[pkg.jt_cur_tor[0],pkg.jt_cur_tor[1],pkg.jt_cur_tor[2],
+                  pkg.jt_cur_tor[3],pkg.jt_cur_tor[4],pkg.jt_cur_tor[5]]
 
     """   
     @brief  获取当前负载的质量
@@ -3488,13 +5835,13 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetTargetPayload(self, flag=1):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = int(flag)
         flag_tmp = True
         while flag_tmp:
             try:
-                _error = self.robot.GetTargetPayload(flag)
+                _error = self._cached_config("GetTargetPayload", flag)
                 flag_tmp = False
             except socket.error as e:
                 flag_tmp = True
@@ -3515,13 +5862,13 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetTargetPayloadCog(self, flag=1):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = int(flag)
         flag_tmp = True
         while flag_tmp:
             try:
-                _error = self.robot.GetTargetPayloadCog(flag)
+                _error = self._cached_config("GetTargetPayloadCog", flag)
                 flag_tmp = False
             except socket.error as e:
                 flag_tmp = True
@@ -3542,13 +5889,13 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetTCPOffset(self, flag=1):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = int(flag)
         flag_tmp = True
         while flag_tmp:
             try:
-                _error = self.robot.GetTCPOffset(flag)
+                _error = self._cached_config("GetTCPOffset", flag)
                 flag_tmp = False
             except socket.error as e:
                 flag_tmp = True
@@ -3569,13 +5916,13 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetWObjOffset(self, flag=1):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = int(flag)
         flag_tmp = True
         while flag_tmp:
             try:
-                _error = self.robot.GetWObjOffset(flag)
+                _error = self._cached_config("GetWObjOffset", flag)
                 flag_tmp = False
             except socket.error as e:
                 flag_tmp = True
@@ -3596,13 +5943,13 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetJointSoftLimitDeg(self, flag=1):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = int(flag)
         flag_tmp = True
         while flag_tmp:
             try:
-                _error = self.robot.GetJointSoftLimitDeg(flag)
+                _error = self._cached_config("GetJointSoftLimitDeg", flag)
                 flag_tmp = False
             except socket.error as e:
                 flag_tmp = True
@@ -3624,8 +5971,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetSystemClock(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -3650,8 +5997,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetRobotCurJointsConfig(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -3676,12 +6023,12 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetDefaultTransVel(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
-                _error = self.robot.GetDefaultTransVel()
+                _error = self._cached_config("GetDefaultTransVel")
                 flag = False
             except socket.error as e:
                 flag = True
@@ -3725,7 +6072,8 @@ class RPC():
         #     return error, [_error[1], _error[2]]
         # else:
         #     return error
-        return 0, [self.robot_state_pkg.main_code,self.robot_state_pkg.sub_code]
+        pkg = self.robot_state_pkg
+        return 0, [pkg.main_code,pkg.sub_code]
 
     """   
     @brief  查询机器人示教管理点位数据
@@ -3737,8 +6085,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetRobotTeachingPoint(self, name):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         name = str(name)
         flag = True
         while flag:
@@ -3813,7 +6161,8 @@ class RPC():
         # else:
         #     return error
 
-        return 0, [self.robot_state_pkg.safety_stop0_state,self.robot_state_pkg.safety_stop1_state]
+        pkg = self.robot_state_pkg
+        return 0, [pkg.safety_stop0_state,pkg.safety_stop1_state]
 
     """   
     @brief  获取SDK与机器人的通讯状态
@@ -3857,8 +6206,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetSSHKeygen(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -3886,8 +6235,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetSSHScpCmd(self, mode, sshname, sship, usr_file_url, robot_file_url):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         mode = int(mode)
         sshname = str(sshname)
         sship = str(sship)
@@ -3913,8 +6262,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ComputeFileMD5(self, file_path):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         file_path = str(file_path)
         flag = True
         while flag:
@@ -3942,12 +6291,12 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetSoftwareVersion(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None, None
         flag = True
         while flag:
             try:
-                _error = self.robot.GetSoftwareVersion()
+                _error = self._cached_config("GetSoftwareVersion")
                 flag = False
             except socket.error as e:
                 flag = True
@@ -3975,8 +6324,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetSlaveHardVersion(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None, None, None, None, None, None, None
         flag = True
         while flag:
             try:
@@ -3994,8 +6343,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetHardwareversion(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None, None, None, None, None, None, None
         flag = True
         while flag:
             try:
@@ -4027,8 +6376,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetSlaveFirmVersion(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None, None, None, None, None, None, None
         flag = True
         while flag:
             try:
@@ -4046,8 +6395,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetFirmwareVersion(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None, None, None, None, None, None, None
         flag = True
         while flag:
             try:
@@ -4072,8 +6421,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetDHCompensation(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -4084,7 +6433,13 @@ class RPC():
 
         error = _error[0]
         if _error[0] == 0:
-            return error, [_error[1], _error[2], _error[3], _error[4], _error[5], _error[6]]
+            compensation = [_error[1], _error[2], _error[3], _error[4], _error[5], _error[6]]
+            if compensation != self.kin_cache.dh_compensation:
+                # DH参数已改变，已缓存的结果失效
+                if self.kin_cache.dh_compensation is not None:
+                    self.invalidate_kinematics_cache()
+                self.kin_cache.dh_compensation = compensation
+            return error, compensation
         else:
             return error,None
 
@@ -4105,8 +6460,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetTPDParam(self, name, period_ms, type=1, di_choose=0, do_choose=0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         name = str(name)
         period_ms = int(period_ms)
         type = int(type)
@@ -4135,8 +6490,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetTPDStart(self, name, period_ms, type=1, di_choose=0, do_choose=0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         name = str(name)
         period_ms = int(period_ms)
         type = int(type)
@@ -4161,8 +6516,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetWebTPDStop(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -4182,8 +6537,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetTPDDelete(self, name):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         name = str(name)
         flag = True
         while flag:
@@ -4204,8 +6559,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def LoadTPD(self, name):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         name = str(name)
         flag = True
         while flag:
@@ -4227,8 +6582,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetTPDStartPose(self, name):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         name = str(name)
         flag = True
         while flag:
@@ -4255,8 +6610,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def MoveTPD(self, name, blend, ovl):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         name = str(name)
@@ -4283,8 +6638,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def LoadTrajectoryJ(self, name, ovl, opt=1):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         name = str(name)
         ovl = float(ovl)
         opt = int(opt)
@@ -4307,8 +6662,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def MoveTrajectoryJ(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         flag = True
@@ -4331,8 +6686,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetTrajectoryStartPose(self, name):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         name = str(name)
         flag = True
         while flag:
@@ -4358,8 +6713,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetTrajectoryPointNum(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -4383,8 +6738,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetTrajectoryJSpeed(self, ovl):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         ovl = float(ovl)
         flag = True
         while flag:
@@ -4405,8 +6760,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetTrajectoryJForceTorque(self, ft):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         ft = list(map(float, ft))
         flag = True
         while flag:
@@ -4427,8 +6782,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetTrajectoryJForceFx(self, fx):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         fx = float(fx)
         flag = True
         while flag:
@@ -4449,8 +6804,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetTrajectoryJForceFy(self, fy):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         fy = float(fy)
         flag = True
         while flag:
@@ -4471,8 +6826,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetTrajectoryJForceFz(self, fz):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         fz = float(fz)
         flag = True
         while flag:
@@ -4493,8 +6848,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetTrajectoryJTorqueTx(self, tx):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         tx = float(tx)
         flag = True
         while flag:
@@ -4515,8 +6870,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetTrajectoryJTorqueTy(self, ty):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         ty = float(ty)
         flag = True
         while flag:
@@ -4537,8 +6892,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetTrajectoryJTorqueTz(self, tz):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         tz = float(tz)
         flag = True
         while flag:
@@ -4564,8 +6919,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def LoadDefaultProgConfig(self, flag, program_name):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = int(flag)
         program_name = str(program_name)
         flag_tmp = True
@@ -4587,8 +6942,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ProgramLoad(self, program_name):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         program_name = str(program_name)
         flag = True
         while flag:
@@ -4610,8 +6965,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetCurrentLine(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -4635,8 +6990,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ProgramRun(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         flag = True
@@ -4658,8 +7013,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ProgramPause(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -4679,8 +7034,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ProgramResume(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         flag = True
@@ -4702,8 +7057,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ProgramStop(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -4742,8 +7097,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetLoadedProgram(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -4776,8 +7131,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetGripperConfig(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -4802,8 +7157,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ActGripper(self, index, action):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         index = int(index)
         action = int(action)
         flag = True
@@ -4834,8 +7189,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def MoveGripper(self, index, pos, vel, force, maxtime, block, type, rotNum, rotVel, rotTorque):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         index = int(index)
@@ -4868,8 +7223,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetGripperMotionDone(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -4896,8 +7251,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetGripperConfig(self, company, device, softversion=0, bus=0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         company = int(company)
         device = int(device)
         softversion = int(softversion)
@@ -4924,8 +7279,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ComputePrePick(self, desc_pos, zlength, zangle):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         desc_pos = list(map(float, desc_pos))
         zlength = float(zlength)
         zangle = float(zangle)
@@ -4955,8 +7310,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ComputePostPick(self, desc_pos, zlength, zangle):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         desc_pos = list(map(float, desc_pos))
         zlength = float(zlength)
         zangle = float(zangle)
@@ -4992,8 +7347,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_GetConfig(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -5020,8 +7375,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_SetConfig(self, company, device, softversion=0, bus=0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         company = int(company)
         device = int(device)
         softversion = int(softversion)
@@ -5045,8 +7400,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_Activate(self, state):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         state = int(state)
         flag = True
         while flag:
@@ -5067,8 +7422,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_SetZero(self, state):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         state = int(state)
         flag = True
         while flag:
@@ -5090,8 +7445,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_SetRCS(self, ref,coord=[0,0,0,0,0,0]):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         ref = int(ref)
         coord = list(map(float, coord))
         flag = True
@@ -5114,8 +7469,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_PdIdenCompute(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -5139,8 +7494,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_PdIdenRecord(self, tool_id):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         tool_id = int(tool_id)
         flag = True
         while flag:
@@ -5162,8 +7517,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_PdCogIdenCompute(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -5188,8 +7543,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_PdCogIdenRecord(self, tool_id, index):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         tool_id = int(tool_id)
         index = int(index)
         flag = True
@@ -5218,8 +7573,9 @@ class RPC():
         #     return error, [_error[1], _error[2], _error[3], _error[4], _error[5], _error[6]]
         # else:
         #     return error
-        return 0,[self.robot_state_pkg.ft_sensor_data[0],self.robot_state_pkg.ft_sensor_data[1],self.robot_state_pkg.ft_sensor_data[2],
-                  self.robot_state_pkg.ft_sensor_data[3],self.robot_state_pkg.ft_sensor_data[4],self.robot_state_pkg.ft_sensor_data[5]]
+        pkg = self.robot_state_pkg
+        return 0,[pkg.ft_sensor_data[0],pkg.ft_sensor_data[1],pkg.ft_sensor_data[2],
+                  pkg.ft_sensor_data[3],pkg.ft_sensor_data[4],pkg.ft_sensor_data[5]]
 
     """   
     @brief  获取力传感器原始力/扭矩数据
@@ -5238,8 +7594,9 @@ class RPC():
         #     return error, [_error[1], _error[2], _error[3], _error[4], _error[5], _error[6]]
         # else:
         #     return error
-        return 0,[self.robot_state_pkg.ft_sensor_raw_data[0],self.robot_state_pkg.ft_sensor_raw_data[1],self.robot_state_pkg.ft_sensor_raw_data[2],
-                  self.robot_state_pkg.ft_sensor_raw_data[3],self.robot_state_pkg.ft_sensor_raw_data[4],self.robot_state_pkg.ft_sensor_raw_data[5]]
+        pkg = self.robot_state_pkg
+        return 0,[pkg.ft_sensor_raw_data[0],pkg.ft_sensor_raw_data[1],pkg.ft_sensor_raw_data[2],
+                  pkg.ft_sensor_raw_data[3],pkg.ft_sensor_raw_data[4],pkg.ft_sensor_raw_data[5]]
 
     """   
     @brief  碰撞守护
@@ -5256,8 +7613,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_Guard(self, flag, sensor_num, select, force_torque, max_threshold, min_threshold):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = int(flag)
         sensor_num = int(sensor_num)
         select = list(map(int, select))
@@ -5295,8 +7652,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_Control(self, flag, sensor_num, select, force_torque, gain, adj_sign, ILC_sign, max_dis, max_ang,filter_Sign=0, posAdapt_sign=0,isNoBlock=0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = int(flag)
         sensor_num = int(sensor_num)
         select = list(map(int, select))
@@ -5334,8 +7691,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_SpiralSearch(self, rcs, ft, dr=0.7, max_t_ms=60000, max_vel=5):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         rcs = int(rcs)
         ft = float(ft)
         dr = float(dr)
@@ -5366,8 +7723,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_RotInsertion(self, rcs, ft, orn, angVelRot=3, angleMax=45, angAccmax=0, rotorn=1):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         rcs = int(rcs)
         ft = float(ft)
         orn = int(orn)
@@ -5399,8 +7756,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_LinInsertion(self, rcs, ft, disMax, linorn, lin_v=1.0, lin_a=1.0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         rcs = int(rcs)
         ft = float(ft)
         disMax = float(disMax)
@@ -5426,8 +7783,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_CalCenterStart(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -5448,8 +7805,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_CalCenterEnd(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -5479,8 +7836,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_FindSurface(self, rcs, dir, axis, disMax, ft, lin_v=3.0, lin_a=0.0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         rcs = int(rcs)
         dir = int(dir)
         axis = int(axis)
@@ -5506,8 +7863,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_ComplianceStop(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -5528,8 +7885,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FT_ComplianceStart(self, p, force):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         p = float(p)
         force = float(force)
         flag = True
@@ -5551,8 +7908,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def LoadIdentifyDynFilterInit(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -5572,8 +7929,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def LoadIdentifyDynVarInit(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -5595,8 +7952,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def LoadIdentifyMain(self, joint_torque, joint_pos, t):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         joint_torque = list(map(float, joint_torque))
         joint_pos = list(map(float, joint_pos))
         t = float(t)
@@ -5621,8 +7978,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def LoadIdentifyGetResult(self, gain):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None
         gain = list(map(float, gain))
         flag = True
         while flag:
@@ -5651,8 +8008,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ConveyorStartEnd(self, status):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         status = int(status)
@@ -5675,8 +8032,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ConveyorPointIORecord(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -5696,8 +8053,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ConveyorPointARecord(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -5717,8 +8074,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ConveyorRefPointRecord(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -5738,8 +8095,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ConveyorPointBRecord(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -5759,8 +8116,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ConveyorIODetect(self, max_t):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         max_t = int(max_t)
         flag = True
         while flag:
@@ -5781,8 +8138,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ConveyorGetTrackData(self, mode):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         mode = int(mode)
         flag = True
         while flag:
@@ -5803,8 +8160,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ConveyorTrackStart(self, status):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         status = int(status)
         flag = True
         while flag:
@@ -5825,8 +8182,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ConveyorTrackEnd(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -5851,8 +8208,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ConveyorSetParam(self, param, followType, startDis=0, endDis=100):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         param = list(map(float, param))
         followType = int(followType)
         startDis = int(startDis)
@@ -5876,8 +8233,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ConveyorCatchPointComp(self, cmp):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         cmp = list(map(float, cmp))
         flag = True
         while flag:
@@ -5904,8 +8261,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ConveyorTrackMoveL(self, name, tool, wobj, vel=20, acc=100, ovl=100, blendR=-1.0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         name = str(name)
@@ -5941,8 +8298,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ARCStart(self, ioType, arcNum, timeout):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         ioType = int(ioType)
         arcNum = int(arcNum)
         timeout = int(timeout)
@@ -5967,8 +8324,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ARCEnd(self, ioType, arcNum, timeout):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         ioType = int(ioType)
         arcNum = int(arcNum)
         timeout = int(timeout)
@@ -5995,8 +8352,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WeldingSetCurrentRelation(self, currentMin, currentMax, outputVoltageMin, outputVoltageMax,AOIndex):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         currentMin = float(currentMin)
         currentMax = float(currentMax)
         outputVoltageMin = float(outputVoltageMin)
@@ -6025,8 +8382,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WeldingSetVoltageRelation(self, weldVoltageMin, weldVoltageMax, outputVoltageMin, outputVoltageMax,AOIndex):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         weldVoltageMin = float(weldVoltageMin)
         weldVoltageMax = float(weldVoltageMax)
         outputVoltageMin = float(outputVoltageMin)
@@ -6056,8 +8413,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WeldingGetCurrentRelation(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None, None, None, None
 
         try:
             flag = True
@@ -6088,8 +8445,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WeldingGetVoltageRelation(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None, None, None, None
 
         try:
             flag = True
@@ -6119,8 +8476,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WeldingSetCurrent(self, ioType, current, AOIndex,blend):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         ioType = int(ioType)
         current = float(current)
         AOIndex = int(AOIndex)
@@ -6147,8 +8504,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WeldingSetVoltage(self, ioType, voltage, AOIndex,blend):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         ioType = int(ioType)
         voltage = float(voltage)
         AOIndex = int(AOIndex)
@@ -6187,8 +8544,8 @@ class RPC():
     def WeaveSetPara(self, weaveNum, weaveType, weaveFrequency, weaveIncStayTime, weaveRange,
                      weaveLeftRange, weaveRightRange, additionalStayTime, weaveLeftStayTime,
                      weaveRightStayTime, weaveCircleRadio, weaveStationary,weaveYawAngle=0,weaveRotAngle=0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         weaveNum = int(weaveNum)
         weaveType = int(weaveType)
         weaveFrequency = float(weaveFrequency)
@@ -6233,8 +8590,8 @@ class RPC():
     @xmlrpc_timeout
     def WeaveOnlineSetPara(self, weaveNum, weaveType, weaveFrequency, weaveIncStayTime, weaveRange, weaveLeftStayTime,
                            weaveRightStayTime, weaveCircleRadio, weaveStationary):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         weaveNum = int(weaveNum)
         weaveType = int(weaveType)
         weaveFrequency = float(weaveFrequency)
@@ -6268,8 +8625,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WeaveStart(self, weaveNum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         weaveNum = int(weaveNum)
         try:
             flag = True
@@ -6293,8 +8650,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WeaveEnd(self, weaveNum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         weaveNum = int(weaveNum)
         try:
             flag = True
@@ -6319,8 +8676,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetForwardWireFeed(self, ioType, wireFeed):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         ioType = int(ioType)
         wireFeed = int(wireFeed)
         try:
@@ -6346,8 +8703,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetReverseWireFeed(self, ioType, wireFeed):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         ioType = int(ioType)
         wireFeed = int(wireFeed)
         try:
@@ -6373,8 +8730,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetAspirated(self, ioType, airControl):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         ioType = int(ioType)
         airControl = int(airControl)
         try:
@@ -6406,8 +8763,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetSegmentWeldPoint(self, startPos, endPos, startDistance):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None, None, None
         startPos = list(map(float, startPos))
         endPos = list(map(float, endPos))
         startDistance = float(startDistance)
@@ -6492,178 +8849,100 @@ class RPC():
 
         rtn = 0
         # 获取起点到终点之间的距离和各方向角度余弦值
-        # print("1",startDesePos,endDesePos)
         result = self.robot.GetSegWeldDisDir(startDesePos[0], startDesePos[1], startDesePos[2], endDesePos[0],
                                              endDesePos[1], endDesePos[2])
-        # print("result",result)
         if result[0] != 0:
             return int(result[0])
 
-        distance = result[1]
+        try:
+            plan = SegmentWeldPlan(startDesePos, endDesePos, weldLength, noWeldLength, result[1])
+        except ValueError as ex:
+            self.log_error("SegmentWeldStart fail: %s" % ex)
+            return RobotError.ERR_OTHER
+        # 开始运动前一次求出所有分段终点，运动过程中不再逐段查询
+        points = self._segment_weld_points(plan, startJPos, endJPos, tool, user)
+        if isinstance(points, int):
+            return points
         endOffPos = list(offset_pos)
 
         rtn = self.robot.MoveJ(startJPos, startDesePos, tool, user, vel, acc, ovl, exaxis_pos, blendR, offset_flag,
                                offset_pos)
-        # print("rtn1", rtn)
         if rtn != 0:
             return rtn
 
-        weldNum = 0
-        noWeldNum = 0
-        i = 0
-        while i < int(distance / (weldLength + noWeldLength)) * 2 + 2:
-            if i % 2 == 0:
-                weldNum += 1
-                if weldNum * weldLength + noWeldNum * noWeldLength > distance:
-
-                    rtn = self.robot.ARCStart(weldIOType, arcNum, weldTimeout)
-                    # print("rtn2", rtn)
+        for weld, (tmpJoint, tmpWeldDesc, tmpTool, tmpUser) in zip(plan.weld, points):
+            if weld:
+                rtn = self.robot.ARCStart(weldIOType, arcNum, weldTimeout)
+                if rtn != 0:
+                    return rtn
+                if isWeave:
+                    rtn = self.robot.WeaveStart(weaveNum)
                     if rtn != 0:
                         return rtn
-                    if isWeave:
-                        rtn = self.robot.WeaveStart(weaveNum)
-                        if rtn != 0:
-                            # print("rtn3", rtn)
-                            return rtn
-
-                    # getsegmentrtn = self.robot.GetSegmentWeldPoint(startDesePos,endDesePos,weldNum* weldLength + noWeldNum * noWeldLength)
-                    # # print("getsegmentrtn", getsegmentrtn)
-                    # # print(startDesePos, endDesePos, weldNum * weldLength + noWeldNum * noWeldLength)
-                    # # print("weldNum", weldNum, "weldLength", weldLength)
-                    # # print("noWeldNum", noWeldNum, "noWeldLength", noWeldLength)
-                    # if getsegmentrtn[0] != 0  :
-                    #     return getsegmentrtn[0]
-                    # data = getsegmentrtn[1].split(',')
-                    # data = list(map(float, data))
-                    # if len(data) != 14:
-                    #     self.log_error("GetSegmentWeldPoint fail")
-                    #     return -1
-                    # tmpJoint = [data[0],data[1],data[2],data[3],data[4],data[5]]
-                    # tmpWeldDesc = [data[6],data[7],data[8],data[9],data[10],data[11]]
-                    # tmpTool = int(data[12])
-                    # tmpUser = int(data[13])
-                    rtn = self.robot.MoveL(endJPos,endDesePos, tool, user, vel, acc, ovl, blendR,0, exaxis_pos,
-                                           search, 0, endOffPos)
-                    # print("rtn3", rtn,endJPos,endDesePos)
-                    if rtn != 0:
-                        self.robot.ARCEnd(weldIOType, arcNum, weldTimeout)
-                        if isWeave:
-                            rtn = self.robot.WeaveEnd(weaveNum)
-                            # print("rtn4", rtn)
-                            if rtn != 0:
-                                return rtn
-                        return rtn
-                    rtn = self.robot.ARCEnd(weldIOType, arcNum, weldTimeout)
-                    # print("rtn5", rtn)
-                    if rtn != 0:
-                        break
-                    if isWeave:
-                        rtn = self.robot.WeaveEnd(weaveNum)
-                        # print("rtn6", rtn)
-                        if rtn != 0:
-                            break
-
-                else:
-                    rtn = self.robot.ARCStart(weldIOType, arcNum, weldTimeout)
-                    # print("rtn7", rtn)
-                    if rtn != 0:
-                        return rtn
-                    if isWeave:
-                        rtn = self.robot.WeaveStart(weaveNum)
-                        # print("rtn8", rtn)
-                        if rtn != 0:
-                            return rtn
-
-                    getsegmentrtn = self.robot.GetSegmentWeldPoint(startDesePos, endDesePos,
-                                                                   weldNum * weldLength + noWeldNum * noWeldLength)
-                    # print("rtn9", getsegmentrtn)
-                    # print(startDesePos, endDesePos, weldNum * weldLength + noWeldNum * noWeldLength)
-                    # print("weldNum", weldNum, "weldLength", weldLength)
-                    # print("noWeldNum", noWeldNum, "noWeldLength", noWeldLength)
-                    if getsegmentrtn[0] != 0:
-                        return getsegmentrtn[0]
-                    data = getsegmentrtn[1].split(',')
-                    data = list(map(float, data))
-                    if len(data) != 14:
-                        self.log_error("GetSegmentWeldPoint fail")
-                        return -1
-                    tmpJoint = [data[0], data[1], data[2], data[3], data[4], data[5]]
-                    tmpWeldDesc = [data[6], data[7], data[8], data[9], data[10], data[11]]
-                    tmpTool = int(data[12])
-                    tmpUser = int(data[13])
-                    # print("tmpJoint",tmpJoint,tmpWeldDesc,tmpTool,tmpUser)
-                    time.sleep(1)
-                    nihao = self.robot.MoveL(tmpJoint, tmpWeldDesc, tmpTool, tmpUser, vel, acc, ovl, blendR,0, exaxis_pos,
-                                           search, 0, endOffPos)
-                    # print("rtn10nihao", nihao)
-                    if nihao != 0:
-                        self.robot.ARCEnd(weldIOType, arcNum, weldTimeout)
-                        if isWeave:
-                            rtn = self.robot.WeaveEnd(weaveNum)
-                            # print("rtn11", rtn)
-                            if rtn != 0:
-                                return rtn
-                        return rtn
-                    rtn = self.robot.ARCEnd(weldIOType, arcNum, weldTimeout)
-                    # print("rtn12", rtn)
-                    if rtn != 0:
-                        return rtn
-                    if isWeave:
-                        rtn = self.robot.WeaveEnd(weaveNum)
-                        # print("rtn13", rtn)
-                        if rtn != 0:
-                            return rtn
-            else:
-                noWeldNum += 1
-                if weldNum * weldLength + noWeldNum * noWeldLength > distance:
-                    # getsegmentrtn = self.robot.GetSegmentWeldPoint(startDesePos, endDesePos, weldNum* weldLength + noWeldNum * noWeldLength)
-                    # # print("rtn14", getsegmentrtn)
-                    # # print(startDesePos, endDesePos, weldNum * weldLength + noWeldNum * noWeldLength)
-                    # # print("weldNum", weldNum, "weldLength", weldLength)
-                    # # print("noWeldNum", noWeldNum, "noWeldLength", noWeldLength)
-                    # if getsegmentrtn[0] != 0:
-                    #     return getsegmentrtn[0]
-                    # data = getsegmentrtn[1].split(',')
-                    # data = list(map(float,data))
-                    # if len(data) != 14:
-                    #     self.log_error("GetSegmentWeldPoint fail")
-                    #     return -1
-                    # tmpJoint = [data[0], data[1], data[2], data[3], data[4], data[5]]
-                    # tmpWeldDesc = [data[6], data[7], data[8], data[9], data[10], data[11]]
-                    # tmpTool = int(data[12])
-                    # tmpUser = int(data[13])
-                    rtn = self.robot.MoveL(endJPos,endDesePos, tool, user, vel, acc, ovl, blendR,0, exaxis_pos,
-                                           search, 0, endOffPos)
-                    # print("rtn15", rtn,endJPos,endDesePos)
-                    if rtn != 0:
-                       return rtn
-                    break
-                else:
-                    getsegmentrtn = self.robot.GetSegmentWeldPoint(startDesePos, endDesePos, weldNum* weldLength + noWeldNum * noWeldLength)
-                    # print("rtn16", getsegmentrtn,startDesePos,endDesePos,weldNum* weldLength + noWeldNum * noWeldLength)
-
-                    # print(startDesePos,endDesePos,weldNum* weldLength + noWeldNum * noWeldLength)
-                    # print("weldNum",weldNum,"weldLength",weldLength)
-                    # print("noWeldNum", noWeldNum, "noWeldLength", noWeldLength)
-                    if getsegmentrtn[0] != 0:
-                        return getsegmentrtn[0]
-                    data = getsegmentrtn[1].split(',')
-                    data = list(map(float, data))
-                    if len(data) != 14:
-                        self.log_error("GetSegmentWeldPoint fail")
-                        return -1
-                    tmpJoint = [data[0], data[1], data[2], data[3], data[4], data[5]]
-                    tmpWeldDesc = [data[6], data[7], data[8], data[9], data[10], data[11]]
-                    tmpTool = int(data[12])
-                    tmpUser = int(data[13])
-                    rtn = self.robot.MoveL(tmpJoint, tmpWeldDesc, tmpTool, tmpUser, vel, acc, ovl, blendR,0, exaxis_pos,
-                                           search, 0, endOffPos)
-                    # print("rtn17", rtn)
-                    if rtn != 0:
-                        return rtn
-            i =i + 1
+            rtn = self.robot.MoveL(tmpJoint, tmpWeldDesc, tmpTool, tmpUser, vel, acc, ovl, blendR, 0, exaxis_pos,
+                                   search, 0, endOffPos)
+            if not weld:
+                if rtn != 0:
+                    return rtn
+                continue
+            if rtn != 0:
+                self.robot.ARCEnd(weldIOType, arcNum, weldTimeout)
+                if isWeave:
+                    self.robot.WeaveEnd(weaveNum)
+                return rtn
+            rtn = self.robot.ARCEnd(weldIOType, arcNum, weldTimeout)
+            if rtn != 0:
+                return rtn
+            if isWeave:
+                rtn = self.robot.WeaveEnd(weaveNum)
+                if rtn != 0:
+                    return rtn
         return rtn
 
+    def _segment_weld_points(self, plan, startJPos, endJPos, tool, user):
+        """
+        分段焊接各段终点的关节位置、笛卡尔位姿、工具号与工件号，最后一段终点为给定的终点；
+        焊缝的工具号、工件号与控制器当前坐标系相同且本地插值与GetSegWeldDisDir一致时在本地计算位姿，
+        关节位置由本地运动学（工具号一致且工件号为0）或GetInverseKinRef逐点求得，每一点以上一点的关节位置为参考，
+        与逐段运动的关节路径连续；否则一次批量查询GetSegmentWeldPoint
+        @return [(关节位置, 位姿, 工具号, 工件号)]，失败时返回错误码
+        """
+        count = len(plan.ends) - 1
+        points = []
+        # GetInverseKinRef按控制器当前的工具、工件坐标系求解，焊缝使用其他坐标系时不能在本地规划
+        pkg = self.robot_state_pkg
+        if count > 0 and tool == pkg.tool and user == pkg.user and plan.is_consistent():
+            poses = plan.poses()[:count].tolist()
+            kinematics = self.kinematics
+            if kinematics is None or tool != kinematics.tool_id or user != 0:
+                kinematics = None
+            ref = list(startJPos)
+            for pose in poses:
+                joint = None
+                if kinematics is not None:
+                    converged, joint = kinematics.ik(pose, ref)
+                if joint is None:
+                    # 本地未求解的点经运动学缓存查询控制器
+                    ret = self._cached_kin("GetInverseKinRef", 0, pose, ref)
+                    if ret[0] != 0:
+                        return ret[0]
+                    joint = list(ret[1:7])
+                points.append((joint, pose, tool, user))
+                ref = joint
+        elif count > 0:
+            results = self._call_many([("GetSegmentWeldPoint", (plan.start_pos, plan.end_pos, end))
+                                       for end in plan.ends[:count]])
+            for ret in results:
+                if ret[0] != 0:
+                    return ret[0]
+                data = list(map(float, ret[1].split(',')))
+                if len(data) != 14:
+                    self.log_error("GetSegmentWeldPoint fail")
+                    return -1
+                points.append((data[0:6], data[6:12], int(data[12]), int(data[13])))
+        points.append((endJPos, plan.end_pos, tool, user))
+        return points
+
     """   
     @brief  分段焊接终止
     @param  [in] 必选参数 ioType：io类型 0-控制器IO； 1-扩展IO
@@ -6675,8 +8954,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SegmentWeldEnd(self, ioType, arcNum, timeout):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         ioType = int(ioType)
         arcNum = int(arcNum)
         timeout = int(timeout)
@@ -6731,56 +9010,23 @@ class RPC():
         if not os.path.exists(save_file_path):
             return RobotError.ERR_SAVE_FILE_PATH_NOT_FOUND
 
-        rtn = self.robot.PointTableDownload(point_table_name)
-        if rtn == -1:
-            return RobotError.ERR_POINTTABLE_NOTFOUND
-        elif rtn != 0:
-            return rtn
-        port = 20011
-        client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client.settimeout(2)
-        try:
-            client.connect((self.ip_address, port))
-        except Exception as e:
-            client.close()
-            return RobotError.ERR_OTHER
-        total_buffer = bytearray(1024 * 1024 * 50)  # 50Mb
-        total_size = 0
-        recv_md5 = ""
-        recv_size = 0
-        find_head_flag = False
-        while True:
-            buffer = client.recv(1024)
-            length = len(buffer)
-            if length < 1:
+        # 20010/20011端口一次只进行一个文件传输，控制器按上一条指令的文件名接收或发送
+        with self.file_transfer_lock:
+            rtn = self.robot.PointTableDownload(point_table_name)
+            if rtn == -1:
+                return RobotError.ERR_POINTTABLE_NOTFOUND
+            elif rtn != 0:
+                return rtn
+            port = self.FILE_DOWNLOAD_PORT
+            client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            client.settimeout(2)
+            try:
+                client.connect((self.ip_address, port))
+            except Exception as e:
+                client.close()
                 return RobotError.ERR_OTHER
-            total_buffer[total_size:total_size + len(buffer)] = buffer
-
-            total_size += len(buffer)
-            if not find_head_flag and total_size > 4 and total_buffer[:4].decode('utf-8') == "/f/b":
-                find_head_flag = True
-            # 找到文件头后，提取文件大小和MD5校验码。文件大小的信息位于总数据的第5到第12个字节，MD5校验码的信息位于总数据的第13到第44个字节。
-            if find_head_flag and total_size > 12 + 32:
-                recv_size = int(total_buffer[4:12].decode('utf-8'))
-                recv_md5 = total_buffer[12:44].decode('utf-8')
-            # 接收到整个文件跳出循环
-            if find_head_flag and total_size == recv_size:
-                break
-        if total_size == 0:
-            return RobotError.ERR_OTHER
-        file_buffer = total_buffer[12 + 32:total_size - 4]
-
-        with open(os.path.join(save_file_path, point_table_name), 'wb') as file_writer:
-            file_writer.write(file_buffer[:total_size - 16 - 32])
-
-        check_md5 = calculate_file_md5(save_file_path + point_table_name)
-        if check_md5 == recv_md5:
-            client.send("SUCCESS".encode('utf-8'))
-            return 0
-        else:
-            client.send("FAIL".encode('utf-8'))
-            os.remove(os.path.join(save_file_path, point_table_name))
-            return RobotError.ERR_OTHER
+            return self._receive_file(client, os.path.join(save_file_path, point_table_name), 8,
+                                      RobotError.ERR_OTHER)
 
     """   
     @brief  上传点位表数据库
@@ -6804,49 +9050,32 @@ class RPC():
 
         point_table_name = os.path.basename(point_table_file_path)
 
-        rtn = self.robot.PointTableUpload(point_table_name)
-        if rtn != 0:
-            return rtn
-
-        port = 20010
-
-        client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client.settimeout(2)
-
-        try:
-            client.connect((self.ip_address, port))
-        except Exception as e:
-            client.close()
-            return RobotError.ERR_OTHER
+        # 20010/20011端口一次只进行一个文件传输，控制器按上一条指令的文件名接收或发送
+        with self.file_transfer_lock:
+            rtn = self.robot.PointTableUpload(point_table_name)
+            if rtn != 0:
+                return rtn
 
-        client.settimeout(2)
+            port = self.FILE_UPLOAD_PORT
 
-        # client.receive_timeout = 2000
-        # client.send_timeout = 2000
+            client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            client.settimeout(2)
 
-        send_md5 = calculate_file_md5(point_table_file_path)
+            try:
+                client.connect((self.ip_address, port))
+            except Exception as e:
+                client.close()
+                return RobotError.ERR_OTHER
 
-        head_data = f"/f/b{total_size:08d}{send_md5}"
-        num = client.send(head_data.encode('utf-8'))
-        if num < 1:
-            return RobotError.ERR_OTHER
+            client.settimeout(2)
 
-        with open(point_table_file_path, 'rb') as fs:
-            file_bytes = fs.read()
+            # client.receive_timeout = 2000
+            # client.send_timeout = 2000
 
-        num = client.send(file_bytes)
-        if num < 1:
-            return RobotError.ERR_OTHER
-        end_data = "/b/f"
-        num = client.send(end_data.encode('utf-8'))
-        if num < 1:
-            return RobotError.ERR_OTHER
+            send_md5 = cached_file_md5(point_table_file_path)
 
-        result_buf = client.recv(1024)
-        if result_buf[:7].decode('utf-8') == "SUCCESS":
-            return RobotError.ERR_SUCCESS
-        else:
-            return RobotError.ERR_OTHER
+            head_data = f"/f/b{total_size:08d}{send_md5}"
+            return self._send_file(client, point_table_file_path, head_data)
 
     """   
     @brief  点位表切换
@@ -6888,7 +9117,7 @@ class RPC():
                     error_str = "PointTable not Found!"
                 return rtn, error_str
 
-            time.sleep(0.3)  # 增加延时确保切换后后端确实收到切换后的点位表名称
+            self.sleep(0.3)  # 增加延时确保切换后后端确实收到切换后的点位表名称
 
             result = self.robot.PointTableUpdateLua(lua_file_name)
             error_str = result[1]
@@ -6912,59 +9141,94 @@ class RPC():
     def __FileDownLoad(self, fileType, fileName, saveFilePath):
         if not os.path.exists(saveFilePath):
             return RobotError.ERR_SAVE_FILE_PATH_NOT_FOUND
-        rtn = self.robot.FileDownload(fileType, fileName)
-        if rtn == -1:
-            return RobotError.ERR_POINTTABLE_NOTFOUND
-        elif rtn != 0:
-            return rtn
-        port = 20011
-        client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client.settimeout(2)
-        try:
-            client.connect((self.ip_address, port))
-        except Exception as e:
-            client.close()
-            return RobotError.ERR_OTHER
-        total_buffer = bytearray(1024 * 1024 * 50)  # 50Mb
-        total_size = 0
-        recv_md5 = ""
-        recv_size = 0
-        find_head_flag = False
-        while True:
-            buffer = client.recv(1024)
-            length = len(buffer)
-            if length < 1:
+        # 20010/20011端口一次只进行一个文件传输，控制器按上一条指令的文件名接收或发送
+        with self.file_transfer_lock:
+            rtn = self.robot.FileDownload(fileType, fileName)
+            if rtn == -1:
+                return RobotError.ERR_POINTTABLE_NOTFOUND
+            elif rtn != 0:
+                return rtn
+            port = self.FILE_DOWNLOAD_PORT
+            client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            client.settimeout(2)
+            try:
+                client.connect((self.ip_address, port))
+            except Exception as e:
+                client.close()
                 return RobotError.ERR_OTHER
-            total_buffer[total_size:total_size + len(buffer)] = buffer
-            total_size += len(buffer)
-            if not find_head_flag and total_size > 4 and total_buffer[:4].decode('utf-8') == "/f/b":
-                find_head_flag = True
-            # 找到文件头后，提取文件大小和MD5校验码。文件大小的信息位于总数据的第5到第12个字节，MD5校验码的信息位于总数据的第13到第44个字节。
-            # if find_head_flag and total_size > 12 + 32:
-            if find_head_flag and total_size > 14 + 32:
-                # recv_size = int(total_buffer[4:12].decode('utf-8'))
-                recv_size = int(total_buffer[4:14].decode('utf-8'))
-                # recv_md5 = total_buffer[12:44].decode('utf-8')
-                recv_md5 = total_buffer[14:46].decode('utf-8')
-            # 接收到整个文件跳出循环
-            if find_head_flag and total_size == recv_size:
-                break
-        if total_size == 0:
-            return RobotError.ERR_OTHER
-        # file_buffer = total_buffer[12 + 32:total_size - 4]
-        file_buffer = total_buffer[14 + 32:total_size - 4]
-        with open(os.path.join(saveFilePath, fileName), 'wb') as file_writer:
-            # file_writer.write(file_buffer[:total_size - 16 - 32])
-            file_writer.write(file_buffer[:total_size - 16 - 32 - 2])
-        check_md5 = calculate_file_md5(saveFilePath + fileName)
-        if check_md5 == recv_md5:
-            client.send("SUCCESS".encode('utf-8'))
-            return 0
-        else:
-            client.send("FAIL".encode('utf-8'))
-            os.remove(os.path.join(saveFilePath, fileName))
-            # return RobotError.ERR_OTHER
-            return RobotError.ERR_DOWN_LOAD_FILE_FAILED
+            return self._receive_file(client, os.path.join(saveFilePath, fileName), 10,
+                                      RobotError.ERR_DOWN_LOAD_FILE_FAILED)
+
+    DOWNLOAD_CHUNK = 1024 * 1024  # 下载时每次接收的最大字节数
+
+    def _receive_file(self, client, file_path, size_digits, check_error):
+        """
+        从已连接的20011端口接收文件：数据格式为 "/f/b" + 总长度(size_digits位) + 32位MD5 + 文件内容 + "/b/f"，
+        文件内容按块直接接收到同目录的临时文件并同时计算MD5，校验通过后替换为目标文件；
+        内存占用与文件大小无关，校验失败时原有文件保持不变
+        @param  client 已连接的socket，返回前关闭
+        @param  file_path 保存文件的路径
+        @param  size_digits 帧头中总长度的位数
+        @param  check_error MD5校验失败时返回的错误码
+        @return 错误码 成功-0  失败-错误码
+        """
+        head_len = 4 + size_digits + 32
+        temp_path = None
+        with client:
+            try:
+                head = self._recv_exact(client, head_len)
+                if head is None or head[:4] != b"/f/b":
+                    return RobotError.ERR_OTHER
+                try:
+                    total_size = int(head[4:4 + size_digits].decode('utf-8'))
+                    recv_md5 = head[4 + size_digits:].decode('utf-8')
+                except ValueError:
+                    return RobotError.ERR_OTHER
+                remaining = total_size - head_len - 4
+                if remaining < 0:
+                    return RobotError.ERR_OTHER
+
+                md5 = hashlib.md5()
+                buffer = bytearray(min(self.DOWNLOAD_CHUNK, max(remaining, 4)))
+                view = memoryview(buffer)
+                # 同一目录下的临时文件，保证替换为原子操作
+                temp_path = "%s.%d.%d.part" % (file_path, os.getpid(), threading.get_ident())
+                with open(temp_path, 'wb') as file_writer:
+                    while remaining > 0:
+                        length = client.recv_into(view[:min(remaining, len(buffer))])
+                        if length < 1:
+                            return RobotError.ERR_OTHER
+                        md5.update(view[:length])
+                        file_writer.write(view[:length])
+                        remaining -= length
+                # 结束标志"/b/f"
+                if self._recv_exact(client, 4) is None:
+                    return RobotError.ERR_OTHER
+                if md5.hexdigest() != recv_md5:
+                    client.send("FAIL".encode('utf-8'))
+                    return check_error
+                os.replace(temp_path, file_path)
+                temp_path = None
+                client.send("SUCCESS".encode('utf-8'))
+                return 0
+            except socket.timeout:
+                return RobotError.ERR_SOCKET_RECV_FAILED
+            finally:
+                if temp_path is not None and os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+    @staticmethod
+    def _recv_exact(client, size):
+        """接收恰好size个字节，连接关闭时返回None"""
+        data = bytearray(size)
+        view = memoryview(data)
+        received = 0
+        while received < size:
+            length = client.recv_into(view[received:])
+            if length < 1:
+                return None
+            received += length
+        return bytes(data)
 
     """   
     @brief  上传文件
@@ -6987,44 +9251,70 @@ class RPC():
             print("Files larger than 500 MB are not supported!")
             return -1
         file_name = os.path.basename(filePath)
-        rtn = self.robot.FileUpload(fileType, file_name)
-        if rtn != 0:
-            return rtn
-
-        port = 20010
-
-        client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client.settimeout(20)
-
-        try:
-            client.connect((self.ip_address, port))
-        except Exception as e:
-            client.close()
-            return RobotError.ERR_OTHER
-        client.settimeout(20)
+        # 在等待传输端口之前计算MD5
+        send_md5 = cached_file_md5(filePath)
+        # 20010/20011端口一次只进行一个文件传输，控制器按上一条指令的文件名接收或发送
+        with self.file_transfer_lock:
+            rtn = self.robot.FileUpload(fileType, file_name)
+            if rtn != 0:
+                return rtn
 
-        send_md5 = calculate_file_md5(filePath)
-        head_data = f"/f/b{total_size:10d}{send_md5}"
-        num = client.send(head_data.encode('utf-8'))
+            port = self.FILE_UPLOAD_PORT
 
-        if num < 1:
-            return RobotError.ERR_OTHER
+            client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            client.settimeout(20)
 
-        with open(filePath, "rb") as f:
-            while True:
-                data = f.read(2 * 1024 * 1024)
-                if not data:  # 如果读取到文件末尾
-                    end_data = "/b/f"
-                    num = client.send(end_data.encode('utf-8'))  # 发送文件传输完成的标志
-                    if num < 1:
-                        return RobotError.ERR_OTHER
-                    break  # 跳出循环
-                num = client.send(data)  # 将读取的数据通过socket连接发送给客户端
-                if num < 1:
-                    return RobotError.ERR_OTHER
-        time.sleep(0.5)
-        result_buf = client.recv(1024)
-        if result_buf[:7].decode('utf-8') == "SUCCESS":
+            try:
+                client.connect((self.ip_address, port))
+            except Exception as e:
+                client.close()
+                return RobotError.ERR_OTHER
+            client.settimeout(20)
+
+            head_data = f"/f/b{total_size:10d}{send_md5}"
+            return self._send_file(client, filePath, head_data)
+
+    UPLOAD_RESULT_TIMEOUT = 20.0  # 发送完成后等待控制器返回校验结果的最长时间，单位 [s]
+
+    def _send_file(self, client, file_path, head_data):
+        """
+        通过已连接的20010端口发送文件：帧头之后的文件内容由socket.sendfile在内核中直接发送，
+        再发送结束标志"/b/f"，然后等待控制器返回校验结果，不超过UPLOAD_RESULT_TIMEOUT与指令的deadline
+        @param  client 已连接的socket，返回前关闭
+        @param  file_path 上传文件的路径
+        @param  head_data 帧头 "/f/b" + 总长度 + 32位MD5
+        @return 错误码 成功-0  失败-错误码
+        """
+        with client:
+            try:
+                client.sendall(head_data.encode('utf-8'))
+                with open(file_path, "rb") as f:
+                    client.sendfile(f)
+                client.sendall("/b/f".encode('utf-8'))  # 发送文件传输完成的标志
+            except OSError:
+                return RobotError.ERR_SOCKET_SEND_FAILED
+
+            deadline = time.monotonic() + self.UPLOAD_RESULT_TIMEOUT
+            call_deadline = getattr(_call_context, "deadline", None)
+            if call_deadline is not None:
+                deadline = min(deadline, call_deadline)
+            result_buf = b""
+            # 收到完整的SUCCESS或其他应答后立即返回
+            while len(result_buf) < 7 and b"SUCCESS".startswith(result_buf):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return RobotError.ERR_SOCKET_RECV_FAILED
+                client.settimeout(remaining)
+                try:
+                    data = client.recv(1024)
+                except socket.timeout:
+                    return RobotError.ERR_SOCKET_RECV_FAILED
+                except OSError:
+                    break
+                if not data:
+                    break
+                result_buf += data
+        if result_buf[:7].decode('utf-8', 'replace') == "SUCCESS":
             return RobotError.ERR_SUCCESS
         else:
             return RobotError.ERR_OTHER
@@ -7106,6 +9396,68 @@ class RPC():
         else:
             return error,None,None
 
+    # sync_directory支持的文件类型：文件类型 -> (控制器目录, 本地文件扩展名, 上传指令, 删除指令)
+    SYNC_FILE_TYPES = {0: ("/fruser/", ".lua", "LuaUpload", "LuaDelete"),
+                       20: ("/fruser/traj/", "", "TrajectoryJUpLoad", "TrajectoryJDelete")}
+
+    def sync_directory(self, local_dir, file_type=0, workers=4, delete_stale=False):
+        """
+        将本地目录同步到控制器：本地文件与控制器上同名文件的MD5(ComputeFileMD5，合并为一次请求)比较，
+        只上传新增或内容变化的文件；delete_stale为True时，Lua程序按GetLuaList删除控制器上本地目录中没有的文件，
+        轨迹文件没有列表指令，不删除
+        @param  local_dir 本地目录
+        @param  file_type 文件类型 0-Lua程序，20-轨迹J文件
+        @param  workers 计算本地MD5与上传的线程数，同一控制器的文件传输依次进行
+        @param  delete_stale 是否删除控制器上多余的文件，默认不删除
+        @return 错误码 成功-0  失败-第一个失败的错误码
+        @return dict uploaded 上传的文件名, deleted 删除的文件名, unchanged 未变化的文件名, failed {文件名: 错误码}
+        """
+        if file_type not in self.SYNC_FILE_TYPES:
+            return RobotError.ERR_OTHER, None
+        if not os.path.isdir(local_dir):
+            return RobotError.ERR_UPLOAD_FILE_NOT_FOUND, None
+        remote_dir, suffix, upload_name, delete_name = self.SYNC_FILE_TYPES[file_type]
+        local = {name: os.path.join(local_dir, name) for name in sorted(os.listdir(local_dir))
+                 if name.endswith(suffix) and os.path.isfile(os.path.join(local_dir, name))}
+        remote_names = None
+        if file_type == 0:
+            error, lua_num, lua_names = self.GetLuaList()
+            if error != 0:
+                return error, None
+            remote_names = set(name for name in lua_names if name)
+
+        result = {"uploaded": [], "deleted": [], "unchanged": [], "failed": {}}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            local_md5 = dict(zip(local, pool.map(cached_file_md5, local.values())))
+            # 只查询控制器上已有的文件
+            existing = [name for name in local if remote_names is None or name in remote_names]
+            try:
+                remote_md5 = self._call_many([("ComputeFileMD5", (remote_dir + name,)) for name in existing])
+            except (RPCUnavailable, xmlrpc.client.Fault):
+                return RobotError.ERR_RPC_ERROR, None
+            for name, ret in zip(existing, remote_md5):
+                if ret[0] == 0 and str(ret[1]).lower() == local_md5[name]:
+                    result["unchanged"].append(name)
+            changed = [name for name in local if name not in result["unchanged"]]
+            upload = getattr(self, upload_name)
+            for name, ret in zip(changed, pool.map(lambda name: upload(local[name]), changed)):
+                error = ret[0] if isinstance(ret, tuple) else ret
+                if error == 0:
+                    result["uploaded"].append(name)
+                else:
+                    result["failed"][name] = error
+
+        if delete_stale and remote_names is not None:
+            delete = getattr(self, delete_name)
+            for name in sorted(remote_names.difference(local)):
+                error = delete(name)
+                if error == 0:
+                    result["deleted"].append(name)
+                else:
+                    result["failed"][name] = error
+        errors = list(result["failed"].values())
+        return (errors[0] if errors else 0), result
+
     """   
     @brief  设置485扩展轴参数
     @param  [in] 必选参数 int servoId 伺服驱动器ID，范围[1-16],对应从站ID 
@@ -7121,8 +9473,8 @@ class RPC():
     @xmlrpc_timeout
     def AuxServoSetParam(self, servoId, servoCompany, servoModel, servoSoftVersion, servoResolution,
                          axisMechTransRatio):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         servoId = int(servoId)
         servoCompany = int(servoCompany)
         servoModel = int(servoModel)
@@ -7154,8 +9506,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AuxServoGetParam(self, servoId):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None, None, None, None
         servoId = int(servoId)
         flag = True
         while flag:
@@ -7181,8 +9533,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AuxServoEnable(self, servoId, status):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         servoId = int(servoId)
         status = int(status)
         flag = True
@@ -7205,8 +9557,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AuxServoSetControlMode(self, servoId, mode):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         servoId = int(servoId)
         mode = int(mode)
         flag = True
@@ -7231,8 +9583,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AuxServoSetTargetPos(self, servoId, pos, speed,acc=100):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         servoId = int(servoId)
         pos = float(pos)
         speed = float(speed)
@@ -7258,8 +9610,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AuxServoSetTargetSpeed(self, servoId, speed,acc):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         servoId = int(servoId)
         speed = float(speed)
         acc = float(acc)
@@ -7283,8 +9635,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AuxServoSetTargetTorque(self, servoId, torque):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         servoId = int(servoId)
         torque = float(torque)
         flag = True
@@ -7310,8 +9662,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AuxServoHoming(self, servoId, mode, searchVel, latchVel,acc=100):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         servoId = int(servoId)
         mode = int(mode)
         searchVel = float(searchVel)
@@ -7336,8 +9688,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AuxServoClearError(self, servoId):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         servoId = int(servoId)
         flag = True
         while flag:
@@ -7363,8 +9715,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AuxServoGetStatus(self, servoId):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None, None, None, None
         servoId = int(servoId)
         flag = True
         while flag:
@@ -7389,8 +9741,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AuxServosetStatusID(self, servoId):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         servoId = int(servoId)
         flag = True
         while flag:
@@ -7411,8 +9763,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetExDevProtocol(self, protocol):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         protocol = int(protocol)
         flag = True
         while flag:
@@ -7433,8 +9785,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetExDevProtocol(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -7458,8 +9810,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetOaccScale(self, acc):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         acc = float(acc)
         flag = True
         while flag:
@@ -7483,8 +9835,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def MoveAOStart(self, AONum, maxTCPSpeed=1000, maxAOPercent=100, zeroZoneCmp=20):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         AONum = int(AONum)
         maxTCPSpeed = int(maxTCPSpeed)
         maxAOPercent = int(maxAOPercent)
@@ -7507,8 +9859,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def MoveAOStop(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -7531,8 +9883,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def MoveToolAOStart(self, AONum, maxTCPSpeed=1000, maxAOPercent=100, zeroZoneCmp=20):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         AONum = int(AONum)
         maxTCPSpeed = int(maxTCPSpeed)
         maxAOPercent = int(maxAOPercent)
@@ -7555,8 +9907,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def MoveToolAOStop(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -7586,8 +9938,8 @@ class RPC():
     @xmlrpc_timeout
     def ExtDevSetUDPComParam(self, ip, port, period, lossPkgTime, lossPkgNum, disconnectTime,
                              reconnectEnable, reconnectPeriod, reconnectNum,selfConnect):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         ip = str(ip)
         port = int(port)
         period = int(period)
@@ -7628,8 +9980,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ExtDevGetUDPComParam(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -7652,8 +10004,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ExtDevLoadUDPDriver(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -7672,8 +10024,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ExtDevUnloadUDPDriver(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -7692,8 +10044,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ExtDevUDPClientComReset(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -7712,8 +10064,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ExtDevUDPClientComClose(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -7733,8 +10085,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetRobotPosToAxis(self, installType):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         installType = int(installType)
         flag = True
         while flag:
@@ -7764,8 +10116,8 @@ class RPC():
     @xmlrpc_timeout
     def SetAxisDHParaConfig(self, axisConfig, axisDHd1, axisDHd2, axisDHd3, axisDHd4, axisDHa1, axisDHa2, axisDHa3,
                             axisDHa4):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         axisConfig = int(axisConfig)
         axisDHd1 = float(axisDHd1)
         axisDHd2 = float(axisDHd2)
@@ -7784,6 +10136,7 @@ class RPC():
             except socket.error as e:
                 flag = True
 
+        self.invalidate_kinematics_cache()
         return error
 
     """   
@@ -7808,8 +10161,8 @@ class RPC():
     @xmlrpc_timeout
     def ExtAxisParamConfig(self, axisId, axisType, axisDirection, axisMax, axisMin, axisVel, axisAcc, axisLead,
                            encResolution, axisOffect, axisCompany, axisModel, axisEncType):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         axisId = int(axisId)
         axisType = int(axisType)
         axisDirection = int(axisDirection)
@@ -7846,8 +10199,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetExAxisDriverConfig(self, axisId):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         axisId = int(axisId)
         flag = True
         while flag:
@@ -7871,8 +10224,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ExtAxisSetRefPoint(self, pointNum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         pointNum = int(pointNum)
         flag = True
         while flag:
@@ -7893,8 +10246,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ExtAxisComputeECoordSys(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -7914,8 +10267,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetRefPointInExAxisEnd(self, pos):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         pos = list(map(float, pos))
         flag = True
         while flag:
@@ -7936,8 +10289,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def PositionorSetRefPoint(self, pointNum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         pointNum = int(pointNum)
         flag = True
         while flag:
@@ -7958,8 +10311,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def PositionorComputeECoordSys(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -7986,8 +10339,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ExtAxisActiveECoordSys(self, axisCoordNum, toolNum, coord, calibFlag):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         axisCoordNum = int(axisCoordNum)
         toolNum = int(toolNum)
         coord = list(map(float, coord))
@@ -8013,8 +10366,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ExtAxisServoOn(self, axisID, status):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         axisID = int(axisID)
         status = int(status)
         flag = True
@@ -8039,8 +10392,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ExtAxisSetHoming(self, axisID, mode, searchVel, latchVel):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         axisID = int(axisID)
         mode = int(mode)
         searchVel = float(searchVel)
@@ -8068,8 +10421,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ExtAxisStartJog(self, axisID, direction, vel, acc, maxDistance):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         axisID = int(axisID)
@@ -8113,8 +10466,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetAuxDO(self, DONum, bOpen, smooth, block):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         DONum = int(DONum)
         bOpen = bool(bOpen)
         smooth = bool(smooth)
@@ -8122,9 +10475,7 @@ class RPC():
         open_flag = 1 if bOpen else 0
         smooth_flag = 1 if smooth else 0
         no_block_flag = 1 if block else 0
-        print("open_flag",open_flag)
-        print("smooth_flag", smooth_flag)
-        print("no_block_flag", no_block_flag)
+        self.log_debug("SetAuxDO open_flag %d smooth_flag %d no_block_flag %d" % (open_flag, smooth_flag, no_block_flag))
         flag = True
         while flag:
             try:
@@ -8146,8 +10497,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetAuxAO(self, AONum, value, block):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         AONum = int(AONum)
         value = float(value)
         block = bool(block)
@@ -8172,8 +10523,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetAuxDIFilterTime(self, filterTime):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         filterTime = int(filterTime)
         flag = True
         while flag:
@@ -8195,8 +10546,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetAuxAIFilterTime(self, AINum,filterTime):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         AINum = int(AINum)
         filterTime = int(filterTime)
         flag = True
@@ -8221,8 +10572,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WaitAuxDI(self, DINum, bOpen, time, errorAlarm):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         DINum = int(DINum)
         bOpen = bool(bOpen)
         open_flag = 0 if bOpen else 1
@@ -8252,8 +10603,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WaitAuxAI(self, AINum, sign, value, time, errorAlarm):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         AINum = int(AINum)
         sign = int(sign)
         value = int(value)
@@ -8281,8 +10632,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetAuxDI(self, DINum, isNoBlock):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         DINum = int(DINum)
         isNoBlock = bool(isNoBlock)
         isNoBlock_flag = 0 if isNoBlock else 1
@@ -8310,8 +10661,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetAuxAI(self, AINum, isNoBlock):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         AINum = int(AINum)
         isNoBlock = bool(isNoBlock)
         isNoBlock_flag = 0 if isNoBlock else 1
@@ -8339,8 +10690,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ExtAxisMove(self, pos, ovl, blend):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         pos = list(map(float, pos))
@@ -8376,8 +10727,8 @@ class RPC():
     @xmlrpc_timeout
     def ExtAxisSyncMoveJ(self, joint_pos, desc_pos, tool, user, exaxis_pos, vel=20.0, acc=0.0, ovl=100.0,
                          blendT=-1.0, offset_flag=0, offset_pos=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0]):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         joint_pos = list(map(float, joint_pos))
@@ -8393,7 +10744,7 @@ class RPC():
         offset_pos = list(map(float, offset_pos))
         if (desc_pos[0] == 0.0) and (desc_pos[1] == 0.0) and (desc_pos[2] == 0.0) and (desc_pos[3] == 0.0) and (
                 desc_pos[4] == 0.0) and (desc_pos[5] == 0.0):  # 若未输入参数则调用正运动学求解
-            ret = self.robot.GetForwardKin(joint_pos)  # 正运动学求解
+            ret = self._cached_kin("GetForwardKin", joint_pos)  # 正运动学求解
             if ret[0] == 0:
                 desc_pos = [ret[1], ret[2], ret[3], ret[4], ret[5], ret[6]]
             else:
@@ -8434,8 +10785,8 @@ class RPC():
     @xmlrpc_timeout
     def ExtAxisSyncMoveL(self, joint_pos, desc_pos, tool, user, exaxis_pos, vel=20.0, acc=0.0, ovl=100.0,
                          blendR=-1.0, search=0, offset_flag=0, offset_pos=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0]):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         desc_pos = list(map(float, desc_pos))
@@ -8452,7 +10803,7 @@ class RPC():
         offset_pos = list(map(float, offset_pos))
         if ((joint_pos[0] == 0.0) and (joint_pos[1] == 0.0) and (joint_pos[2] == 0.0) and (joint_pos[3] == 0.0)
                 and (joint_pos[4] == 0.0) and (joint_pos[5] == 0.0)):  # 若未输入参数则调用逆运动学求解
-            ret = self.robot.GetInverseKin(0, desc_pos, -1)  # 逆运动学求解
+            ret = self._cached_kin("GetInverseKin", 0, desc_pos, -1)  # 逆运动学求解
             if ret[0] == 0:
                 joint_pos = [ret[1], ret[2], ret[3], ret[4], ret[5], ret[6]]
             else:
@@ -8506,8 +10857,8 @@ class RPC():
                          vel_t=20.0, acc_t=100.0, offset_flag_t=0,
                          offset_pos_t=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
                          ovl=100.0, blendR=-1.0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         desc_pos_p = list(map(float, desc_pos_p))
@@ -8535,7 +10886,7 @@ class RPC():
 
         if ((joint_pos_p[0] == 0.0) and (joint_pos_p[1] == 0.0) and (joint_pos_p[2] == 0.0) and (joint_pos_p[3] == 0.0)
                 and (joint_pos_p[4] == 0.0) and (joint_pos_p[5] == 0.0)):  # 若未输入参数则调用逆运动学求解
-            retp = self.robot.GetInverseKin(0, desc_pos_p, -1)  # 逆运动学求解
+            retp = self._cached_kin("GetInverseKin", 0, desc_pos_p, -1)  # 逆运动学求解
             if retp[0] == 0:
                 joint_pos_p = [retp[1], retp[2], retp[3], retp[4], retp[5], retp[6]]
             else:
@@ -8544,7 +10895,7 @@ class RPC():
 
         if ((joint_pos_t[0] == 0.0) and (joint_pos_t[1] == 0.0) and (joint_pos_t[2] == 0.0) and (joint_pos_t[3] == 0.0)
                 and (joint_pos_t[4] == 0.0) and (joint_pos_t[5] == 0.0)):  # 若未输入参数则调用逆运动学求解
-            rett = self.robot.GetInverseKin(0, desc_pos_t, -1)  # 逆运动学求解
+            rett = self._cached_kin("GetInverseKin", 0, desc_pos_t, -1)  # 逆运动学求解
             if rett[0] == 0:
                 joint_pos_t = [rett[1], rett[2], rett[3], rett[4], rett[5], rett[6]]
             else:
@@ -8580,8 +10931,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WireSearchStart(self, refPos,searchVel,searchDis,autoBackFlag,autoBackVel,autoBackDis,offectFlag):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         refPos = int(refPos)
         searchVel = float(searchVel)
         searchDis = int(searchDis)
@@ -8613,8 +10964,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WireSearchEnd(self, refPos,searchVel,searchDis,autoBackFlag,autoBackVel,autoBackDis,offectFlag):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         refPos = int(refPos)
         searchVel = float(searchVel)
         searchDis = int(searchDis)
@@ -8645,8 +10996,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetWireSearchOffset(self, seamType, method,varNameRef,varNameRes):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None
         seamType = int(seamType)
         method = int(method)
         if(len(varNameRes)!=6):
@@ -8679,8 +11030,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WireSearchWait(self,varname):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         varname=str(varname)
         flag = True
         while flag:
@@ -8701,8 +11052,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetPointToDatabase(self,varName,pos):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         varName = str(varName)
         pos = list(map(float,pos))
 
@@ -8743,8 +11094,8 @@ class RPC():
     @xmlrpc_timeout
     def ArcWeldTraceControl(self,flag,delaytime, isLeftRight, klr, tStartLr, stepMaxLr, sumMaxLr, isUpLow, kud, tStartUd, stepMaxUd,
                             sumMaxUd, axisSelect, referenceType, referSampleStartUd, referSampleCountUd, referenceCurrent, offsetType, offsetParameter):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = int(flag)
         delaytime = float(delaytime)
         isLeftRight = int(isLeftRight)
@@ -8784,8 +11135,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ArcWeldTraceExtAIChannelConfig(self,channel):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         channel = int(channel)
         flag = True
         while flag:
@@ -8815,8 +11166,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def EndForceDragControl(self, status, asaptiveFlag, interfereDragFlag, ingularityConstraintsFlag, forceCollisionFlag, M, B, K, F, Fmax, Vmax):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         status = int(status)
         asaptiveFlag = int(asaptiveFlag)
         interfereDragFlag = int(interfereDragFlag)
@@ -8847,8 +11198,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetForceSensorDragAutoFlag(self, status):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         status = int(status)
         flag = True
         while flag:
@@ -8875,8 +11226,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ForceAndJointImpedanceStartStop(self,status, impedanceFlag, lamdeDain, KGain, BGain,dragMaxTcpVel,dragMaxTcpOriVel):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         status = int(status)
         impedanceFlag = int(impedanceFlag)
         if((len(lamdeDain)!=6)or(len(KGain)!=6)or(len(BGain)!=6)):
@@ -8907,8 +11258,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetForceAndTorqueDragState(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None
         flag = True
         while flag:
             try:
@@ -8932,8 +11283,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetForceSensorPayload(self,weight):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         weight = float(weight)
         flag = True
         while flag:
@@ -8956,8 +11307,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetForceSensorPayloadCog(self,x,y,z):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         x = float(x)
         y = float(y)
         z = float(z)
@@ -8980,8 +11331,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetForceSensorPayload(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -9008,8 +11359,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetForceSensorPayloadCog(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None, None
         flag = True
         while flag:
             try:
@@ -9088,8 +11439,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ForceSensorSetSaveDataFlag(self,recordCount):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -9110,8 +11461,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ForceSensorComputeLoad(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None
         flag = True
         while flag:
             try:
@@ -9138,8 +11489,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AxleSensorConfig(self,idCompany, idDevice, idSoftware, idBus):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         idCompany = int(idCompany)
         idDevice = int(idDevice)
         idSoftware = int(idSoftware)
@@ -9165,8 +11516,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AxleSensorConfigGet(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None
         flag = True
         while flag:
             try:
@@ -9190,8 +11541,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AxleSensorActivate(self,actFlag):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         actFlag = int(actFlag)
         flag = True
         while flag:
@@ -9218,8 +11569,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AxleSensorRegWrite(self,devAddr, regHAddr, regLAddr, regNum, data1, data2, isNoBlock):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         devAddr = int(devAddr)
         regHAddr = int(regHAddr)
         regLAddr = int(regLAddr)
@@ -9246,8 +11597,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetOutputResetCtlBoxDO(self,resetFlag):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         resetFlag = int(resetFlag)
         flag = True
         while flag:
@@ -9268,8 +11619,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetOutputResetCtlBoxAO(self,resetFlag):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         resetFlag = int(resetFlag)
         flag = True
         while flag:
@@ -9290,8 +11641,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetOutputResetAxleDO(self,resetFlag):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         resetFlag = int(resetFlag)
         flag = True
         while flag:
@@ -9312,8 +11663,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetOutputResetAxleAO(self,resetFlag):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         resetFlag = int(resetFlag)
         flag = True
         while flag:
@@ -9334,8 +11685,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetOutputResetExtDO(self,resetFlag):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         resetFlag = int(resetFlag)
         flag = True
         while flag:
@@ -9356,8 +11707,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetOutputResetExtAO(self,resetFlag):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         resetFlag = int(resetFlag)
         flag = True
         while flag:
@@ -9378,8 +11729,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetOutputResetSmartToolDO(self,resetFlag):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         resetFlag = int(resetFlag)
         flag = True
         while flag:
@@ -9401,8 +11752,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WeaveStartSim(self,weaveNum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         weaveNum = int(weaveNum)
         flag = True
         while flag:
@@ -9423,8 +11774,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WeaveEndSim(self,weaveNum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         weaveNum = int(weaveNum)
         flag = True
         while flag:
@@ -9445,8 +11796,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WeaveInspectStart(self,weaveNum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         weaveNum = int(weaveNum)
         flag = True
         while flag:
@@ -9467,8 +11818,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WeaveInspectEnd(self,weaveNum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         weaveNum = int(weaveNum)
         flag = True
         while flag:
@@ -9500,8 +11851,8 @@ class RPC():
     @xmlrpc_timeout
     def WeldingSetProcessParam(self, id, startCurrent, startVoltage, startTime, weldCurrent, weldVoltage, endCurrent,
                                endVoltage, endTime):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         startCurrent = float(startCurrent)
         startVoltage = float(startVoltage)
@@ -9539,8 +11890,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WeldingGetProcessParam(self, id):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None, None, None, None, None, None, None
         id = int(id)
         flag = True
         while flag:
@@ -9565,8 +11916,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetAirControlExtDoNum(self,DONum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         DONum = int(DONum)
         flag = True
         while flag:
@@ -9587,8 +11938,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetArcStartExtDoNum(self,DONum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         DONum = int(DONum)
         flag = True
         while flag:
@@ -9609,8 +11960,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetWireReverseFeedExtDoNum(self,DONum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         DONum = int(DONum)
         flag = True
         while flag:
@@ -9631,8 +11982,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetWireForwardFeedExtDoNum(self,DONum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         DONum = int(DONum)
         flag = True
         while flag:
@@ -9653,8 +12004,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetArcDoneExtDiNum(self,DINum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         DINum = int(DINum)
         flag = True
         while flag:
@@ -9675,8 +12026,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetWeldReadyExtDiNum(self,DINum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         DINum = int(DINum)
         flag = True
         while flag:
@@ -9698,8 +12049,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetExtDIWeldBreakOffRecover(self,reWeldDINum, abortWeldDINum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         reWeldDINum = int(reWeldDINum)
         abortWeldDINum = int(abortWeldDINum)
         flag = True
@@ -9724,8 +12075,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetCollisionDetectionMethod(self,method,thresholdMode):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         method = int(method)
         thresholdMode = int(thresholdMode)
         flag = True
@@ -9747,8 +12098,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetStaticCollisionOnOff(self,status):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         status = int(status)
         flag = True
         while flag:
@@ -9770,8 +12121,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetPowerLimit(self,status, power):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         status = int(status)
         power = float(power)
         flag = True
@@ -9793,8 +12144,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetRobotRealtimeStateSamplePeriod(self,period):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         period = int(period)
         flag = True
         while flag:
@@ -9816,8 +12167,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetRobotRealtimeStateSamplePeriod(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -9842,8 +12193,9 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetJointDriverTorque(self):
-        return 0,[self.robot_state_pkg.jointDriverTorque[0],self.robot_state_pkg.jointDriverTorque[1],self.robot_state_pkg.jointDriverTorque[2],
-                  self.robot_state_pkg.jointDriverTorque[3],self.robot_state_pkg.jointDriverTorque[4],self.robot_state_pkg.jointDriverTorque[5]]
+        pkg = self.robot_state_pkg
+        return 0,[pkg.jointDriverTorque[0],pkg.jointDriverTorque[1],pkg.jointDriverTorque[2],
+                  pkg.jointDriverTorque[3],pkg.jointDriverTorque[4],pkg.jointDriverTorque[5]]
 
 
     """   
@@ -9855,8 +12207,9 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetJointDriverTemperature (self):
-        return 0,[self.robot_state_pkg.jointDriverTemperature [0],self.robot_state_pkg.jointDriverTemperature [1],self.robot_state_pkg.jointDriverTemperature[2],
-                  self.robot_state_pkg.jointDriverTemperature [3],self.robot_state_pkg.jointDriverTemperature[4],self.robot_state_pkg.jointDriverTemperature[5]]
+        pkg = self.robot_state_pkg
+        return 0,[pkg.jointDriverTemperature [0],pkg.jointDriverTemperature [1],pkg.jointDriverTemperature[2],
+                  pkg.jointDriverTemperature [3],pkg.jointDriverTemperature[4],pkg.jointDriverTemperature[5]]
 
 
 
@@ -9869,8 +12222,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ArcWeldTraceReplayStart(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -9891,8 +12244,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ArcWeldTraceReplayEnd(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -9918,8 +12271,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def MultilayerOffsetTrsfToBase(self,pointo,pointX,pointZ,dx,dz,dry):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         pointo =list(map(float,pointo))
         pointX = list(map(float, pointX))
         pointZ = list(map(float, pointZ))
@@ -9950,8 +12303,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AngularSpeedStart(self, ratio):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         ratio = int(ratio)
         flag = True
         while flag:
@@ -9971,8 +12324,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AngularSpeedEnd(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -9988,38 +12341,36 @@ class RPC():
     @brief  机器人软件升级
     @param  [in]必选参数  filePath 软件升级包全路径
     @param  [in]必选参数 block 是否阻塞至升级完成 true:阻塞；false:非阻塞
+    @param  [in]默认参数 progress 阻塞时升级状态变化的回调 progress(state)，在状态接收线程中调用(RobotFleet中在该机器人的回调线程中调用)，默认None
     @return 错误码 成功- 0, 失败-错误码    
     """
     @log_call
     @xmlrpc_timeout
-    def SoftwareUpgrade(self,filePath, block):
+    def SoftwareUpgrade(self,filePath, block, progress=None):
         error = self.__FileUpLoad(1,filePath)
 
         print("__FileUpLoad", error)
         if 0==error:
             self.log_info("Software Upload success!")
-            error =self.robot.SoftwareUpgrade()
-            if 0!=error:
-                return error
-            if block:
-                upgradeState = -1
-                time.sleep(0.5)
-                upgradeState = self.GetSoftwareUpgradeState()
-                if upgradeState == 0:
-                    self.log_error("software upgrade not start")
-                    return -1
-                while (upgradeState > 0 and upgradeState < 100):
-                    time.sleep(0.5)
-                    upgradeState = self.GetSoftwareUpgradeState()
-                    # print("upgradeState",upgradeState,"%")
-                if upgradeState == 100:
-                    error = 0
-                else:
-                    error = upgradeState
+            # 升级开始前安装跟踪，升级状态由状态接收线程逐帧更新
+            watcher = UpgradeWatcher(progress, self.robot_state_pkg.softwareUpgradeState,
+                                     self.callback_dispatch) if block else None
+            self.upgrade_watcher = watcher
+            try:
+                error =self.robot.SoftwareUpgrade()
+                self.config_cache.invalidate("GetSoftwareVersion")
+                if 0!=error:
+                    return error
+                if block:
+                    error = watcher.wait(deadline=getattr(_call_context, "deadline", None))
+                    if error == -1:
+                        self.log_error("software upgrade not start")
+            finally:
+                self.upgrade_watcher = None
             return error
         else:
             self.log_error("execute SoftwareUpgrade fail.")
-            return error
+        return error
 
 
     """   
@@ -10042,8 +12393,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AuxServoSetAcc(self,acc,dec):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         acc = float(acc)
         dec = float(dec)
         flag = True
@@ -10065,8 +12416,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AuxServoSetEmergencyStopAcc(self,acc,dec):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         acc = float(acc)
         dec = float(dec)
         flag = True
@@ -10089,8 +12440,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AuxServoGetEmergencyStopAcc(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None
         flag = True
         while flag:
             try:
@@ -10114,8 +12465,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AuxServoGetAcc(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None
         flag = True
         while flag:
             try:
@@ -10144,8 +12495,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetAxleCommunicationParam(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None, None, None, None, None, None
         flag = True
         while flag:
             try:
@@ -10173,8 +12524,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetAxleCommunicationParam(self,baudRate,dataBit,stopBit,verify,timeout,timeoutTimes,period):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         baudRate = int (baudRate)
         dataBit = int (dataBit)
         stopBit = int (stopBit)
@@ -10200,8 +12551,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetAxleFileType(self,type):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         type=int(type)
         flag = True
         while flag:
@@ -10221,8 +12572,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetAxleLuaEnable(self,enable):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         enable=int(enable)
         flag = True
         while flag:
@@ -10242,8 +12593,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetRecoverAxleLuaErr(self,enable):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -10262,8 +12613,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetAxleLuaEnableStatus(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -10287,8 +12638,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetAxleLuaEnableDeviceType(self,forceSensorEnable,gripperEnable,IOEnable):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         forceSensorEnable = int(forceSensorEnable)
         gripperEnable = int(gripperEnable)
         IOEnable = int(IOEnable)
@@ -10312,8 +12663,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetAxleLuaEnableDeviceType(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None, None
         flag = True
         while flag:
             try:
@@ -10337,8 +12688,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetAxleLuaEnableDevice(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None, None
         flag = True
         while flag:
             try:
@@ -10369,8 +12720,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetAxleLuaGripperFunc(self,id,func):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         func = list(map(int, func))
         flag = True
@@ -10393,8 +12744,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetAxleLuaGripperFunc(self,id):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         id=int(id)
         flag = True
         while flag:
@@ -10425,8 +12776,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetCtrlOpenLUAName(self,id,name):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         name = str(name)
         flag = True
@@ -10447,8 +12798,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetCtrlOpenLUAName(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         flag = True
         while flag:
             try:
@@ -10476,8 +12827,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def LoadCtrlOpenLUA(self,id):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         flag = True
         while flag:
@@ -10498,8 +12849,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def UnloadCtrlOpenLUA(self,id):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         flag = True
         while flag:
@@ -10520,8 +12871,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetCtrlOpenLuaErrCode(self,id):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         id = int(id)
         flag = True
         while flag:
@@ -10544,8 +12895,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SlaveFileWrite(self,type,slaveID,fileName):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         type = int(type)
         slaveID = int(slaveID)
         fileName =str(fileName)
@@ -10567,8 +12918,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetSysServoBootMode(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -10620,8 +12971,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def TractorEnable(self, enable):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         enable = int(enable)
         flag = True
         while flag:
@@ -10641,8 +12992,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def TractorHoming(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -10663,8 +13014,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def TractorMoveL(self,distance,vel):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         distance = float(distance)
@@ -10690,8 +13041,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def TractorMoveC(self,radio, angle, vel):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         radio = float(radio)
@@ -10716,8 +13067,8 @@ class RPC():
     @xmlrpc_timeout
 
     def TractorStop(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -10739,8 +13090,8 @@ class RPC():
     @xmlrpc_timeout
 
     def SetWireSearchExtDIONum(self,searchDoneDINum,searchStartDONum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         searchDoneDINum = int(searchDoneDINum)
         searchStartDONum = int(searchStartDONum)
         flag = True
@@ -10763,8 +13114,8 @@ class RPC():
     @xmlrpc_timeout
 
     def SetWeldMachineCtrlModeExtDoNum(self, DONum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         DONum = int(DONum)
         flag = True
         while flag:
@@ -10786,8 +13137,8 @@ class RPC():
     @xmlrpc_timeout
 
     def SetWeldMachineCtrlMode(self, mode):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         mode = int(mode)
         flag = True
         while flag:
@@ -10810,6 +13161,8 @@ class RPC():
     def CloseRPC(self):
         # 设置停止事件以通知线程停止
         self.stop_event.set()
+        self.stop_motion_submit()
+        self.torque_loop = None
 
         # 如果线程仍在运行，则等待其结束
         # if self.thread.is_alive():
@@ -10818,9 +13171,9 @@ class RPC():
         # 清理 XML-RPC 代理
         if self.robot is not None:
             self.robot = None  # 将代理设置为 None，释放资源
-            self.sock_cli_state.close()
+            if self.sock_cli_state is not None:  # 重连过程中可能尚未建立
+                self.sock_cli_state.close()
             self.sock_cli_state = None
-            self.robot_state_pkg = None
             self.closeRPC_state = True
             # self.robot_realstate_exit = False
 
@@ -10861,8 +13214,8 @@ class RPC():
     @xmlrpc_timeout
 
     def SingularAvoidStart(self, protectMode, minShoulderPos=100,minElbowPos=50,minWristPos=10):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         protectMode = int(protectMode)
         minShoulderPos = float(minShoulderPos)
         minElbowPos = float(minElbowPos)
@@ -10886,8 +13239,8 @@ class RPC():
     @xmlrpc_timeout
 
     def SingularAvoidEnd(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -10909,7 +13262,8 @@ class RPC():
     @xmlrpc_timeout
 
     def GetGripperRotNum(self):
-        return 0,self.robot_state_pkg.gripper_fault,self.robot_state_pkg.gripperRotNum
+        pkg = self.robot_state_pkg
+        return 0,pkg.gripper_fault,pkg.gripperRotNum
 
     """   
         @brief 获取旋转夹爪的旋转速度百分比
@@ -10922,7 +13276,8 @@ class RPC():
     @xmlrpc_timeout
 
     def GetGripperRotSpeed(self):
-        return 0, self.robot_state_pkg.gripper_fault, self.robot_state_pkg.gripperRotSpeed
+        pkg = self.robot_state_pkg
+        return 0, pkg.gripper_fault, pkg.gripperRotSpeed
 
     """   
         @brief 获取旋转夹爪的旋转力矩百分比
@@ -10935,7 +13290,8 @@ class RPC():
     @xmlrpc_timeout
 
     def GetGripperRotTorque(self):
-        return 0, self.robot_state_pkg.gripper_fault, self.robot_state_pkg.gripperRotTorque
+        pkg = self.robot_state_pkg
+        return 0, pkg.gripper_fault, pkg.gripperRotTorque
 
     """   
        @brief 开始Ptp运动FIR滤波
@@ -10948,8 +13304,8 @@ class RPC():
     @xmlrpc_timeout
 
     def PtpFIRPlanningStart(self, maxAcc,maxJek):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         maxAcc = float(maxAcc)
         maxJek = float(maxJek)
         flag = True
@@ -10971,8 +13327,8 @@ class RPC():
     @xmlrpc_timeout
 
     def PtpFIRPlanningEnd(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -11024,8 +13380,8 @@ class RPC():
     @xmlrpc_timeout
 
     def LinArcFIRPlanningStart(self, maxAccLin, maxAccDeg, maxJerkLin, maxJerkDeg):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         maxAccLin = float(maxAccLin)
         maxAccDeg = float(maxAccDeg)
         maxJerkLin = float(maxJerkLin)
@@ -11049,8 +13405,8 @@ class RPC():
     @xmlrpc_timeout
 
     def LinArcFIRPlanningEnd(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -11072,8 +13428,8 @@ class RPC():
     @xmlrpc_timeout
 
     def ToolTrsfStart(self, toolNum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         toolNum = int(toolNum)
         flag = True
         while flag:
@@ -11094,8 +13450,8 @@ class RPC():
     @xmlrpc_timeout
 
     def ToolTrsfEnd(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -11120,8 +13476,8 @@ class RPC():
     @xmlrpc_timeout
 
     def ComputeToolCoordWithPoints(self, method, pos):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         method = int(method)
         param = {}
         param[0] = pos[0]
@@ -11161,8 +13517,8 @@ class RPC():
     @xmlrpc_timeout
 
     def ComputeWObjCoordWithPoints(self, method, pos, refFrame):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         method = int(method)
         param = {}
         param[0] = pos[0]
@@ -11193,8 +13549,8 @@ class RPC():
     @xmlrpc_timeout
 
     def WeldingSetCheckArcInterruptionParam(self, checkEnable, arcInterruptTimeLength):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         checkEnable = int(checkEnable)
         arcInterruptTimeLength = int(arcInterruptTimeLength)
         flag = True
@@ -11218,8 +13574,8 @@ class RPC():
     @xmlrpc_timeout
 
     def WeldingGetCheckArcInterruptionParam(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None
         flag = True
         while flag:
             try:
@@ -11246,8 +13602,8 @@ class RPC():
     @xmlrpc_timeout
 
     def WeldingSetReWeldAfterBreakOffParam(self, enable, length, velocity, moveType):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         enable = int(enable)
         length = float(length)
         velocity = float(velocity)
@@ -11275,8 +13631,8 @@ class RPC():
     @xmlrpc_timeout
 
     def WeldingGetReWeldAfterBreakOffParam(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None, None, None
         flag = True
         while flag:
             try:
@@ -11299,8 +13655,8 @@ class RPC():
     @xmlrpc_timeout
 
     def WeldingStartReWeldAfterBreakOff(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -11320,8 +13676,8 @@ class RPC():
     @xmlrpc_timeout
 
     def WeldingAbortWeldAfterBreakOff(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -11349,8 +13705,8 @@ class RPC():
     @xmlrpc_timeout
 
     def LaserSensorRecord(self, status, delayMode, delayTime, delayDisExAxisNum, delayDis, sensitivePara, speed):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         status = int(status)
         delayMode = int(delayMode)
         delayTime = int(delayTime)
@@ -11378,8 +13734,8 @@ class RPC():
     @xmlrpc_timeout
 
     def LaserTrackingLaserOn(self, weldId):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         weldId = int(weldId)
         flag = True
         while flag:
@@ -11400,8 +13756,8 @@ class RPC():
     @xmlrpc_timeout
 
     def LaserTrackingLaserOff(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -11422,8 +13778,8 @@ class RPC():
     @xmlrpc_timeout
 
     def LaserTrackingTrackOn(self, coordId):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         coordId = int(coordId)
         flag = True
         while flag:
@@ -11444,8 +13800,8 @@ class RPC():
     @xmlrpc_timeout
 
     def LaserTrackingTrackOff(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -11471,8 +13827,8 @@ class RPC():
     @xmlrpc_timeout
 
     def LaserTrackingSearchStart(self, direction, directionPoint, vel, distance, timeout, posSensorNum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         direction = int(direction)
         directionPoint = list(map(float, directionPoint))
         vel = int(vel)
@@ -11498,8 +13854,8 @@ class RPC():
     @xmlrpc_timeout
 
     def LaserTrackingSearchStop(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -11525,8 +13881,8 @@ class RPC():
     @xmlrpc_timeout
 
     def WeaveChangeStart(self, weaveChangeFlag, weaveNum, velStart, velEnd):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         weaveChangeFlag = int(weaveChangeFlag)
         weaveNum = int(weaveNum)
         velStart = float(velStart)
@@ -11550,8 +13906,8 @@ class RPC():
     @xmlrpc_timeout
 
     def WeaveChangeEnd(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -11581,8 +13937,8 @@ class RPC():
     @xmlrpc_timeout
 
     def LoadTrajectoryLA(self, name, mode, errorLim, type, precision, vamx, amax, jmax):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         name =str(name)
@@ -11612,8 +13968,8 @@ class RPC():
     @xmlrpc_timeout
 
     def MoveTrajectoryLA(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         flag = True
@@ -11639,8 +13995,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def CustomCollisionDetectionStart(self, flag, jointDetectionThreshould, tcpDetectionThreshould, block):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         flag = int(flag)
@@ -11666,8 +14022,8 @@ class RPC():
     @xmlrpc_timeout
 
     def CustomCollisionDetectionEnd(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         flag = True
@@ -11715,8 +14071,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AccSmoothStart(self, saveFlag):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         saveFlag = bool(saveFlag)
@@ -11741,8 +14097,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def AccSmoothEnd(self, saveFlag):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         saveFlag = bool(saveFlag)
@@ -11841,8 +14197,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetRobotSN(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         flag = True
@@ -11866,8 +14222,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ShutDownRobotOS(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         flag = True
@@ -11889,8 +14245,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ConveyorComDetect(self, timeout):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         timeout = int(timeout)
@@ -11942,8 +14298,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ArcWeldTraceAIChannelCurrent(self, channel):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         channel = int(channel)
@@ -11965,8 +14321,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ArcWeldTraceAIChannelVoltage(self, channel):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         channel = int(channel)
@@ -11991,8 +14347,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ArcWeldTraceCurrentPara(self, AILow=0, AIHigh=10, currentLow=0, currentHigh=100):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         AILow = float(AILow)
@@ -12020,8 +14376,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ArcWeldTraceVoltagePara(self, AILow=0, AIHigh=10, voltageLow=0, voltageHigh=100):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         AILow = float(AILow)
@@ -12051,8 +14407,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WeldingSetVoltageGradualChangeStart(self, IOType, voltageStart, voltageEnd, AOIndex, blend):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         IOType = int(IOType)
@@ -12077,8 +14433,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WeldingSetVoltageGradualChangeEnd(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         flag = True
@@ -12103,8 +14459,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WeldingSetCurrentGradualChangeStart(self, IOType, currentStart, currentEnd, AOIndex, blend):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         IOType = int(IOType)
@@ -12129,8 +14485,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def WeldingSetCurrentGradualChangeEnd(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         flag = True
@@ -12164,8 +14520,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ExtAxisGetCoord(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         flag = True
@@ -12193,7 +14549,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetGripperActivateStatus(self):
-        return 0, self.robot_state_pkg.gripper_fault,self.robot_state_pkg.gripper_active
+        pkg = self.robot_state_pkg
+        return 0, pkg.gripper_fault,pkg.gripper_active
 
     """   
     @brief  获取夹爪位置
@@ -12206,7 +14563,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetGripperCurPosition(self):
-        return 0, self.robot_state_pkg.gripper_fault, self.robot_state_pkg.gripper_position
+        pkg = self.robot_state_pkg
+        return 0, pkg.gripper_fault, pkg.gripper_position
 
     """   
     @brief  获取夹爪电流
@@ -12219,7 +14577,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetGripperCurCurrent(self):
-        return 0, self.robot_state_pkg.gripper_fault, self.robot_state_pkg.gripper_current
+        pkg = self.robot_state_pkg
+        return 0, pkg.gripper_fault, pkg.gripper_current
 
     """   
     @brief  获取夹爪电压
@@ -12232,7 +14591,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetGripperVoltage(self):
-        return 0, self.robot_state_pkg.gripper_fault, self.robot_state_pkg.gripper_voltage
+        pkg = self.robot_state_pkg
+        return 0, pkg.gripper_fault, pkg.gripper_voltage
 
     """   
     @brief  获取夹爪温度
@@ -12245,7 +14605,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetGripperTemp(self):
-        return 0, self.robot_state_pkg.gripper_fault, self.robot_state_pkg.gripper_tmp
+        pkg = self.robot_state_pkg
+        return 0, pkg.gripper_fault, pkg.gripper_tmp
 
     """   
     @brief  获取夹爪速度
@@ -12258,7 +14619,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetGripperCurSpeed(self):
-        return 0, self.robot_state_pkg.gripper_fault, self.robot_state_pkg.gripper_speed
+        pkg = self.robot_state_pkg
+        return 0, pkg.gripper_fault, pkg.gripper_speed
 
     """2025.06.24"""
     """3.8.3"""
@@ -12272,8 +14634,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetWideBoxTempFanMonitorParam(self, enable, period):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         if self.GetSafetyCode() != 0:
             return self.GetSafetyCode()
         enable = int(enable)
@@ -12297,8 +14659,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def GetWideBoxTempFanMonitorParam(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None
         flag = True
         while flag:
             try:
@@ -12325,8 +14687,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetFocusCalibPoint(self, pointNum, point):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         pointNum = int(pointNum)
         point = list(map(float, point))
         flag = True
@@ -12349,8 +14711,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def ComputeFocusCalib(self, pointNum):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN, None, None
         pointNum = int(pointNum)
         flag = True
         while flag:
@@ -12378,8 +14740,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FocusStart(self, kp=50.0, kpredic=19.0, aMax=1440, vMax=180, type=0):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         kp = float(kp)
         kpredic = float(kpredic)
         aMax = float(aMax)
@@ -12402,8 +14764,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def FocusEnd(self):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         flag = True
         while flag:
             try:
@@ -12422,8 +14784,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetFocusPosition(self, pos):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         pos = list(map(float, pos))
         flag = True
         while flag:
@@ -12444,8 +14806,8 @@ class RPC():
     @log_call
     @xmlrpc_timeout
     def SetEncoderUpgrade(self, path):
-        while self.reconnect_flag:
-            time.sleep(0.1)
+        if not self.wait_connected():
+            return RobotError.ERROR_RECONN
         path = str(path)
         flag = True
         while flag:
@@ -12529,4 +14891,942 @@ class RPC():
         if errcode == 0:
             error = self.robot.JointAllParamUpgrade()
             return error
-        return errcode
\ No newline at end of file
+        return errcode
+
+class _PendingIO(BaseException):
+    """回放指令时遇到尚未完成的网络操作，继承BaseException以免被指令内的 except Exception 捕获"""
+
+    def __init__(self, kind, name, params):
+        super().__init__(name)
+        self.kind = kind
+        self.name = name
+        self.params = params
+
+
+class _ReplayMethod:
+    def __init__(self, proxy, name):
+        self._proxy = proxy
+        self._name = name
+
+    def __getattr__(self, name):
+        return _ReplayMethod(self._proxy, f"{self._name}.{name}")
+
+    def __call__(self, *params):
+        return self._proxy.replay("xmlrpc", self._name, params)
+
+
+class _ReplayProxy:
+    """
+    回放代理，替代指令实现中的 self.robot：已完成的调用按顺序返回记录的结果，
+    遇到新的调用时抛出_PendingIO，由RPCBatch合并发送后重新执行指令
+    """
+
+    def __init__(self, results):
+        self._results = results
+        self._index = 0
+
+    def __getattr__(self, name):
+        return _ReplayMethod(self, name)
+
+    def replay(self, kind, name, params):
+        if self._index == len(self._results):
+            raise _PendingIO(kind, name, params)
+        recorded_name, ok, value = self._results[self._index]
+        if recorded_name != name:
+            raise RuntimeError(f"指令回放顺序不一致：{recorded_name} / {name}")
+        self._index += 1
+        if not ok:
+            raise value
+        return value
+
+    def memo(self, name, compute):
+        """不经网络的查询(如运动学缓存)也按顺序记录，重复执行指令时返回第一次的结果"""
+        name = "memo:" + name
+        if self._index == len(self._results):
+            self._results.append((name, True, compute()))
+        return self.replay("memo", name, ())
+
+
+class _ReplayContext(RPC):
+    """
+    在RPC之外执行RPC指令实现时使用的对象，robot为回放代理或_AsyncBridge，状态为指令开始时的快照；
+    owner不为None时与owner共享全部实例状态(缓存、断路器、日志、锁等)，等待重连委托给owner，
+    为None时按RPC初始化但不连接控制器，由调用方(AsyncRPC.call)负责等待
+    """
+
+    def __init__(self, ip, state_buffer, owner=None):
+        if owner is None:
+            self._init_state(ip)
+        else:
+            self.__dict__.update(owner.__dict__)
+        self.ip_address = ip
+        self.robot = None
+        self.state_buffer = state_buffer
+        self.owner = owner
+        self.command_state = None
+
+    @property
+    def robot_state_pkg(self):
+        return self.command_state
+
+    def wait_connected(self, deadline=None):
+        if self.owner is None:
+            return True
+        return self.owner.wait_connected(deadline)
+
+    def send_message(self, message):
+        return self.robot.replay("message", "send_message", (message,))
+
+    def _cache_lookup(self, cache, key):
+        return self.robot.memo("cache", lambda: cache.get(key))
+
+    def _once(self, name, action):
+        """日志、等待等副作用按顺序记录，batch()重复执行指令时不再执行已执行过的副作用"""
+        if self.robot is None:
+            return action()
+        return self.robot.memo(name, action)
+
+    def sleep(self, seconds):
+        self._once("sleep", lambda: super(_ReplayContext, self).sleep(seconds))
+
+    def log_debug(self, message):
+        self._once("log", lambda: super(_ReplayContext, self).log_debug(message))
+
+    def log_info(self, message):
+        self._once("log", lambda: super(_ReplayContext, self).log_info(message))
+
+    def log_warning(self, message):
+        self._once("log", lambda: super(_ReplayContext, self).log_warning(message))
+
+    def log_error(self, message):
+        self._once("log", lambda: super(_ReplayContext, self).log_error(message))
+
+    def invalidate_kinematics_cache(self):
+        def invalidate():
+            super(_ReplayContext, self).invalidate_kinematics_cache()
+            if self.owner is not None:
+                self.owner.kinematics = None
+        self._once("invalidate", invalidate)
+
+
+class _AsyncBridge:
+    """
+    AsyncRPC在线程池中执行指令实现时替代 self.robot，接口与_ReplayProxy相同：
+    每个网络操作提交到事件循环，由异步连接完成，执行线程等待结果，指令实现只执行一次
+    """
+
+    def __init__(self, rpc, loop, deadline):
+        self._rpc = rpc
+        self._loop = loop
+        self._deadline = deadline
+
+    def __getattr__(self, name):
+        return _ReplayMethod(self, name)
+
+    def replay(self, kind, name, params):
+        if kind == "message":
+            coroutine = self._rpc.send_message(*params)
+        else:
+            coroutine = self._rpc.call(name, *params, deadline=self._deadline)
+        # call()重试后仍失败时抛出RPCUnavailable，不会被指令内的 except socket.error 重试循环捕获
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def memo(self, name, compute):
+        return compute()
+
+
+class BatchCall:
+    """batch()中调用的一条指令，退出with块后由result()取得与直接调用相同的返回值"""
+
+    def __init__(self, name, func, args, kwargs):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.records = []  # 回放记录 (方法名, 是否成功, 返回值或异常)
+        self.state = None
+        self.done = False
+        self._result = None
+        self._exception = None
+
+    def result(self):
+        if not self.done:
+            raise RuntimeError(f"{self.name} 尚未发送，请在batch结束后获取结果")
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def __repr__(self):
+        if not self.done:
+            return f"<BatchCall {self.name} pending>"
+        return f"<BatchCall {self.name} {self._exception or self._result!r}>"
+
+
+class RPCBatch:
+    """
+    批量提交指令：with块内在本线程调用的指令暂不发送，返回BatchCall；退出with块时按调用顺序
+    合并为尽量少的system.multicall请求，控制器不支持时在长连接上逐条发送
+    指令内部依赖上一次返回值的请求(如MoveL未给出关节位置时先求逆解)放到下一轮发送，
+    各请求到达控制器的顺序与逐条调用相同
+    每一轮发送后从头重新执行指令实现，已完成的请求返回记录的结果；经self执行的副作用(log_*、sleep、
+    缓存查询与清除)同样按顺序记录，只执行一次；指令实现中不经self的副作用(print、time.sleep、修改全局状态)
+    会随重新执行重复发生，可在batch中调用的指令除上述方法外应只做参数转换与请求
+    """
+
+    def __init__(self, rpc):
+        self.rpc = rpc
+        self.calls = []
+        self.rounds = 0  # 发送轮数
+        self.requests = 0  # HTTP请求数
+
+    def add(self, func, args, kwargs):
+        call = BatchCall(func.__name__, func, args, kwargs)
+        self.calls.append(call)
+        return call
+
+    def __enter__(self):
+        if getattr(_call_context, "batch", None) is not None:
+            raise RuntimeError("batch不支持嵌套")
+        _call_context.batch = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _call_context.batch = None
+        if exc_type is None:
+            self.flush()
+        return False
+
+    def flush(self):
+        """发送所有尚未发送的指令"""
+        rpc = self.rpc
+        context = _ReplayContext(rpc.ip_address, rpc.state_buffer, rpc)
+        start = 0
+        while start < len(self.calls):
+            batch_round = []
+            index = start
+            while index < len(self.calls):
+                call = self.calls[index]
+                pending = self._step(context, call)
+                if pending is None:
+                    if not batch_round and index == start:
+                        start += 1
+                    index += 1
+                    continue
+                if pending.kind == "message":
+                    # 8080端口消息不能合并，先发送之前的请求
+                    if not batch_round:
+                        call.records.append((pending.name, True, rpc.send_message(*pending.params)))
+                    break
+                batch_round.append((call, pending))
+                # 只有指令的首个请求且与指令同名时，才确定之后不再依赖返回值发出新的请求
+                # 改变工具/工件坐标系等的指令完成后，之后的指令才能查询运动学/配置缓存
+                if pending.name != call.name or call.name in RPC.CONFIG_SETTERS or \
+                        any(not name.startswith("memo:") for name, ok, value in call.records):
+                    break
+                index += 1
+            if batch_round:
+                self._send(batch_round)
+
+    def _step(self, context, call):
+        """回放一条指令，返回下一条需要发送的请求，指令已完成时返回None"""
+        if call.done:
+            return None
+        if call.state is None:
+            call.state = self.rpc.robot_state_pkg
+        context.robot = _ReplayProxy(call.records)
+        context.command_state = call.state
+        try:
+            call._result = call.func(context, *call.args, **call.kwargs)
+        except _PendingIO as ex:
+            return ex
+        except RPCUnavailable:
+            call._result = RobotError.ERR_RPC_ERROR
+        except Exception as ex:
+            call._exception = ex
+        finally:
+            context.robot = None
+        call.done = True
+        return None
+
+    def _send(self, batch_round):
+        rpc = self.rpc
+        self.rounds += 1
+        values = None
+        if len(batch_round) > 1 and rpc.multicall_supported is not False:
+            values = self._multicall(batch_round)
+        if values is None:
+            values = []
+            for call, pending in batch_round:
+                self.requests += 1
+                try:
+                    values.append((True, getattr(rpc.robot, pending.name)(*pending.params)))
+                except Exception as ex:
+                    values.append((False, ex))
+        # 网络异常同样记录下来，由指令自身的重试逻辑重新发起请求
+        for (call, pending), (ok, value) in zip(batch_round, values):
+            call.records.append((pending.name, ok, value))
+
+    def _multicall(self, batch_round):
+        rpc = self.rpc
+        self.requests += 1
+        try:
+            results = rpc.robot.system.multicall(
+                [{"methodName": pending.name, "params": list(pending.params)} for _, pending in batch_round])
+        except xmlrpc.client.Fault:
+            rpc.multicall_supported = False
+            return None
+        except Exception as ex:
+            return [(False, ex)] * len(batch_round)
+        if not isinstance(results, list) or len(results) != len(batch_round):
+            rpc.multicall_supported = False
+            return None
+        rpc.multicall_supported = True
+        values = []
+        for result in results:
+            if isinstance(result, dict):
+                values.append((False, xmlrpc.client.Fault(result["faultCode"], result["faultString"])))
+            else:
+                values.append((True, result[0]))
+        return values
+
+
+class AsyncXMLRPCConnection:
+    """
+    20003端口非阻塞XML-RPC连接，使用HTTP/1.1长连接，连接断开后下一次请求时重新建立；
+    sent记录最近一次请求是否已完整写入连接，与KeepAliveTransport相同，已发出的请求出错后不再重发
+    """
+
+    def __init__(self, host, port, handler="/RPC2", connect_timeout=None):
+        self.host = host
+        self.port = port
+        self.handler = handler
+        self.connect_timeout = connect_timeout  # 建立TCP连接的超时时间，单位 [s]
+        self.reader = None
+        self.writer = None
+        self.requests = 0
+        self.connects = 0
+        self.sent = False
+
+    async def open(self):
+        try:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.connect_timeout)
+        except asyncio.TimeoutError:
+            # Python 3.10的asyncio.TimeoutError不是OSError，转换后与其他连接异常一样按重试策略处理
+            raise socket.timeout(f"连接 {self.host}:{self.port} 超时") from None
+        sock = self.writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connects += 1
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, params):
+        """发送一次XML-RPC请求，返回值与ServerProxy相同，控制器返回Fault时抛出xmlrpc.client.Fault"""
+        body = xmlrpc.client.dumps(tuple(params), method).encode("utf-8", "xmlcharrefreplace")
+        header = (f"POST {self.handler} HTTP/1.1\r\n"
+                  f"Host: {self.host}:{self.port}\r\n"
+                  f"User-Agent: {xmlrpc.client.Transport.user_agent}\r\n"
+                  f"Content-Type: text/xml\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode("ascii")
+        for attempt in range(2):
+            self.sent = False
+            reused = self.writer is not None
+            if not reused:
+                await self.open()
+            try:
+                self.writer.write(header + body)
+                await self.writer.drain()
+                self.sent = True
+                status, headers, payload = await self._read_response()
+                break
+            except (ConnectionResetError, ConnectionAbortedError, BrokenPipeError):
+                self.close()
+                # 复用的长连接可能已被控制器关闭，重新连接后再发送一次；新建的连接发出后断开时请求可能已被执行
+                if not reused or attempt > 0:
+                    raise
+            except (OSError, EOFError):
+                self.close()
+                raise
+        self.requests += 1
+        if status != 200:
+            raise xmlrpc.client.ProtocolError(f"{self.host}:{self.port}{self.handler}", status, "", headers)
+        parser, unmarshaller = xmlrpc.client.getparser()
+        parser.feed(payload)
+        parser.close()
+        result = unmarshaller.close()
+        if len(result) == 1:
+            result = result[0]
+        return result
+
+    async def _read_response(self):
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionResetError("控制器关闭了连接")
+        version, status = line.split(None, 2)[:2]
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        if "content-length" in headers:
+            payload = await self.reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                chunks.append(await self.reader.readexactly(size + 2))
+                if size == 0:
+                    break
+            payload = b"".join(chunk[:-2] for chunk in chunks)
+        else:
+            payload = await self.reader.read()
+            headers["connection"] = "close"
+
+        connection = headers.get("connection", "").lower()
+        if connection == "close" or (version == b"HTTP/1.0" and connection != "keep-alive"):
+            self.close()
+        return int(status), headers, payload
+
+
+class AsyncRPC:
+    """
+    RPC的asyncio接口，一个事件循环内可同时控制多台机器人
+    指令为协程，参数和返回值与RPC同名指令相同，均可额外传入 deadline(time.monotonic()截止时间)，
+    等待重连超过截止时间时返回 RobotError.ERROR_RECONN；指令实现在事件循环的默认线程池中执行，
+    网络请求仍由事件循环中的长连接发送，与RPC相同按retry_policy重试未发出的请求，重试后仍失败、
+    超过截止时间或断路器打开时返回 RobotError.ERR_RPC_ERROR；20004端口状态通过 states() 异步迭代
+    文件传输、固件升级等依赖阻塞socket或等待的指令(EXCLUDED_COMMANDS)请使用RPC
+        async with AsyncRPC("192.168.58.2") as robot:
+            await robot.MoveL(desc_pos, 0, 0, blendR=5)
+            async for snapshot in robot.states():
+                print(snapshot.state.jt_cur_pos[0])
+    """
+
+    RPC_PORT = 20003
+    MESSAGE_PORT = 8080
+    ROBOT_REALTIME_PORT = RPC.ROBOT_REALTIME_PORT
+    BUFFER_SIZE = RPC.BUFFER_SIZE
+    RECONNECT_INTERVAL = 2  # 单位 [s]
+
+    EXCLUDED_COMMANDS = ("CloseRPC", "SegmentWeldStart", "PointTableDownLoad", "PointTableUpLoad",
+                         "PointTableUpdateLua", "LuaDownLoad", "LuaUpload", "SoftwareUpgrade", "AxleLuaUpload",
+                         "TrajectoryJUpLoad", "RbLogDownload", "AllDataSourceDownload", "DataPackageDownload",
+                         "SetJointFirmwareUpgrade", "SetCtrlFirmwareUpgrade", "SetEndFirmwareUpgrade",
+                         "JointAllParamUpgrade")
+
+    _commands = {}  # 指令名称 -> RPC中未经装饰的实现
+
+    def __init__(self, ip="192.168.58.2", connections=1):
+        """
+        @param  ip 控制器IP
+        @param  connections 20003端口并发连接数，默认1，所有指令按调用顺序串行发送
+        """
+        self.ip_address = ip
+        self.state_buffer = StateDoubleBuffer()
+        self.state_parser = None
+        self.state_recv_buffer = None
+        self.closed = False
+        self.SDK_state = True
+        self._context = _ReplayContext(ip, self.state_buffer)
+        # 与指令实现中的wait_connected共用同一个断路器
+        self.retry_policy = self._context.retry_policy
+        self.breaker = self._context.breaker
+        self.retries = 0  # 累计重试次数
+        self.failures = 0  # 重试后仍失败的请求数
+        self._connections = [AsyncXMLRPCConnection(ip, self.RPC_PORT, connect_timeout=self.retry_policy.connect_timeout)
+                             for _ in range(connections)]
+        self._pool = None
+        self._state_task = None
+        self._state_event = None
+
+    async def connect(self, state=True):
+        """
+        建立20003端口连接，并启动20004端口状态接收
+        @param  state 是否接收实时状态，指令中的安全检查及状态查询依赖实时状态
+        """
+        self._pool = asyncio.Queue()
+        for connection in self._connections:
+            await connection.open()
+            self._pool.put_nowait(connection)
+        self._state_event = asyncio.Event()
+        if state:
+            self._state_task = asyncio.ensure_future(self._state_routine())
+        return 0
+
+    async def close(self):
+        """关闭所有连接，结束状态迭代"""
+        self.closed = True
+        if self._state_task is not None:
+            self._state_task.cancel()
+            try:
+                await self._state_task
+            except asyncio.CancelledError:
+                pass
+            self._state_task = None
+        if self._state_event is not None:
+            self._state_event.set()
+        for connection in self._connections:
+            connection.close()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def call(self, method, *params, deadline=None):
+        """
+        直接调用控制器XML-RPC方法，与KeepAliveTransport相同：请求发出前的网络异常按retry_policy退避重试，
+        请求发出后的异常不重试，仍失败、超过截止时间或断路器打开时抛出RPCUnavailable
+        @param  deadline time.monotonic()截止时间，等待应答的时间不超过截止时间
+        """
+        policy = self.retry_policy
+        breaker = self.breaker
+        attempt = 0
+        connection = await self._pool.get()
+        try:
+            while True:
+                if not breaker.allow():
+                    raise RPCUnavailable("断路器打开，%s 未发送" % method)
+                timeout = None if deadline is None else max(0.001, deadline - time.monotonic())
+                try:
+                    result = await asyncio.wait_for(connection.request(method, params), timeout)
+                except (OSError, EOFError, asyncio.TimeoutError) as ex:
+                    if isinstance(ex, asyncio.TimeoutError):
+                        # 取消时请求可能只写入了一部分，连接不再复用
+                        connection.close()
+                    self.SDK_state = False
+                    breaker.record_failure()
+                    attempt += 1
+                    delay = policy.delay(attempt)
+                    if connection.sent or attempt >= policy.attempts or \
+                            (deadline is not None and time.monotonic() + delay >= deadline):
+                        self.failures += 1
+                        raise RPCUnavailable("%s 请求失败: %r" % (method, ex)) from ex
+                    self.retries += 1
+                    await asyncio.sleep(delay)
+                    continue
+                self.SDK_state = True
+                breaker.record_success()
+                return result
+        finally:
+            self._pool.put_nowait(connection)
+
+    async def send_message(self, message):
+        """8080端口发送消息，返回值与RPC.send_message相同"""
+        writer = None
+        try:
+            reader, writer = await asyncio.open_connection(self.ip_address, self.MESSAGE_PORT)
+            writer.write(message.encode('utf-8'))
+            await writer.drain()
+            response = (await reader.read(1024)).decode('utf-8')
+            return RPC.parse_message_response(response)
+        except Exception as e:
+            print(f'An error occurred: {e}')
+        finally:
+            if writer is not None:
+                writer.close()
+
+    async def _run(self, name, args, kwargs):
+        """
+        在线程池中执行一次RPC指令实现，网络操作经_AsyncBridge由事件循环中的异步连接完成，
+        指令内的等待与计算不阻塞事件循环；缓存等状态由各指令共享的self._context提供
+        """
+        deadline = kwargs.pop("deadline", None)
+        if self.breaker.rejecting():
+            return RobotError.ERR_RPC_ERROR
+        func = self._commands[name]
+        loop = asyncio.get_running_loop()
+        context = _ReplayContext(self.ip_address, self.state_buffer, self._context)
+        context.SDK_state = self.SDK_state
+        context.command_state = self.state_buffer.snapshot().state
+        context.robot = _AsyncBridge(self, loop, deadline)
+        try:
+            return await loop.run_in_executor(None, lambda: func(context, *args, **kwargs))
+        except RPCUnavailable:
+            return RobotError.ERR_RPC_ERROR
+
+    def get_state_snapshot(self):
+        """获取最新一帧机器人状态快照，seq为0表示尚未收到状态帧"""
+        return self.state_buffer.snapshot()
+
+    async def states(self):
+        """
+        异步迭代20004端口状态，每次产出最新的RobotStateSnapshot
+        迭代方处理慢于接收时跳过中间帧，只产出最新一帧；close()后迭代结束
+        """
+        seq = 0
+        while not self.closed:
+            event = self._state_event
+            snapshot = self.state_buffer.snapshot()
+            if snapshot.seq != seq:
+                seq = snapshot.seq
+                yield snapshot
+            else:
+                await event.wait()
+
+    async def _state_routine(self):
+        """20004端口状态接收协程，与RPC.robot_state_routine_thread使用相同的缓冲区与解析器"""
+        loop = asyncio.get_running_loop()
+        parser = RobotStateParser()
+        recv_buffer = StateRecvBuffer(self.BUFFER_SIZE)
+        self.state_parser = parser
+        self.state_recv_buffer = recv_buffer
+        recvview = recv_buffer.view
+        publish = self.state_buffer.publish
+        recv_time = 0.0
+
+        def on_frame(offset, frame_len):
+            publish(recvview, offset, frame_len, recv_time)
+
+        while not self.closed:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            try:
+                await loop.sock_connect(sock, (self.ip_address, self.ROBOT_REALTIME_PORT))
+                recv_buffer.reset()
+                while True:
+                    recvbyte = await loop.sock_recv_into(sock, recv_buffer.recv_view())
+                    if recvbyte <= 0:
+                        break
+                    recv_buffer.commit(recvbyte)
+                    recv_time = time.time()
+                    seq = self.state_buffer.seq
+                    recv_buffer.parse(parser, on_frame)
+                    if self.state_buffer.seq != seq:
+                        event, self._state_event = self._state_event, asyncio.Event()
+                        event.set()
+            except OSError:
+                pass
+            finally:
+                sock.close()
+            await asyncio.sleep(self.RECONNECT_INTERVAL)
+
+
+def _async_command(name):
+    command = getattr(RPC, name)
+
+    @wraps(command)
+    async def coroutine(self, *args, **kwargs):
+        return await self._run(name, args, kwargs)
+
+    return coroutine
+
+
+for _name, _command in list(vars(RPC).items()):
+    if _name[:1].isupper() and callable(_command) and _name not in AsyncRPC.EXCLUDED_COMMANDS:
+        AsyncRPC._commands[_name] = inspect.unwrap(_command)
+        setattr(AsyncRPC, _name, _async_command(_name))
+
+
+class _FleetStream:
+    """RobotFleet中一台机器人的20004端口接收状态"""
+
+    def __init__(self, arm):
+        self.arm = arm
+        self.receive = arm._state_receiver()
+        self.last_recv = time.monotonic()
+        self.recv_calls = 0
+        self.reconnecting = False
+        self.failed = False  # 重连已放弃，需调用RobotFleet.reconnect()重新开始
+
+
+class RobotFleet:
+    """
+    同一进程管理多台机器人：每台机器人是一个独立的RPC实例(receiver=False)，
+    所有20004实时端口由一个selectors接收线程分发解析，XML-RPC指令提交到共享的有界线程池执行；
+    断线时该机器人从接收线程中移除，由单独的线程按RPC.reconnect()重连，重连成功后重新加入。
+    接收线程只解析状态，运动指令Future的完成回调、升级进度回调由每台机器人各自的回调线程按顺序执行，
+    力矩控制回路的control函数在回路的下发线程中执行，一台机器人的回调阻塞不影响其他机器人的状态接收
+    """
+
+    POLL_INTERVAL = 0.1  # 接收线程检查断流与关闭的周期，单位 [s]
+    STALE_TIMEOUT = 1.0  # 实时端口超过该时间没有数据视为断开，单位 [s]
+
+    def __init__(self, ips, workers=4, max_pending=64):
+        """
+        @param  ips 控制器IP列表
+        @param  workers XML-RPC线程池的线程数
+        @param  max_pending 已提交未完成的指令上限，达到上限时submit()阻塞等待
+        """
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="RobotFleet")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._selector.register(self._wakeup_recv, selectors.EVENT_READ, None)
+        self._rejoin = deque()  # 重连成功、等待接收线程重新注册的机器人
+        self._closed = False
+        self.wakeups = 0
+        self.submitted = 0
+        # 各实例的构造(含指令端口探测)并行执行
+        self.arms = list(self.pool.map(lambda ip: RPC(ip, receiver=False), ips))
+        self._callback_pools = []
+        for arm in self.arms:
+            callback_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="RobotFleetCallback")
+            self._callback_pools.append(callback_pool)
+            arm.callback_dispatch = callback_pool.submit
+            arm.motion_tracker.dispatch = callback_pool.submit
+        self._streams = [_FleetStream(arm) for arm in self.arms]
+        for stream in self._streams:
+            if stream.arm.sock_cli_state_state:
+                self._selector.register(stream.arm.sock_cli_state, selectors.EVENT_READ, stream)
+            else:
+                self._lost(stream)
+        self.thread = threading.Thread(target=self._receiver_loop, name="RobotFleetReceiver", daemon=True)
+        self.thread.start()
+
+    def __len__(self):
+        return len(self.arms)
+
+    def __getitem__(self, index):
+        return self.arms[index]
+
+    def __iter__(self):
+        return iter(self.arms)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _receiver_loop(self):
+        selector = self._selector
+        while not self._closed:
+            events = selector.select(self.POLL_INTERVAL)
+            self.wakeups += 1
+            now = time.monotonic()
+            for key, _ in events:
+                stream = key.data
+                if stream is None:
+                    try:
+                        self._wakeup_recv.recv(4096)
+                    except OSError:
+                        pass
+                    continue
+                try:
+                    recvbyte = stream.receive(key.fileobj)
+                except Exception:
+                    recvbyte = -1
+                stream.recv_calls += 1
+                if recvbyte <= 0:
+                    self._unregister(stream)
+                    self._lost(stream)
+                else:
+                    stream.last_recv = now
+            while self._rejoin:
+                stream = self._rejoin.popleft()
+                stream.arm.state_recv_buffer.reset()
+                stream.last_recv = now
+                selector.register(stream.arm.sock_cli_state, selectors.EVENT_READ, stream)
+            for stream in self._streams:
+                if not stream.reconnecting and not stream.failed and now - stream.last_recv > self.STALE_TIMEOUT:
+                    self._unregister(stream)
+                    self._lost(stream)
+
+    def _unregister(self, stream):
+        sock = stream.arm.sock_cli_state
+        if sock is not None:
+            try:
+                self._selector.unregister(sock)
+            except (KeyError, ValueError):
+                pass
+
+    def _lost(self, stream):
+        """实时端口断开，在单独的线程中重连，避免阻塞其他机器人的接收"""
+        if self._closed:
+            return
+        arm = stream.arm
+        arm.sock_cli_state_state = False
+        arm.SDK_state = False
+        stream.failed = False
+        stream.reconnecting = True
+        threading.Thread(target=self._reconnect, args=(stream,), daemon=True).start()
+
+    def _reconnect(self, stream):
+        ok = stream.arm.reconnect()
+        stream.reconnecting = False
+        if self._closed:
+            return
+        if not ok:
+            # 达到最大重连次数，不再自动重连，由get_fleet_stats报告
+            stream.failed = True
+            stream.arm.log_error("实时端口重连失败，已停止自动重连")
+            return
+        self._rejoin.append(stream)
+        try:
+            self._wakeup_send.send(b"\0")
+        except OSError:
+            pass
+
+    def _resolve(self, arm):
+        return self.arms[arm] if isinstance(arm, int) else arm
+
+    def reconnect(self, arm):
+        """
+        重新开始一台已放弃自动重连的机器人的重连
+        @param  arm 机器人序号或RPC实例
+        @return True-已开始重连，False-该机器人未处于重连失败状态
+        """
+        arm = self._resolve(arm)
+        stream = self._streams[self.arms.index(arm)]
+        if not stream.failed:
+            return False
+        self._lost(stream)
+        return True
+
+    def submit(self, arm, name, *args, **kwargs):
+        """
+        在共享线程池中执行一台机器人的指令
+        @param  arm 机器人序号或RPC实例
+        @param  name 指令名称，如"MoveL"
+        @return concurrent.futures.Future，结果为指令的返回值
+        """
+        method = getattr(self._resolve(arm), name)
+        self._slots.acquire()
+        try:
+            future = self.pool.submit(method, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        self.submitted += 1
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def call_all(self, name, *args, **kwargs):
+        """
+        所有机器人并行执行同一条指令
+        @param  name 指令名称
+        @return list 按机器人顺序排列的返回值
+        """
+        futures = [self.submit(arm, name, *args, **kwargs) for arm in self.arms]
+        return [future.result() for future in futures]
+
+    def sync_directory(self, local_dir, file_type=0, delete_stale=False, max_parallel=4):
+        """
+        所有机器人并行同步同一本地目录，见RPC.sync_directory；同一文件的MD5只计算一次，
+        传输在单独的线程池中执行，不占用指令线程池
+        @param  max_parallel 同时同步的机器人数
+        @return list 按机器人顺序排列的 (错误码, 同步结果)
+        """
+        with ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="RobotFleetSync") as pool:
+            # 先计算一次各文件的MD5，各机器人同步时直接使用缓存
+            suffix = RPC.SYNC_FILE_TYPES[file_type][1] if file_type in RPC.SYNC_FILE_TYPES else None
+            if suffix is not None and os.path.isdir(local_dir):
+                paths = [os.path.join(local_dir, name) for name in os.listdir(local_dir) if name.endswith(suffix)]
+                list(pool.map(cached_file_md5, [path for path in paths if os.path.isfile(path)]))
+            return list(pool.map(lambda arm: arm.sync_directory(local_dir, file_type, delete_stale=delete_stale),
+                                 self.arms))
+
+    FIRMWARE_COMMANDS = ("SetJointFirmwareUpgrade", "SetCtrlFirmwareUpgrade", "SetEndFirmwareUpgrade",
+                         "JointAllParamUpgrade")
+
+    def upgrade_software(self, path, max_parallel=4, timeout=None, progress=None):
+        """
+        所有机器人并行软件升级：升级包的MD5只计算一次，各控制器的上传由sendfile从页缓存发送，
+        升级进度由各机器人的实时状态softwareUpgradeState跟踪；同时升级的机器人不超过max_parallel
+        @param  path 软件升级包全路径
+        @param  max_parallel 同时升级的机器人数
+        @param  timeout 每台机器人从开始上传到升级完成的最长时间，单位 [s]，None为一直等待
+        @param  progress 升级状态变化回调 progress(ip, state)，在该机器人的回调线程中调用
+        @return list 按机器人顺序排列的 {ip, error 错误码, state 最后的升级状态, duration 耗时 [s]}
+        """
+        cached_file_md5(path)
+
+        def upgrade(arm):
+            report = {"ip": arm.ip_address, "error": RobotError.ERR_OTHER, "state": None, "duration": 0.0}
+
+            def on_progress(state):
+                report["state"] = state
+                if progress is not None:
+                    progress(arm.ip_address, state)
+
+            start = time.monotonic()
+            deadline = None if timeout is None else start + timeout
+            report["error"] = arm.SoftwareUpgrade(path, True, progress=on_progress, deadline=deadline)
+            report["duration"] = time.monotonic() - start
+            return report
+
+        return self._upgrade_all(upgrade, max_parallel)
+
+    def upgrade_firmware(self, command, *args, max_parallel=4):
+        """
+        所有机器人并行执行固件升级指令，升级文件的MD5只计算一次
+        @param  command FIRMWARE_COMMANDS之一，如"SetJointFirmwareUpgrade"
+        @param  args 指令参数，最后一个为本地升级包全路径
+        @param  max_parallel 同时升级的机器人数
+        @return list 按机器人顺序排列的 {ip, error 错误码, duration 耗时 [s]}
+        """
+        if command not in self.FIRMWARE_COMMANDS:
+            raise ValueError("不支持的固件升级指令 %s" % command)
+        cached_file_md5(args[-1])
+
+        def upgrade(arm):
+            start = time.monotonic()
+            error = getattr(arm, command)(*args)
+            return {"ip": arm.ip_address, "error": error, "duration": time.monotonic() - start}
+
+        return self._upgrade_all(upgrade, max_parallel)
+
+    def _upgrade_all(self, upgrade, max_parallel):
+        # 升级耗时较长，使用单独的线程池，不占用指令线程池
+        def run(arm):
+            try:
+                return upgrade(arm)
+            except Exception as ex:
+                return {"ip": arm.ip_address, "error": RobotError.ERR_OTHER, "exception": ex}
+
+        with ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="RobotFleetUpgrade") as pool:
+            return list(pool.map(run, self.arms))
+
+    def wait_ready(self, timeout=2.0):
+        """
+        等待所有机器人收到第一帧状态数据
+        @param  timeout 超时时间，单位 [s]
+        @return True-全部就绪，False-超时
+        """
+        deadline = time.monotonic() + timeout
+        while any(arm.state_buffer.seq == 0 for arm in self.arms):
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def get_fleet_stats(self):
+        """
+        获取多机管理统计
+        @return dict arms 机器人数, wakeups 接收线程唤醒次数, submitted 累计提交指令数,
+                streams [{ip, frames 收到的有效帧数, recv_calls 接收次数, reconnecting 是否正在重连,
+                failed 是否已放弃重连}]
+        """
+        return {"arms": len(self.arms), "wakeups": self.wakeups, "submitted": self.submitted,
+                "streams": [{"ip": stream.arm.ip_address, "frames": stream.arm.state_parser.frame_count,
+                             "recv_calls": stream.recv_calls, "reconnecting": stream.reconnecting,
+                             "failed": stream.failed}
+                            for stream in self._streams]}
+
+    def close(self):
+        """停止接收线程与线程池，并关闭所有机器人的连接"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup_send.send(b"\0")
+        self.thread.join()
+        self.pool.shutdown(wait=True)
+        for arm in self.arms:
+            arm.CloseRPC()
+        for callback_pool in self._callback_pools:
+            callback_pool.shutdown(wait=True)
+        self._selector.close()
+        self._wakeup_recv.close()
+        self._wakeup_send.close()